@@ -1,8 +1,18 @@
 # app.py
-from flask import Flask, redirect, url_for, session, request, render_template_string
+from flask import Flask, jsonify, redirect, url_for, session, request, render_template_string
 import requests, base64, os, time
+import hmac
 import logging
+from functools import wraps
 import config
+import metrics
+from deadline_scheduler import scheduler_stats
+from pipelines import get_pipelines
+from poll_staging import active_stagers
+from token_manager import get_token_manager
+from zoom_webhooks import get_webhook_dispatcher, url_validation_response, verify_request
+from zoom_client import get_zoom_client
+from zoom_outbox import get_zoom_outbox
 import threading
 import queue
 
@@ -188,17 +198,18 @@ def oauth_callback():
             "redirect_uri": redirect_uri
         }
 
-        r = requests.post(token_url, headers=headers, data=data, timeout=10)
+        r = get_zoom_client().post(token_url, headers=headers, data=data)
         if r.ok:
             token_data_json = r.json()
             token = token_data_json.get("access_token")
             expires_in = token_data_json.get("expires_in", 3600) # Default to 1 hour
 
             if token:
-                # Store the obtained token and its expiry time in the config module
-                config.set_config("ZOOM_TOKEN", token)
-                config.set_config("TOKEN_EXPIRY", time.time() + expires_in)
-                logger.info("✅ Obtained Zoom access token successfully.")
+                # Keep the access and refresh tokens; the manager refreshes before expiry and
+                # mirrors the token into config (ZOOM_TOKEN / TOKEN_EXPIRY)
+                get_token_manager().set_tokens(token_data_json)
+                logger.info(f"✅ Obtained Zoom access token successfully (expires in {expires_in}s"
+                            f"{', refresh token stored' if token_data_json.get('refresh_token') else ''}).")
                 if gui_queue_for_flask:
                     # Signal OAuth success and pass the token back to the GUI
                     gui_queue_for_flask.put(('OAUTH_SUCCESS', token))
@@ -231,6 +242,156 @@ def oauth_callback():
             gui_queue_for_flask.put(('STATUS', f"[red]❌ OAuth error: {error_msg}[/]. Check logs."))
        return render_template_string(ERROR_HTML, error=error_msg)
 
+# ─── 4) Poll launch triggers ────────────────────────────────────────────────────
+_LOOPBACK_ADDRESSES = ("127.0.0.1", "::1", "::ffff:127.0.0.1")
+
+def _control_access(view):
+    """
+    Guards a route that acts on meetings or reads their data. The server listens on all
+    interfaces for Zoom's webhooks, so with CONTROL_API_KEY set the request must carry it in
+    X-Api-Key; without one only loopback callers are accepted.
+    """
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        api_key = config.get_config("CONTROL_API_KEY")
+        if api_key:
+            supplied = request.headers.get("X-Api-Key", "")
+            if not hmac.compare_digest(supplied.encode(), str(api_key).encode()):
+                logger.warning(f"⚠️ Rejected {request.path} from {request.remote_addr}: bad or missing X-Api-Key")
+                return jsonify(error="unauthorized"), 401
+        elif request.remote_addr not in _LOOPBACK_ADDRESSES:
+            logger.warning(f"⚠️ Rejected {request.path} from {request.remote_addr}: set CONTROL_API_KEY for remote access")
+            return jsonify(error="forbidden"), 403
+        return view(*args, **kwargs)
+    return guarded
+
+def _stager_for_request():
+    """Finds the stager for the request's meeting_id (or the only running meeting)."""
+    meeting_id = request.values.get("meeting_id") or (request.get_json(silent=True) or {}).get("meeting_id")
+    stagers = active_stagers()
+    if meeting_id:
+        return stagers.get(str(meeting_id))
+    return next(iter(stagers.values())) if len(stagers) == 1 else None
+
+@app.route("/polls/launch", methods=["POST"])
+@_control_access
+def launch_poll():
+    """Launches the newest pre-staged poll; only one Zoom PUT happens on this path."""
+    stager = _stager_for_request()
+    if stager is None:
+        return jsonify(error="No staged polls for that meeting (is POLL_LAUNCH_MODE set to staged?)"), 404
+    poll_id = stager.launch_next("http")
+    if poll_id is None:
+        return jsonify(launched=None, stats=stager.stats()), 409
+    return jsonify(launched=poll_id, stats=stager.stats())
+
+@app.route("/polls/end", methods=["POST"])
+@_control_access
+def end_poll():
+    """Ends the currently launched poll."""
+    stager = _stager_for_request()
+    if stager is None:
+        return jsonify(error="No poll stager for that meeting"), 404
+    return jsonify(ended=stager.end_active(), stats=stager.stats())
+
+@app.route("/polls/results")
+@_control_access
+def poll_results():
+    """Tallied answers for the meeting's polls."""
+    stager = _stager_for_request()
+    if stager is None:
+        return jsonify(error="No poll stager for that meeting"), 404
+    results = stager.results()
+    if results is None:
+        return jsonify(error="Could not fetch poll results from Zoom"), 502
+    return jsonify(results=results)
+
+# ─── 5) Zoom webhooks ───────────────────────────────────────────────────────────
+@app.route("/zoom/webhook", methods=["POST"])
+def zoom_webhook():
+    """Verifies a Zoom event and hands it to the dispatcher; replies well inside Zoom's 3s deadline."""
+    body = request.get_data()
+    ok, reason = verify_request(request.headers, body, config.get_config("SECRET_TOKEN"),
+                                config.get_config("VERIFICATION_TOKEN"))
+    if not ok:
+        logger.warning(f"⚠️ Rejected Zoom webhook: {reason}")
+        return jsonify(error="invalid signature"), 401
+
+    event = request.get_json(silent=True) or {}
+    if event.get("event") == "endpoint.url_validation":
+        if not config.get_config("SECRET_TOKEN"):
+            return jsonify(error="URL validation needs SECRET_TOKEN"), 400
+        plain_token = (event.get("payload") or {}).get("plainToken", "")
+        return jsonify(url_validation_response(config.get_config("SECRET_TOKEN"), plain_token))
+
+    get_webhook_dispatcher().submit(event) # Pipelines start/stop on the dispatcher thread
+    return jsonify(status="accepted")
+
+# ─── 6) Meeting pipelines ───────────────────────────────────────────────────────
+@app.route("/meetings")
+@_control_access
+def list_meetings():
+    """Running meetings with their settings, sharing one Whisper model, LLM backend and Zoom session."""
+    return jsonify(get_pipelines().stats())
+
+@app.route("/meetings/<meeting_id>/start", methods=["POST"])
+@_control_access
+def start_meeting(meeting_id):
+    """
+    Starts a meeting's pipeline; optional JSON device, duration (seconds), instructions, shared source,
+    weight and poll interval bounds (min_interval, max_interval in seconds).
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        duration = int(body["duration"]) if body.get("duration") else None
+        weight = float(body["weight"]) if body.get("weight") else None
+        min_interval = float(body["min_interval"]) if body.get("min_interval") is not None else None
+        max_interval = float(body["max_interval"]) if body.get("max_interval") is not None else None
+    except (TypeError, ValueError):
+        return jsonify(error="duration, weight and intervals must be numbers"), 400
+    started = get_pipelines().start(meeting_id, device=body.get("device"), duration=duration,
+                                    instructions=body.get("instructions"), source=body.get("source"),
+                                    weight=weight, min_interval=min_interval, max_interval=max_interval)
+    return jsonify(started=started, running=get_pipelines().running()), 200 if started else 409
+
+@app.route("/meetings/<meeting_id>/stop", methods=["POST"])
+@_control_access
+def stop_meeting(meeting_id):
+    """Stops a meeting's pipeline and drains its queued polls."""
+    if not get_pipelines().stop(meeting_id, drain=True):
+        return jsonify(error="Meeting is not running"), 404
+    return jsonify(stopped=meeting_id, running=get_pipelines().running())
+
+@app.route("/scheduler")
+@_control_access
+def scheduler():
+    """Transcription and generation queues: depth, waits and deadline misses per meeting."""
+    return jsonify(scheduler_stats())
+
+@app.route("/outbox")
+@_control_access
+def outbox():
+    """Outbox queue counts and the polls that could not be posted (dead letters), oldest first."""
+    zoom_outbox = get_zoom_outbox()
+    if zoom_outbox is None:
+        return jsonify(error="Outbox is disabled (OUTBOX_ENABLED)"), 404
+    return jsonify(stats=zoom_outbox.stats(), dead_letters=zoom_outbox.dead_letters())
+
+@app.route("/outbox/requeue", methods=["POST"])
+@_control_access
+def requeue_outbox():
+    """Puts every dead-lettered poll back in the outbox queue with a fresh attempt budget."""
+    zoom_outbox = get_zoom_outbox()
+    if zoom_outbox is None:
+        return jsonify(error="Outbox is disabled (OUTBOX_ENABLED)"), 404
+    return jsonify(requeued=zoom_outbox.requeue_dead_letters())
+
+@app.route("/metrics")
+@_control_access
+def prometheus_metrics():
+    """Stage latencies, queue depths, audio dropouts, LLM tokens, Zoom status codes, cache hits and RSS, per meeting."""
+    return app.response_class(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 # Note: The Flask server thread will be started by main_gui.py using Waitress.
 # The /setup and /stop routes in the previous PySimpleGUI version are no longer needed
 # because the Customtkinter GUI handles configuration and stopping directly.
\ No newline at end of file
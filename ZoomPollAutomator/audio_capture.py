@@ -5,11 +5,19 @@ import numpy     as np
 import librosa
 import logging
 import os
+import queue
 import tempfile
 import time # Import time for sleep if needed
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
+CHUNK_SECONDS = 0.25 # Capture is read in chunks this long so a stop request is seen quickly
+
+_overflows = metrics.counter("zoompoll_audio_overflows_total",
+                             "Capture chunks in which the input device overflowed and samples were dropped.", ("device",))
+
 def list_audio_devices():
     """List all available audio input devices."""
     logger.info("Listing available audio devices...")
@@ -34,65 +42,175 @@ def list_audio_devices():
         return []
 
 
+def _find_device_index(device):
+    """Returns the input device index for a device name (exact, then partial match), or None for the default."""
+    if not device or device.lower() == 'default':
+        return None
+    try:
+        devices = sd.query_devices()
+        device_index = next(
+            (i for i, d in enumerate(devices)
+             if d['name'].lower() == device.lower() and d['max_input_channels'] > 0),
+            None
+        )
+
+        if device_index is None:
+            # Try partial match
+            device_index = next(
+                (i for i, d in enumerate(devices)
+                 if device.lower() in d['name'].lower() and d['max_input_channels'] > 0),
+                None
+            )
+
+        if device_index is not None:
+            logger.info(f"Using audio device '{devices[device_index]['name']}' (Index {device_index})")
+        else:
+            logger.warning(f"Device '{device}' not found. Using default.")
+        return device_index
+    except Exception as e:
+        logger.error(f"Error finding device: {e}", exc_info=True)
+        return None
+
+
+class AudioCapture:
+    """
+    One input stream kept open for the life of a capture thread, cut into segments.
+
+    The stream's callback queues CHUNK_SECONDS blocks continuously and read() takes exactly
+    `duration` seconds of them, so consecutive segments join without a gap and no device
+    start-up is paid per segment. While nobody reads (capture paused), only the newest
+    max_buffer_seconds are kept. A stream that stops delivering is reopened on the next read.
+    """
+
+    def __init__(self, device=None, samplerate=44100, channels=2, max_buffer_seconds=30):
+        self.device = device
+        self.samplerate = samplerate
+        self.channels = channels
+        self._chunk_frames = max(1, int(CHUNK_SECONDS * samplerate))
+        self._blocks = queue.Queue(maxsize=max(1, int(max_buffer_seconds / CHUNK_SECONDS)))
+        self._leftover = None # Frames read past the end of the last segment; start of the next one
+        self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            _overflows.labels(self.device or "default").inc()
+        block = indata.copy() # PortAudio reuses indata once the callback returns
+        try:
+            self._blocks.put_nowait(block)
+        except queue.Full:
+            try:
+                self._blocks.get_nowait() # Keep the newest audio
+            except queue.Empty:
+                pass
+            self._blocks.put_nowait(block)
+
+    def open(self):
+        """Starts the input stream unless it is already running. Raises sd.PortAudioError."""
+        if self._stream is not None and self._stream.active:
+            return
+        self.close()
+        stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype="float32",
+            device=_find_device_index(self.device),
+            blocksize=self._chunk_frames,
+            callback=self._callback,
+        )
+        stream.start()
+        self._stream = stream
+
+    def flush(self):
+        """Drops buffered audio, so the next segment starts now (e.g. after capture was paused)."""
+        self._leftover = None
+        while True:
+            try:
+                self._blocks.get_nowait()
+            except queue.Empty:
+                return
+
+    def read(self, duration, stop_event=None):
+        """
+        Returns the next `duration` seconds of audio (frames x channels, float32), or None if
+        stop_event was set first (the partial segment is discarded) or the stream stopped.
+        """
+        self.open()
+        total_frames = int(duration * self.samplerate)
+        chunks, recorded = [], 0
+        if self._leftover is not None:
+            chunks.append(self._leftover)
+            recorded += len(self._leftover)
+            self._leftover = None
+        while recorded < total_frames:
+            if stop_event is not None and stop_event.is_set():
+                logger.info(f"Recording stopped after {recorded / self.samplerate:.1f}s; discarding partial segment")
+                return None
+            try:
+                block = self._blocks.get(timeout=CHUNK_SECONDS)
+            except queue.Empty:
+                if not self._stream.active:
+                    logger.error("Audio input stream stopped delivering audio; reopening it on the next segment")
+                    self.close()
+                    return None
+                continue
+            chunks.append(block)
+            recorded += len(block)
+        audio_data = np.concatenate(chunks)
+        if len(audio_data) > total_frames:
+            self._leftover = audio_data[total_frames:]
+            audio_data = audio_data[:total_frames]
+        return audio_data
+
+    def close(self):
+        """Stops the stream and drops any buffered audio."""
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.close(ignore_errors=True)
+            except sd.PortAudioError as e:
+                logger.warning(f"Error closing audio input stream: {e}")
+        self.flush()
+
+
 def record_segment(duration: int,
                    samplerate: int = 44100,
                    channels:   int = 2,
-                   device:     str = None):
+                   device:     str = None,
+                   output_path: str = "segment.wav",
+                   stop_event=None,
+                   capture: AudioCapture = None):
     """
     1) Record audio @44.1 kHz, stereo from `device` name (or default).
-    2) Mix to mono, resample to 16 kHz, normalize, save to "segment.wav".
-    Returns True on success (audio captured), False on failure or silence.
+    2) Mix to mono, resample to 16 kHz, normalize, save to `output_path`.
+    Concurrent meetings pass their own output_path so segments don't overwrite each other.
+    A capture loop passes its AudioCapture, whose stream stays open between segments (its
+    device, rate and channels apply); without one a stream is opened for this segment only.
+    Once `stop_event` is set the partial segment is discarded within one CHUNK_SECONDS chunk.
+    Returns True on success (audio captured), False on failure, silence or stop.
     """
     tmp_path = None
-    output_path = "segment.wav"
+    own_capture = capture is None
+    if own_capture:
+        capture = AudioCapture(device, samplerate, channels)
     
     try:
         # Create temporary file
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
             tmp_path = tmp_file.name
 
-        # Find device index with improved error handling
-        device_index = None
-        if device and device.lower() != 'default':
-            try:
-                devices = sd.query_devices()
-                device_index = next(
-                    (i for i, d in enumerate(devices) 
-                     if d['name'].lower() == device.lower() and d['max_input_channels'] > 0),
-                    None
-                )
-                
-                if device_index is None:
-                    # Try partial match
-                    device_index = next(
-                        (i for i, d in enumerate(devices)
-                         if device.lower() in d['name'].lower() and d['max_input_channels'] > 0),
-                        None
-                    )
-                
-                if device_index is not None:
-                    logger.info(f"Using audio device '{devices[device_index]['name']}' (Index {device_index})")
-                else:
-                    logger.warning(f"Device '{device}' not found. Using default.")
-            except Exception as e:
-                logger.error(f"Error finding device: {e}", exc_info=True)
-
         # Record audio with improved error handling
         try:
-            audio_data = sd.rec(
-                int(duration * samplerate),
-                samplerate=samplerate,
-                channels=channels,
-                dtype="float32",  # Changed to float32 for better processing
-                device=device_index,
-                blocking=True
-            )
+            audio_data = capture.read(duration, stop_event)
         except sd.PortAudioError as e:
             logger.error(f"PortAudio recording error: {e}", exc_info=True)
+            capture.close()
+            return False
+        if audio_data is None:
             return False
+        samplerate = capture.samplerate
 
         # Early silence check
-        if audio_data is None or np.all(np.abs(audio_data) < 1e-4):
+        if np.all(np.abs(audio_data) < 1e-4):
             logger.warning("Detected silence or no input")
             return False
 
@@ -121,6 +239,8 @@ def record_segment(duration: int,
         return False
         
     finally:
+        if own_capture:
+            capture.close()
         if tmp_path and os.path.exists(tmp_path):
             try:
                 os.remove(tmp_path)
@@ -17,8 +17,101 @@ _config = {
     "OLLAMA_HOST": None, # Will be set based on OLLAMA_HOST_BASE
     "OLLAMA_API": None, # Will be set based on OLLAMA_HOST_BASE
     "ZOOM_TOKEN": None, # Store Zoom access token
-    "TOKEN_EXPIRY": 0 # Store token expiry time
+    "TOKEN_EXPIRY": 0, # Store token expiry time
+    # Poll generation result cache
+    "POLL_CACHE_ENABLED": True,
+    "POLL_CACHE_SIZE": 128, # Max entries kept in memory
+    "POLL_CACHE_TTL": 900, # Seconds a cached poll stays valid
+    "POLL_CACHE_DIR": os.path.join("cache", "polls"), # On-disk tier; empty string disables it
+    # Novelty gate: skip polls while the discussion stays on the last polled topic
+    "NOVELTY_GATE_ENABLED": True,
+    "NOVELTY_THRESHOLD": 0.5, # Cosine similarity at or above this skips generation
+    # Near-duplicate suppression against polls already posted to the meeting
+    "POLL_DEDUP_ENABLED": True,
+    "POLL_DEDUP_THRESHOLD": 0.6, # Estimated Jaccard similarity treated as a duplicate
+    # Multi-candidate generation: send N requests, post the best-scoring poll
+    "POLL_CANDIDATES": 1,
+    "POLL_CANDIDATE_CONCURRENCY": 2, # Max candidate requests in flight at once
+    "POLL_QUESTIONS": 1, # Questions per Zoom poll; above 1 they all come from one LLM request
+    # Poll generation backend: "ollama" (HTTP) or "llama_cpp" (in-process GGUF)
+    "LLM_BACKEND": "ollama",
+    "LLAMA_CPP_MODEL_PATH": None,
+    "LLAMA_CPP_N_CTX": 4096,
+    "LLAMA_CPP_THREADS": None, # None lets llama.cpp pick
+    # Ollama host pool: "url[=weight],url[=weight]"; empty uses OLLAMA_HOST_BASE alone
+    "OLLAMA_HOSTS": "",
+    "OLLAMA_PROBE_INTERVAL": 10, # Seconds between /api/tags health probes
+    "OLLAMA_EJECT_AFTER": 3, # Consecutive failures before a host is ejected
+    "OLLAMA_EJECT_SECONDS": 30, # How long an ejected host sits out
+    "OLLAMA_HEDGE_ENABLED": False, # Re-send slow requests to a second host
+    "OLLAMA_HEDGE_PERCENTILE": 95, # Latency percentile that triggers the hedge
+    # Generation dispatcher: requests in flight per host (match the server's OLLAMA_NUM_PARALLEL)
+    "OLLAMA_NUM_PARALLEL": 4,
+    "POLL_LATENCY_BUDGET": 60, # Seconds a poll may take before the cheaper path is used
+    # Tiered generation: race a small model against OLLAMA_MODEL_NAME, prefer the large one if in time
+    "POLL_TIERED_ENABLED": False,
+    "OLLAMA_SMALL_MODEL": "llama3.2:1b",
+    "POLL_TIER_BUDGET": 20, # Seconds the large model gets before the small model's poll is used
+    # Rolling meeting summary used as poll context instead of the full transcript history
+    "MEETING_MEMORY_ENABLED": True,
+    "MEETING_MEMORY_MAX_ITEMS": 6, # Items kept per list (topics, positions, decisions)
+    "MEETING_MEMORY_DIR": os.path.join("cache", "memory"), # Empty string keeps summaries in memory only
+    # Shared Zoom API client
+    "ZOOM_CONNECT_TIMEOUT": 3.05, # Seconds to establish a connection
+    "ZOOM_READ_TIMEOUT": 10, # Seconds to wait for a response
+    "ZOOM_MAX_RETRIES": 3, # Retries for idempotent calls (never POST)
+    # Posting outbox: polls are posted by a background worker with rate limiting and retries
+    "OUTBOX_ENABLED": True,
+    "ZOOM_ACCOUNT_RATE": 10, # Poll posts per second per Zoom account
+    "ZOOM_ACCOUNT_BURST": 10,
+    "ZOOM_MEETING_RATE": 0.2, # Poll posts per second per meeting
+    "ZOOM_MEETING_BURST": 2,
+    "OUTBOX_MAX_ATTEMPTS": 6, # Attempts before a poll is dead-lettered
+    "OUTBOX_BACKOFF_BASE": 1.0, # Seconds; doubles per attempt, with full jitter
+    "OUTBOX_BACKOFF_MAX": 60.0,
+    "OUTBOX_MAX_AGE": 600, # Seconds after which an unposted poll is stale and dead-lettered
+    "OUTBOX_MAX_RETRY_AFTER": 300, # Longer Retry-After waits (e.g. daily limits) dead-letter the poll
+    "OUTBOX_WORKERS": 4, # Polls posted concurrently (different meetings; buckets still pace each one)
+    "POLL_JOURNAL_PATH": os.path.join("cache", "poll_journal.sqlite3"), # Empty string disables crash recovery
+    # Poll launching: "manual" (host launches), "immediate" (create then launch), "staged" (launch on trigger)
+    "POLL_LAUNCH_MODE": "manual",
+    "POLL_STAGED_MAX": 3, # Created-but-unlaunched polls kept per meeting
+    "POLL_LAUNCH_INTERVAL": 0, # Seconds between timer launches in staged mode; 0 waits for a trigger
+    "POLL_AUTO_END_SECONDS": 0, # End a launched poll after this long; 0 leaves it to the next launch or host
+    # Control routes (/polls/*, /meetings/*, /scheduler, /metrics): callers send it as X-Api-Key; unset allows loopback callers only
+    "CONTROL_API_KEY": None,
+    # OAuth tokens: saved with the refresh token and refreshed in the background before expiry
+    "ZOOM_TOKEN_PATH": os.path.join("cache", "zoom_tokens.json"), # Empty string keeps tokens in memory only
+    "ZOOM_TOKEN_REFRESH_MARGIN": 300, # Seconds before expiry to refresh
+    # Webhooks (/zoom/webhook): meeting.started/ended start and stop automation per meeting
+    "WEBHOOK_AUTOSTART": True,
+    "WEBHOOK_MEETING_IDS": "", # Comma-separated meetings to automate; empty means every meeting
+    "AUTOMATION_DEVICE": None, # Audio device for webhook-started meetings; None uses the default
+    "AUTOMATION_SEGMENT_SECONDS": 60,
+    "AUTOMATION_DRAIN_SECONDS": 15, # After a meeting ends, time allowed for queued polls to post
+    "AUTOMATION_STOP_GRACE_SECONDS": 1.0, # Time a stopping capture loop gets to exit; later output is discarded
+    "AUTOMATION_MAX_MEETINGS": 0, # Meetings automated at once in this process; 0 means no limit
+    "MEETING_SETTINGS_PATH": "meetings.json", # Per-meeting device, segment seconds and prompt instructions
+    "SCHEDULER_STARVATION_SECONDS": 30.0, # A queued transcription/LLM job waiting this long runs next regardless of deadlines
+    # Poll cadence: capture runs continuously; a poll is generated once enough new speech has built up
+    "POLL_CADENCE_ENABLED": True, # False polls every novel segment
+    "POLL_MIN_INTERVAL": 60, # Seconds between polls at the least (per meeting settings may override)
+    "POLL_MAX_INTERVAL": 300, # After this long any new speech gets a poll
+    "POLL_MIN_NEW_WORDS": 60, # Novel words since the last poll needed for the next one (before max interval)
+    "SEGMENT_BACKLOG_MAX": 2, # Recorded segments waiting for transcription; older ones are dropped
+    # Run-loop retries: per failure class, base seconds doubling (RETRY_MULTIPLIER) up to max, with jitter
+    "RETRY_AUDIO_BASE": 1.0,
+    "RETRY_AUDIO_MAX": 30.0,
+    "RETRY_WHISPER_BASE": 2.0,
+    "RETRY_WHISPER_MAX": 60.0,
+    "RETRY_LLM_BASE": 2.0,
+    "RETRY_LLM_MAX": 60.0,
+    "RETRY_ZOOM_BASE": 5.0,
+    "RETRY_ZOOM_MAX": 120.0,
+    "RETRY_MULTIPLIER": 2.0,
+    "RETRY_JITTER": 0.5, # Fraction of each wait that is randomised (0 disables jitter)
 }
+_listeners = [] # Called with (key, value) after set_config changes a value
 
 # --- Load .env file ---
 def sanitize_path(path):
@@ -28,6 +121,29 @@ def sanitize_path(path):
 # Load environment variables
 load_dotenv()
 
+def _env_int(name, default):
+    """Reads an integer environment variable, falling back to default on bad input."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid integer for {name}; using default {default}")
+        return default
+
+def _env_float(name, default):
+    """Reads a float environment variable, falling back to default on bad input."""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid number for {name}; using default {default}")
+        return default
+
+def _env_bool(name, default):
+    """Reads a boolean environment variable (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 # Secure configuration loading
 class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
@@ -62,6 +178,81 @@ _config["REDIRECT_URI"] = os.getenv("REDIRECT_URI") or _config["REDIRECT_URI"]
 _config["SECRET_TOKEN"] = os.getenv("SECRET_TOKEN")
 _config["VERIFICATION_TOKEN"] = os.getenv("VERIFICATION_TOKEN")
 _config["OLLAMA_HOST_BASE"] = os.getenv("OLLAMA_HOST", _config["OLLAMA_HOST_BASE"])
+_config["POLL_CACHE_ENABLED"] = _env_bool("POLL_CACHE_ENABLED", _config["POLL_CACHE_ENABLED"])
+_config["POLL_CACHE_SIZE"] = _env_int("POLL_CACHE_SIZE", _config["POLL_CACHE_SIZE"])
+_config["POLL_CACHE_TTL"] = _env_float("POLL_CACHE_TTL", _config["POLL_CACHE_TTL"])
+_config["POLL_CACHE_DIR"] = os.getenv("POLL_CACHE_DIR", _config["POLL_CACHE_DIR"])
+_config["NOVELTY_GATE_ENABLED"] = _env_bool("NOVELTY_GATE_ENABLED", _config["NOVELTY_GATE_ENABLED"])
+_config["NOVELTY_THRESHOLD"] = _env_float("NOVELTY_THRESHOLD", _config["NOVELTY_THRESHOLD"])
+_config["POLL_DEDUP_ENABLED"] = _env_bool("POLL_DEDUP_ENABLED", _config["POLL_DEDUP_ENABLED"])
+_config["POLL_DEDUP_THRESHOLD"] = _env_float("POLL_DEDUP_THRESHOLD", _config["POLL_DEDUP_THRESHOLD"])
+_config["POLL_CANDIDATES"] = _env_int("POLL_CANDIDATES", _config["POLL_CANDIDATES"])
+_config["POLL_CANDIDATE_CONCURRENCY"] = _env_int("POLL_CANDIDATE_CONCURRENCY", _config["POLL_CANDIDATE_CONCURRENCY"])
+_config["POLL_QUESTIONS"] = _env_int("POLL_QUESTIONS", _config["POLL_QUESTIONS"])
+_config["LLM_BACKEND"] = os.getenv("LLM_BACKEND", _config["LLM_BACKEND"])
+_config["LLAMA_CPP_MODEL_PATH"] = os.getenv("LLAMA_CPP_MODEL_PATH", _config["LLAMA_CPP_MODEL_PATH"])
+_config["LLAMA_CPP_N_CTX"] = _env_int("LLAMA_CPP_N_CTX", _config["LLAMA_CPP_N_CTX"])
+_config["LLAMA_CPP_THREADS"] = _env_int("LLAMA_CPP_THREADS", 0) or None
+_config["OLLAMA_HOSTS"] = os.getenv("OLLAMA_HOSTS", _config["OLLAMA_HOSTS"])
+_config["OLLAMA_PROBE_INTERVAL"] = _env_float("OLLAMA_PROBE_INTERVAL", _config["OLLAMA_PROBE_INTERVAL"])
+_config["OLLAMA_EJECT_AFTER"] = _env_int("OLLAMA_EJECT_AFTER", _config["OLLAMA_EJECT_AFTER"])
+_config["OLLAMA_EJECT_SECONDS"] = _env_float("OLLAMA_EJECT_SECONDS", _config["OLLAMA_EJECT_SECONDS"])
+_config["OLLAMA_HEDGE_ENABLED"] = _env_bool("OLLAMA_HEDGE_ENABLED", _config["OLLAMA_HEDGE_ENABLED"])
+_config["OLLAMA_HEDGE_PERCENTILE"] = _env_float("OLLAMA_HEDGE_PERCENTILE", _config["OLLAMA_HEDGE_PERCENTILE"])
+_config["OLLAMA_NUM_PARALLEL"] = _env_int("OLLAMA_NUM_PARALLEL", _config["OLLAMA_NUM_PARALLEL"])
+_config["POLL_LATENCY_BUDGET"] = _env_float("POLL_LATENCY_BUDGET", _config["POLL_LATENCY_BUDGET"])
+_config["POLL_TIERED_ENABLED"] = _env_bool("POLL_TIERED_ENABLED", _config["POLL_TIERED_ENABLED"])
+_config["OLLAMA_SMALL_MODEL"] = os.getenv("OLLAMA_SMALL_MODEL", _config["OLLAMA_SMALL_MODEL"])
+_config["POLL_TIER_BUDGET"] = _env_float("POLL_TIER_BUDGET", _config["POLL_TIER_BUDGET"])
+_config["MEETING_MEMORY_ENABLED"] = _env_bool("MEETING_MEMORY_ENABLED", _config["MEETING_MEMORY_ENABLED"])
+_config["MEETING_MEMORY_MAX_ITEMS"] = _env_int("MEETING_MEMORY_MAX_ITEMS", _config["MEETING_MEMORY_MAX_ITEMS"])
+_config["MEETING_MEMORY_DIR"] = os.getenv("MEETING_MEMORY_DIR", _config["MEETING_MEMORY_DIR"])
+_config["ZOOM_CONNECT_TIMEOUT"] = _env_float("ZOOM_CONNECT_TIMEOUT", _config["ZOOM_CONNECT_TIMEOUT"])
+_config["ZOOM_READ_TIMEOUT"] = _env_float("ZOOM_READ_TIMEOUT", _config["ZOOM_READ_TIMEOUT"])
+_config["ZOOM_MAX_RETRIES"] = _env_int("ZOOM_MAX_RETRIES", _config["ZOOM_MAX_RETRIES"])
+_config["OUTBOX_ENABLED"] = _env_bool("OUTBOX_ENABLED", _config["OUTBOX_ENABLED"])
+_config["ZOOM_ACCOUNT_RATE"] = _env_float("ZOOM_ACCOUNT_RATE", _config["ZOOM_ACCOUNT_RATE"])
+_config["ZOOM_ACCOUNT_BURST"] = _env_int("ZOOM_ACCOUNT_BURST", _config["ZOOM_ACCOUNT_BURST"])
+_config["ZOOM_MEETING_RATE"] = _env_float("ZOOM_MEETING_RATE", _config["ZOOM_MEETING_RATE"])
+_config["ZOOM_MEETING_BURST"] = _env_int("ZOOM_MEETING_BURST", _config["ZOOM_MEETING_BURST"])
+_config["OUTBOX_MAX_ATTEMPTS"] = _env_int("OUTBOX_MAX_ATTEMPTS", _config["OUTBOX_MAX_ATTEMPTS"])
+_config["OUTBOX_BACKOFF_BASE"] = _env_float("OUTBOX_BACKOFF_BASE", _config["OUTBOX_BACKOFF_BASE"])
+_config["OUTBOX_BACKOFF_MAX"] = _env_float("OUTBOX_BACKOFF_MAX", _config["OUTBOX_BACKOFF_MAX"])
+_config["OUTBOX_MAX_AGE"] = _env_float("OUTBOX_MAX_AGE", _config["OUTBOX_MAX_AGE"])
+_config["OUTBOX_MAX_RETRY_AFTER"] = _env_float("OUTBOX_MAX_RETRY_AFTER", _config["OUTBOX_MAX_RETRY_AFTER"])
+_config["OUTBOX_WORKERS"] = _env_int("OUTBOX_WORKERS", _config["OUTBOX_WORKERS"])
+_config["POLL_JOURNAL_PATH"] = os.getenv("POLL_JOURNAL_PATH", _config["POLL_JOURNAL_PATH"])
+_config["POLL_LAUNCH_MODE"] = os.getenv("POLL_LAUNCH_MODE", _config["POLL_LAUNCH_MODE"]).strip().lower()
+_config["POLL_STAGED_MAX"] = _env_int("POLL_STAGED_MAX", _config["POLL_STAGED_MAX"])
+_config["POLL_LAUNCH_INTERVAL"] = _env_float("POLL_LAUNCH_INTERVAL", _config["POLL_LAUNCH_INTERVAL"])
+_config["POLL_AUTO_END_SECONDS"] = _env_float("POLL_AUTO_END_SECONDS", _config["POLL_AUTO_END_SECONDS"])
+_config["CONTROL_API_KEY"] = os.getenv("CONTROL_API_KEY") or None
+_config["ZOOM_TOKEN_PATH"] = os.getenv("ZOOM_TOKEN_PATH", _config["ZOOM_TOKEN_PATH"])
+_config["ZOOM_TOKEN_REFRESH_MARGIN"] = _env_float("ZOOM_TOKEN_REFRESH_MARGIN", _config["ZOOM_TOKEN_REFRESH_MARGIN"])
+_config["WEBHOOK_AUTOSTART"] = _env_bool("WEBHOOK_AUTOSTART", _config["WEBHOOK_AUTOSTART"])
+_config["WEBHOOK_MEETING_IDS"] = os.getenv("WEBHOOK_MEETING_IDS", _config["WEBHOOK_MEETING_IDS"])
+_config["AUTOMATION_DEVICE"] = os.getenv("AUTOMATION_DEVICE", _config["AUTOMATION_DEVICE"])
+_config["AUTOMATION_SEGMENT_SECONDS"] = _env_int("AUTOMATION_SEGMENT_SECONDS", _config["AUTOMATION_SEGMENT_SECONDS"])
+_config["AUTOMATION_DRAIN_SECONDS"] = _env_float("AUTOMATION_DRAIN_SECONDS", _config["AUTOMATION_DRAIN_SECONDS"])
+_config["AUTOMATION_STOP_GRACE_SECONDS"] = _env_float("AUTOMATION_STOP_GRACE_SECONDS", _config["AUTOMATION_STOP_GRACE_SECONDS"])
+_config["AUTOMATION_MAX_MEETINGS"] = _env_int("AUTOMATION_MAX_MEETINGS", _config["AUTOMATION_MAX_MEETINGS"])
+_config["MEETING_SETTINGS_PATH"] = os.getenv("MEETING_SETTINGS_PATH", _config["MEETING_SETTINGS_PATH"])
+_config["SCHEDULER_STARVATION_SECONDS"] = _env_float("SCHEDULER_STARVATION_SECONDS", _config["SCHEDULER_STARVATION_SECONDS"])
+_config["POLL_CADENCE_ENABLED"] = _env_bool("POLL_CADENCE_ENABLED", _config["POLL_CADENCE_ENABLED"])
+_config["POLL_MIN_INTERVAL"] = _env_float("POLL_MIN_INTERVAL", _config["POLL_MIN_INTERVAL"])
+_config["POLL_MAX_INTERVAL"] = _env_float("POLL_MAX_INTERVAL", _config["POLL_MAX_INTERVAL"])
+_config["POLL_MIN_NEW_WORDS"] = _env_int("POLL_MIN_NEW_WORDS", _config["POLL_MIN_NEW_WORDS"])
+_config["SEGMENT_BACKLOG_MAX"] = _env_int("SEGMENT_BACKLOG_MAX", _config["SEGMENT_BACKLOG_MAX"])
+_config["RETRY_AUDIO_BASE"] = _env_float("RETRY_AUDIO_BASE", _config["RETRY_AUDIO_BASE"])
+_config["RETRY_AUDIO_MAX"] = _env_float("RETRY_AUDIO_MAX", _config["RETRY_AUDIO_MAX"])
+_config["RETRY_WHISPER_BASE"] = _env_float("RETRY_WHISPER_BASE", _config["RETRY_WHISPER_BASE"])
+_config["RETRY_WHISPER_MAX"] = _env_float("RETRY_WHISPER_MAX", _config["RETRY_WHISPER_MAX"])
+_config["RETRY_LLM_BASE"] = _env_float("RETRY_LLM_BASE", _config["RETRY_LLM_BASE"])
+_config["RETRY_LLM_MAX"] = _env_float("RETRY_LLM_MAX", _config["RETRY_LLM_MAX"])
+_config["RETRY_ZOOM_BASE"] = _env_float("RETRY_ZOOM_BASE", _config["RETRY_ZOOM_BASE"])
+_config["RETRY_ZOOM_MAX"] = _env_float("RETRY_ZOOM_MAX", _config["RETRY_ZOOM_MAX"])
+_config["RETRY_MULTIPLIER"] = _env_float("RETRY_MULTIPLIER", _config["RETRY_MULTIPLIER"])
+_config["RETRY_JITTER"] = _env_float("RETRY_JITTER", _config["RETRY_JITTER"])
 
 # Set derived Ollama API URLs
 _config["OLLAMA_HOST_BASE"] = _config["OLLAMA_HOST_BASE"].rstrip('/')
@@ -83,7 +274,7 @@ def validate_config_value(key, value):
         return bool(value and isinstance(value, str))
     elif key == "TOKEN_EXPIRY":
         return isinstance(value, (int, float)) and value >= 0
-    elif key.startswith("OLLAMA_"):
+    elif key in ("OLLAMA_HOST_BASE", "OLLAMA_HOST", "OLLAMA_API", "OLLAMA_MODEL_NAME"):
         return bool(value and isinstance(value, str))
     return True
 
@@ -94,8 +285,17 @@ def set_config(key, value):
         return False
     _config[key] = value
     logger.debug(f"Config key '{key}' set to valid value")
+    for listener in list(_listeners):
+        try:
+            listener(key, value)
+        except Exception as e:
+            logger.error(f"Config listener failed for {key}: {e}")
     return True
 
+def add_config_listener(callback):
+    """Registers callback(key, value), called after set_config changes a key."""
+    _listeners.append(callback)
+
 def get_config_with_default(key, default=None):
     """Gets a configuration value with a default fallback."""
     return _config.get(key, default)
@@ -117,4 +317,43 @@ def set_ollama_host(host_url):
         logger.info(f"Ollama host set to: {_config['OLLAMA_API']}")
         return True
     except Exception as e:
-        logger.error(f"Error setting Ollama host: {e}")
\ No newline at end of file
+        logger.error(f"Error setting Ollama host: {e}")
+
+def _normalize_host_url(host_url):
+    if not host_url.startswith(('http://', 'https://')):
+        host_url = f"http://{host_url}"
+    return host_url.rstrip('/')
+
+def get_ollama_hosts():
+    """
+    Returns the Ollama host pool as a list of (base_url, weight).
+
+    Parsed from OLLAMA_HOSTS ("http://a:11434=2,http://b:11434"); weights default to 1.
+    Falls back to the single OLLAMA_HOST_BASE when no pool is configured.
+    """
+    hosts = []
+    for entry in (_config.get("OLLAMA_HOSTS") or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, weight = entry, 1.0
+        if "=" in entry:
+            head, _, tail = entry.rpartition("=")
+            try:
+                url, weight = head, float(tail)
+            except ValueError:
+                pass # '=' belonged to the URL
+        if weight <= 0:
+            logger.warning(f"Ignoring Ollama host {url} with non-positive weight {weight}")
+            continue
+        hosts.append((_normalize_host_url(url), weight))
+    return hosts or [(_config["OLLAMA_HOST_BASE"], 1.0)]
+
+def set_ollama_hosts(hosts_spec):
+    """Sets the Ollama host pool from a "url[=weight],..." string."""
+    if not isinstance(hosts_spec, str):
+        logger.error("Invalid Ollama host pool specification")
+        return False
+    _config["OLLAMA_HOSTS"] = hosts_spec
+    logger.info(f"Ollama host pool set to: {get_ollama_hosts()}")
+    return True
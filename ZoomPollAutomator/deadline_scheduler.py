@@ -0,0 +1,342 @@
+# deadline_scheduler.py
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_schedulers = {} # name -> DeadlineScheduler
+_schedulers_lock = threading.Lock()
+_weights = {} # owner (meeting or source id) -> weight, shared by every queue
+_job_owner = contextvars.ContextVar("job_owner", default=None)
+_job_cancel_key = contextvars.ContextVar("job_cancel_key", default=None)
+
+_queue_wait = metrics.histogram("zoompoll_queue_wait_seconds", "Time a job waited in a scheduler queue.",
+                                ("queue", "meeting"))
+_deadline_misses = metrics.counter("zoompoll_deadline_misses_total", "Jobs that finished after their deadline.",
+                                   ("queue", "meeting"))
+_shed = metrics.counter("zoompoll_jobs_shed_total", "Jobs dropped because they could not meet their deadline.",
+                        ("queue", "meeting"))
+_queue_depth = metrics.gauge("zoompoll_queue_depth", "Jobs waiting in a scheduler queue.", ("queue",))
+_in_flight = metrics.gauge("zoompoll_queue_in_flight", "Jobs running in a scheduler queue.", ("queue",))
+
+
+class DeadlineMissed(Exception):
+    """Raised when a queued request cannot finish before its deadline."""
+
+
+def set_weight(owner, weight):
+    """
+    Sets how strongly an owner's jobs are favoured in every queue.
+
+    A weight above 1 pulls the owner's deadlines closer (a weight of 2 halves the time
+    left), below 1 pushes them out. Starvation protection still applies to low weights.
+    """
+    _weights[str(owner)] = max(0.01, float(weight))
+
+
+def current_owner():
+    """Meeting or source the current job belongs to (job_owner() block or the job a worker runs), or None."""
+    return _job_owner.get()
+
+
+def pipeline_jobs(meeting_id):
+    """
+    Cancel key of a meeting pipeline's jobs. It never equals a source ID, so stopping a meeting
+    whose ID names a shared feed doesn't cancel that feed's transcription.
+    """
+    return f"meeting:{meeting_id}"
+
+
+@contextmanager
+def job_owner(owner, cancel_key=None):
+    """
+    Attributes jobs submitted inside the block (without an explicit owner) to `owner`, and
+    files them under `cancel_key` (default: the owner) for cancel_jobs().
+    """
+    token = _job_owner.set(None if owner is None else str(owner))
+    key_token = _job_cancel_key.set(None if cancel_key is None else str(cancel_key))
+    try:
+        yield
+    finally:
+        _job_cancel_key.reset(key_token)
+        _job_owner.reset(token)
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "deadline", "submitted", "owner", "fn", "future", "shed", "cancel_event",
+                 "cancel_key")
+
+    def __init__(self, priority, seq, deadline, submitted, owner, fn, future, shed, cancel_event=None,
+                 cancel_key=None):
+        self.priority = priority
+        self.seq = seq
+        self.deadline = deadline
+        self.submitted = submitted
+        self.owner = owner
+        self.fn = fn
+        self.future = future
+        self.shed = shed
+        self.cancel_event = cancel_event
+        self.cancel_key = cancel_key if cancel_key is not None else owner
+
+
+class DeadlineScheduler:
+    """
+    Runs queued jobs on `capacity` workers, earliest deadline first.
+
+    Each job carries its owner's deadline (when the meeting's next poll is due), so a
+    meeting on a 30-second cadence isn't stuck behind one on a 5-minute cadence.
+    - Weights (see set_weight) scale the time a job has left before it is compared.
+    - Starvation protection: a job that has waited `starvation_seconds` runs next,
+      oldest first, whatever the deadlines of newer jobs.
+    - Shedding (optional per job): a job whose expected queue wait plus service time would
+      overrun its deadline fails with DeadlineMissed so the caller can take a cheaper path.
+    Deadline misses, sheds and waits are counted per owner to size hardware.
+    cancel(key) drops the queued jobs filed under a cancel key (the owner unless the job was
+    submitted with another) and sets the cancel_event of its running ones, so a stopped
+    meeting frees its slots at once.
+    """
+
+    def __init__(self, name, capacity, starvation_seconds=30.0):
+        self.name = name
+        self.capacity = max(1, int(capacity))
+        self.starvation_seconds = starvation_seconds
+        self._queue = [] # _Job; small (one or two per meeting), so selection scans it
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._running = set() # _Job currently executing
+        self._service_seconds = None # EWMA of job time; no shedding until known
+        self._stats = {"submitted": 0, "completed": 0, "shed_on_submit": 0, "shed_in_queue": 0,
+                       "deadline_misses": 0, "starvation_promotions": 0, "cancelled": 0, "max_queue_depth": 0}
+        self._owners = {} # owner -> per-owner counters
+        for index in range(self.capacity):
+            threading.Thread(target=self._worker, name=f"{name}-sched-{index}", daemon=True).start()
+
+    def _priority(self, owner, deadline, now):
+        # Only slack is scaled: dividing an overdue job's negative slack by a weight above 1
+        # would move it behind the owner's other overdue work instead of ahead
+        return now + max(0.0, deadline - now) / _weights.get(owner, 1.0)
+
+    def _owner_stats(self, owner):
+        stats = self._owners.get(owner)
+        if stats is None:
+            stats = self._owners[owner] = {"submitted": 0, "completed": 0, "deadline_misses": 0, "shed": 0,
+                                           "starvation_promotions": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        return stats
+
+    def _expected_wait(self, priority):
+        """Seconds until a job with this priority would start (call with the lock held)."""
+        if self._service_seconds is None:
+            return 0.0
+        ahead = self._in_flight + sum(1 for job in self._queue if job.priority <= priority)
+        return (ahead // self.capacity) * self._service_seconds
+
+    def submit(self, fn, deadline, owner=None, shed=True, cancel_event=None, cancel_key=None):
+        """
+        Queues fn() to run before the monotonic-clock deadline.
+
+        Args:
+            fn (callable): The work.
+            deadline (float): time.monotonic() by which the result is needed.
+            owner (str, optional): Meeting or source the job is for; defaults to the
+                enclosing job_owner() block.
+            shed (bool): Fail the job with DeadlineMissed instead of running it late.
+            cancel_event (threading.Event, optional): Set by cancel() while the job runs; fn
+                should watch it and return early. Give each job its own event.
+            cancel_key (str, optional): Key cancel() matches; defaults to the enclosing
+                job_owner() block's cancel key when the owner comes from it, else the owner.
+
+        Returns:
+            Future: Resolves to fn's result, raises DeadlineMissed if the job was shed, or
+            CancelledError if it was cancelled before it started.
+        """
+        if owner is None:
+            owner = _job_owner.get() or "default"
+            cancel_key = cancel_key if cancel_key is not None else _job_cancel_key.get()
+        owner = str(owner)
+        future = Future()
+        now = time.monotonic()
+        priority = self._priority(owner, deadline, now)
+        with self._cond:
+            self._stats["submitted"] += 1
+            owner_stats = self._owner_stats(owner)
+            owner_stats["submitted"] += 1
+            expected = self._expected_wait(priority) + (self._service_seconds or 0.0)
+            if shed and now + expected > deadline:
+                self._stats["shed_on_submit"] += 1
+                owner_stats["shed"] += 1
+                _shed.labels(self.name, owner).inc()
+                future.set_exception(DeadlineMissed(f"expected {expected:.1f}s would miss the deadline"))
+                return future
+            self._queue.append(_Job(priority, next(self._sequence), deadline, now, owner, fn, future, shed,
+                                    cancel_event, cancel_key))
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+            self._cond.notify()
+        return future
+
+    def run(self, fn, deadline, owner=None, cancel_event=None, cancel_key=None):
+        """Runs fn() in its turn and returns its result (never shed; CancelledError if cancelled first)."""
+        return self.submit(fn, deadline, owner=owner, shed=False, cancel_event=cancel_event,
+                           cancel_key=cancel_key).result()
+
+    def cancel(self, key):
+        """
+        Cancels the queued jobs filed under a cancel key and signals its running ones to stop.
+
+        Returns:
+            int: Jobs cancelled or signalled.
+        """
+        key = str(key)
+        with self._cond:
+            queued = [job for job in self._queue if job.cancel_key == key]
+            for job in queued:
+                self._queue.remove(job)
+            running = [job for job in self._running if job.cancel_key == key and job.cancel_event is not None]
+            self._stats["cancelled"] += len(queued) + len(running)
+        for job in queued:
+            job.future.cancel()
+        for job in running:
+            job.cancel_event.set()
+        return len(queued) + len(running)
+
+    def _next_job(self, now):
+        """Removes and returns the job to run next (call with the lock held)."""
+        starved = [job for job in self._queue if now - job.submitted >= self.starvation_seconds]
+        if starved:
+            job = min(starved, key=lambda j: (j.submitted, j.seq))
+            if job is not min(self._queue, key=lambda j: (j.priority, j.seq)):
+                self._stats["starvation_promotions"] += 1
+                self._owner_stats(job.owner)["starvation_promotions"] += 1
+        else:
+            job = min(self._queue, key=lambda j: (j.priority, j.seq))
+        self._queue.remove(job)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                now = time.monotonic()
+                job = self._next_job(now)
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                owner_stats = self._owner_stats(job.owner)
+                # Waited too long behind earlier deadlines: don't start work that can't be used
+                if job.shed and now + (self._service_seconds or 0.0) > job.deadline:
+                    self._stats["shed_in_queue"] += 1
+                    owner_stats["shed"] += 1
+                    _shed.labels(self.name, job.owner).inc()
+                    job.future.set_exception(DeadlineMissed("deadline passed while queued"))
+                    continue
+                waited = now - job.submitted
+                owner_stats["wait_seconds"] += waited
+                owner_stats["max_wait_seconds"] = max(owner_stats["max_wait_seconds"], waited)
+                self._in_flight += 1
+                self._running.add(job)
+            _queue_wait.labels(self.name, job.owner).observe(waited)
+
+            started = time.monotonic()
+            token = _job_owner.set(job.owner) # Lets the job's own code label its metrics by meeting
+            try:
+                result = job.fn()
+            except Exception as e:
+                job.future.set_exception(e)
+                # Released the caller but left work running (a cancelled LLM request still
+                # evaluating its prompt): keep the slot until it stops
+                still_running = getattr(e, "still_running", None)
+                if still_running is not None:
+                    wait((still_running,))
+            else:
+                job.future.set_result(result)
+            finally:
+                _job_owner.reset(token)
+            finished = time.monotonic()
+
+            with self._cond:
+                self._in_flight -= 1
+                self._running.discard(job)
+                self._stats["completed"] += 1
+                owner_stats["completed"] += 1
+                if finished > job.deadline:
+                    self._stats["deadline_misses"] += 1
+                    owner_stats["deadline_misses"] += 1
+                    _deadline_misses.labels(self.name, job.owner).inc()
+                elapsed = finished - started
+                self._service_seconds = elapsed if self._service_seconds is None \
+                    else 0.8 * self._service_seconds + 0.2 * elapsed
+
+    def depth(self):
+        """Returns (queued, running) job counts."""
+        with self._cond:
+            return len(self._queue), self._in_flight
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(capacity=self.capacity, in_flight=self._in_flight, queued=len(self._queue),
+                         avg_service_seconds=self._service_seconds)
+            owners = {owner: dict(counts) for owner, counts in self._owners.items()}
+        for owner, counts in owners.items():
+            counts["avg_wait_seconds"] = counts["wait_seconds"] / counts["completed"] if counts["completed"] else 0.0
+            counts["weight"] = _weights.get(owner, 1.0)
+        stats["owners"] = owners
+        return stats
+
+
+def get_scheduler(name, capacity=1):
+    """
+    Returns the named scheduler ("transcription", "generation", ...), creating it on first use.
+
+    Args:
+        name (str): Queue name.
+        capacity (int): Concurrent jobs; only used when the scheduler is created.
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(name)
+        if scheduler is None:
+            scheduler = DeadlineScheduler(
+                name, capacity,
+                starvation_seconds=config.get_config_with_default("SCHEDULER_STARVATION_SECONDS", 30.0),
+            )
+            _schedulers[name] = scheduler
+            logger.info(f"{name.capitalize()} scheduler started with {scheduler.capacity} slot(s).")
+    return scheduler
+
+
+def cancel_jobs(key):
+    """
+    Cancels the queued and running jobs filed under a cancel key in every scheduler: a source
+    ID when its feed stops, pipeline_jobs(meeting_id) when a meeting stops.
+    """
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return sum(scheduler.cancel(key) for scheduler in schedulers)
+
+
+def scheduler_stats():
+    """Queue depth, deadline misses and waits per scheduler and per meeting."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: scheduler.stats() for name, scheduler in schedulers.items()}
+
+
+def _collect_queue_depths():
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    for scheduler in schedulers:
+        queued, in_flight = scheduler.depth()
+        _queue_depth.labels(scheduler.name).set(queued)
+        _in_flight.labels(scheduler.name).set(in_flight)
+
+
+metrics.add_collector(_collect_queue_depths)
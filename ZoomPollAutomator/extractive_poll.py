@@ -0,0 +1,131 @@
+# extractive_poll.py
+import re
+from collections import Counter
+
+import numpy as np
+
+from text_vectors import term_counts, tokenize
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+MAX_OPTION_CHARS = 100 # Keeps options readable in the Zoom poll panel
+_MIN_SENTENCE_TOKENS = 3
+_FALLBACK_WINDOW_WORDS = 15 # Unpunctuated transcripts are cut into windows of this many words
+_DUPLICATE_SIMILARITY = 0.8 # Options closer than this count as the same statement
+_DIMS = 1024
+
+
+def split_sentences(transcript: str) -> list[str]:
+    """Splits a transcript into sentences that carry at least a few content words."""
+    pieces = [piece.strip() for piece in _SENTENCE_BREAK.split(transcript) if piece.strip()]
+    if len(pieces) < 2:
+        # Whisper sometimes returns one long unpunctuated run; fall back to word windows
+        words = transcript.split()
+        pieces = [" ".join(words[i:i + _FALLBACK_WINDOW_WORDS]) for i in range(0, len(words), _FALLBACK_WINDOW_WORDS)]
+    return [piece for piece in pieces if len(tokenize(piece)) >= _MIN_SENTENCE_TOKENS]
+
+
+def keyword_scores(sentence_tokens: list[list[str]]) -> Counter:
+    """Scores terms by frequency times how few sentences they appear in (TF-IDF over sentences)."""
+    tf = Counter(token for tokens in sentence_tokens for token in tokens)
+    df = Counter(token for tokens in sentence_tokens for token in set(tokens))
+    total = len(sentence_tokens)
+    return Counter({term: count * np.log1p(total / df[term]) for term, count in tf.items()})
+
+
+def _dominant_topic(sentence_tokens: list[list[str]], scores: Counter) -> str:
+    """Top keyword, widened to its most frequent two-word phrase when that phrase repeats."""
+    keyword = scores.most_common(1)[0][0]
+    phrases = Counter(f"{a} {b}" for tokens in sentence_tokens for a, b in zip(tokens, tokens[1:])
+                      if keyword in (a, b))
+    if phrases:
+        phrase, count = phrases.most_common(1)[0]
+        if count >= 2:
+            return phrase
+    return keyword
+
+
+def _cluster(matrix: np.ndarray, weights: np.ndarray, k: int, iterations: int = 10) -> np.ndarray:
+    """
+    Spherical k-means over L2-normalized sentence vectors.
+
+    Seeded farthest-first from the highest-weight sentence so clusters start on different points.
+
+    Returns:
+        np.ndarray: Cluster index per sentence.
+    """
+    seeds = [int(np.argmax(weights))]
+    while len(seeds) < k:
+        closest = (matrix @ matrix[seeds].T).max(axis=1)
+        closest[seeds] = np.inf
+        seeds.append(int(np.argmin(closest)))
+    centroids = matrix[seeds]
+    assignment = None
+    for _ in range(iterations):
+        new_assignment = np.argmax(matrix @ centroids.T, axis=1)
+        if assignment is not None and np.array_equal(new_assignment, assignment):
+            break
+        assignment = new_assignment
+        for cluster in range(k):
+            members = matrix[assignment == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[cluster] = centroid / norm if norm else centroid
+    return assignment
+
+
+def _shorten(sentence: str) -> str:
+    sentence = sentence.strip().rstrip(",;:")
+    if len(sentence) > MAX_OPTION_CHARS:
+        sentence = sentence[:MAX_OPTION_CHARS].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+    return sentence[:1].upper() + sentence[1:]
+
+
+def generate_extractive_poll(transcript: str, num_options: int = 4):
+    """
+    Builds a poll from the transcript's own sentences without an LLM.
+
+    The dominant topic comes from keyword scoring; the options are the most representative
+    sentence of each of `num_options` sentence clusters, so they cover different points.
+
+    Returns:
+        tuple: (title, question, options), or None if the transcript has no usable sentences.
+            Fewer than num_options options are returned for very short transcripts.
+    """
+    sentences = split_sentences(transcript)
+    if not sentences:
+        return None
+
+    sentence_tokens = [tokenize(sentence) for sentence in sentences]
+    scores = keyword_scores(sentence_tokens)
+    topic = _dominant_topic(sentence_tokens, scores)
+
+    matrix = np.stack([term_counts(sentence, dims=_DIMS) for sentence in sentences])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    # A sentence's weight is the keyword mass it carries, so on-topic statements win ties
+    weights = np.array([sum(scores[token] for token in set(tokens)) for tokens in sentence_tokens])
+    weights = weights / weights.max() if weights.max() > 0 else np.ones(len(sentences))
+
+    k = min(num_options, len(sentences))
+    assignment = _cluster(matrix, weights, k)
+
+    # Visit clusters by total weight; within each, prefer central, high-weight sentences
+    order = sorted(range(k), key=lambda c: -weights[assignment == c].sum())
+    chosen = []
+    for cluster in order:
+        members = np.flatnonzero(assignment == cluster)
+        if not len(members):
+            continue
+        centroid = matrix[members].mean(axis=0)
+        ranking = members[np.argsort(-(matrix[members] @ centroid) * (0.5 + 0.5 * weights[members]))]
+        for index in ranking:
+            if all(float(matrix[index] @ matrix[other]) < _DUPLICATE_SIMILARITY for other in chosen):
+                chosen.append(int(index))
+                break
+
+    options = [_shorten(sentences[index]) for index in sorted(chosen)] # Transcript order reads naturally
+    title = f"Quick Poll: {topic.title()}"
+    question = f"Which point about {topic} do you agree with most?"
+    return title, question, options
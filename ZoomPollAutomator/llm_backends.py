@@ -0,0 +1,452 @@
+# llm_backends.py
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, wait
+
+# Using openai library which can interface with Ollama's API
+from openai import BadRequestError, OpenAI, UnprocessableEntityError
+import config
+import metrics
+from deadline_scheduler import current_owner
+from ollama_pool import get_ollama_pool
+
+logger = logging.getLogger(__name__)
+
+# Result of one completion: raw text, completion tokens (None if unknown) and wall time
+LLMResult = namedtuple("LLMResult", ["text", "completion_tokens", "seconds"])
+
+# JSON schema of a single-question poll, used for schema-constrained output
+POLL_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "question": {"type": "string"},
+        "options": {"type": "array", "items": {"type": "string"}, "minItems": 4, "maxItems": 4},
+    },
+    "required": ["title", "question", "options"],
+}
+
+# GBNF grammar forcing exactly {"title", "question", "options"[4]} for llama.cpp
+POLL_GBNF = r'''
+root    ::= "{" ws "\"title\"" ws ":" ws string "," ws "\"question\"" ws ":" ws string "," ws "\"options\"" ws ":" ws options ws "}"
+options ::= "[" ws string ws "," ws string ws "," ws string ws "," ws string ws "]"
+string  ::= "\"" char* "\""
+char    ::= [^"\\\x7F\x00-\x1F] | "\\" (["\\/bfnrt] | "u" hex hex hex hex)
+hex     ::= [0-9a-fA-F]
+ws      ::= ([ \t\n] ws)?
+'''
+
+_tokens = metrics.counter("zoompoll_llm_tokens_total", "LLM tokens by kind (prompt, completion).",
+                          ("meeting", "backend", "kind"))
+_prompt_eval = metrics.histogram("zoompoll_llm_prompt_eval_seconds",
+                                 "Time to the first generated token (prompt evaluation), streamed requests only.",
+                                 ("meeting", "backend"))
+_request_seconds = metrics.histogram("zoompoll_llm_request_seconds", "LLM completion time.", ("meeting", "backend"))
+
+CANCEL_CHECK_SECONDS = 0.1 # How often a caller waiting on a streamed generation checks its cancel_event
+
+ollama_client = None # Initialize later to use config
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_ollama_client():
+    """Initializes and returns the Ollama client."""
+    global ollama_client
+    if ollama_client is None:
+        ollama_host_v1 = config.get_config("OLLAMA_HOST") # Get the V1 API endpoint from config
+        if not ollama_host_v1:
+             logger.error("Ollama host is not configured. Cannot create Ollama client.")
+             return None
+        try:
+            ollama_client = OpenAI(base_url=ollama_host_v1, api_key="ollama") # api_key can be anything for Ollama
+            logger.info(f"Ollama client initialized with base_url: {ollama_host_v1}")
+        except Exception as e:
+            logger.error(f"Error initializing Ollama client with base_url {ollama_host_v1}: {e}", exc_info=True)
+            return None
+    return ollama_client
+
+
+class GenerationCancelled(Exception):
+    """Raised by a backend when a generation is stopped through its cancel_event."""
+
+    # Future of a request the caller stopped waiting for while it was still running; whoever
+    # accounts for the request (dispatcher slot, pool host) holds it until this resolves
+    still_running = None
+
+
+class OllamaBackend:
+    """Poll generation over HTTP through Ollama's OpenAI-compatible API."""
+
+    name = "ollama"
+
+    def __init__(self, client, model_name, pool=None):
+        self.client = client
+        self.model_name = model_name
+        self.pool = pool # OllamaHostPool when several hosts are configured; requests are then routed per host
+        self._schema_format_supported = True # Cleared the first time the server rejects json_schema
+
+    @property
+    def model_id(self):
+        return self.model_name
+
+    def complete(self, prompt, temperature, max_tokens, json_schema=None, cancel_event=None) -> LLMResult:
+        """
+        Runs one chat completion. Raises on transport or server errors.
+
+        With json_schema, a schema-constrained response format is used when the server
+        supports it; otherwise plain JSON mode. With cancel_event, the response is streamed
+        and the connection dropped (stopping generation on the server) once the event is set;
+        GenerationCancelled is raised in that case, also while the prompt is still being
+        evaluated (see _run_until_cancelled).
+        """
+        response_formats = [{"type": "json_object"}]
+        if json_schema is not None and self._schema_format_supported:
+            response_formats.insert(0, {"type": "json_schema", "json_schema": {"name": "poll", "schema": json_schema}})
+
+        def create(client, response_format):
+            return client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format=response_format,
+                stream=cancel_event is not None
+            )
+
+        def request(client, response_format):
+            if cancel_event is None:
+                resp = create(client, response_format)
+                usage = getattr(resp, "usage", None)
+                tokens = getattr(usage, "completion_tokens", None)
+                _record_usage(self.name, meeting, prompt_tokens=getattr(usage, "prompt_tokens", None))
+                return resp.choices[0].message.content.strip(), tokens
+            return _run_until_cancelled(
+                lambda: _read_stream(create(client, response_format), cancel_event, self.name, meeting),
+                cancel_event, "ollama-stream")
+
+        started = time.monotonic()
+        meeting = current_owner() or "" # Pool requests may run on other threads
+        for response_format in response_formats:
+            try:
+                if self.pool is not None:
+                    text, tokens = self.pool.run(lambda host: request(host.client, response_format), cancel_event=cancel_event)
+                else:
+                    text, tokens = request(self.client, response_format)
+            except (BadRequestError, UnprocessableEntityError) as e:
+                # Only the server refusing the response format means json_schema is unsupported;
+                # outages and timeouts are raised as they are and leave the setting alone
+                if response_format["type"] == "json_schema":
+                    logger.info(f"Schema-constrained output not supported by backend ({e}); using JSON mode from now on.")
+                    self._schema_format_supported = False
+                    continue
+                raise
+            result = LLMResult(text, tokens, time.monotonic() - started)
+            _record_usage(self.name, meeting, result=result)
+            return result
+
+
+def _record_usage(backend, meeting, result=None, prompt_tokens=None, prompt_eval_seconds=None):
+    """Counts a completion's tokens and time under the meeting that requested it."""
+    if result is not None:
+        _request_seconds.labels(meeting, backend).observe(result.seconds)
+        if result.completion_tokens:
+            _tokens.labels(meeting, backend, "completion").inc(result.completion_tokens)
+    if prompt_tokens:
+        _tokens.labels(meeting, backend, "prompt").inc(prompt_tokens)
+    if prompt_eval_seconds is not None:
+        _prompt_eval.labels(meeting, backend).observe(prompt_eval_seconds)
+
+
+def _run_until_cancelled(fn, cancel_event, name):
+    """
+    Runs fn() on a helper thread and returns its result, or raises GenerationCancelled as
+    soon as cancel_event is set.
+
+    A streamed generation only sees its cancel_event when a chunk arrives, and none does
+    while the prompt is being evaluated. Waiting here instead releases the caller at once;
+    the abandoned request closes its stream at its first chunk. Until then it is still
+    loading the server, so the exception carries it as still_running and the dispatcher
+    slot and pool host stay taken until it ends.
+    """
+    still_running = Future()
+
+    def run():
+        try:
+            still_running.set_result(fn())
+        except BaseException as e:
+            still_running.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    while not wait((still_running,), timeout=CANCEL_CHECK_SECONDS).done:
+        if cancel_event.is_set():
+            error = GenerationCancelled("Generation cancelled")
+            error.still_running = still_running
+            raise error
+    return still_running.result()
+
+
+def _read_stream(stream, cancel_event, backend=None, meeting=""):
+    """
+    Collects a streamed chat completion, closing it early if cancel_event is set.
+
+    The wait for the first token is recorded as prompt evaluation time, since the
+    OpenAI-compatible API doesn't report Ollama's prompt_eval_duration.
+
+    Returns:
+        tuple: (text, completion tokens). Ollama streams one token per chunk.
+    """
+    parts, chunks = [], 0
+    started = time.monotonic()
+    try:
+        for chunk in stream:
+            if cancel_event.is_set():
+                raise GenerationCancelled("Generation cancelled")
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not chunks:
+                    _record_usage(backend, meeting, prompt_eval_seconds=time.monotonic() - started)
+                parts.append(chunk.choices[0].delta.content)
+                chunks += 1
+    finally:
+        stream.close() # Dropping the connection makes Ollama stop generating
+    return "".join(parts).strip(), chunks
+
+
+class LlamaCppBackend:
+    """
+    In-process poll generation with llama.cpp (llama-cpp-python) from a local GGUF file.
+
+    The model is loaded once. A RAM state cache lets calls that share the static
+    instruction prefix of the prompt resume from its KV state instead of
+    re-evaluating it, and output is constrained with a GBNF grammar.
+    """
+
+    name = "llama_cpp"
+
+    def __init__(self, model_path, n_ctx=4096, n_threads=None, prompt_prefix=None):
+        from llama_cpp import Llama, LlamaGrammar, LlamaRAMCache # Optional dependency
+
+        self.model_path = model_path
+        self._grammar_cls = LlamaGrammar
+        self._grammars = {}
+        self._lock = threading.Lock() # A llama.cpp context is not safe for concurrent use
+
+        started = time.monotonic()
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads or None,
+                         n_gpu_layers=0, verbose=False)
+        self.llm.set_cache(LlamaRAMCache(capacity_bytes=512 << 20))
+        self.load_seconds = time.monotonic() - started
+        logger.info(f"llama.cpp model loaded from {model_path} in {self.load_seconds:.1f}s")
+
+        if prompt_prefix:
+            self.warm_prefix(prompt_prefix)
+
+    @property
+    def model_id(self):
+        return f"gguf:{os.path.basename(self.model_path)}"
+
+    def warm_prefix(self, prefix):
+        """Evaluates a shared prompt prefix once so its KV state is cached for later calls."""
+        started = time.monotonic()
+        with self._lock:
+            self.llm.create_completion(prefix, max_tokens=1, temperature=0.0)
+        logger.info(f"llama.cpp prompt prefix cached in {time.monotonic() - started:.1f}s")
+
+    def _grammar_for(self, json_schema):
+        key = json.dumps(json_schema, sort_keys=True)
+        grammar = self._grammars.get(key)
+        if grammar is None:
+            if json_schema == POLL_JSON_SCHEMA:
+                grammar = self._grammar_cls.from_string(POLL_GBNF, verbose=False)
+            else:
+                grammar = self._grammar_cls.from_json_schema(key, verbose=False)
+            self._grammars[key] = grammar
+        return grammar
+
+    def complete(self, prompt, temperature, max_tokens, json_schema=None, cancel_event=None) -> LLMResult:
+        """
+        Runs one grammar-constrained completion. Raises on llama.cpp errors.
+
+        With cancel_event, tokens are streamed and generation stops (raising
+        GenerationCancelled) as soon as the event is set. The caller is released at once even
+        while the model is still busy or evaluating the prompt (see _run_until_cancelled).
+        """
+        grammar = self._grammar_for(json_schema) if json_schema is not None else None
+        meeting = current_owner() or ""
+        started = time.monotonic()
+        if cancel_event is None:
+            with self._lock:
+                resp = self.llm.create_completion(prompt, max_tokens=max_tokens, temperature=temperature, grammar=grammar)
+            usage = resp.get("usage", {})
+            result = LLMResult(resp["choices"][0]["text"].strip(), usage.get("completion_tokens"),
+                               time.monotonic() - started)
+            _record_usage(self.name, meeting, result=result, prompt_tokens=usage.get("prompt_tokens"))
+            return result
+
+        def stream():
+            with self._lock:
+                if cancel_event.is_set():
+                    raise GenerationCancelled("Generation cancelled") # Cancelled while waiting for the model
+                evaluating = time.monotonic()
+                parts = []
+                for chunk in self.llm.create_completion(prompt, max_tokens=max_tokens, temperature=temperature,
+                                                        grammar=grammar, stream=True):
+                    if cancel_event.is_set():
+                        raise GenerationCancelled("Generation cancelled")
+                    if not parts:
+                        _record_usage(self.name, meeting, prompt_eval_seconds=time.monotonic() - evaluating)
+                    parts.append(chunk["choices"][0]["text"])
+            return parts
+
+        parts = _run_until_cancelled(stream, cancel_event, "llama-cpp-stream")
+        result = LLMResult("".join(parts).strip(), len(parts), time.monotonic() - started)
+        _record_usage(self.name, meeting, result=result)
+        return result
+
+
+def _create_backend(prompt_prefix=None):
+    backend_name = (config.get_config("LLM_BACKEND") or "ollama").lower()
+    if backend_name == "llama_cpp":
+        model_path = config.get_config("LLAMA_CPP_MODEL_PATH")
+        if not model_path or not os.path.exists(model_path):
+            logger.error(f"llama.cpp backend selected but GGUF model not found at '{model_path}'. Falling back to Ollama.")
+        else:
+            try:
+                return LlamaCppBackend(
+                    model_path,
+                    n_ctx=config.get_config_with_default("LLAMA_CPP_N_CTX", 4096),
+                    n_threads=config.get_config("LLAMA_CPP_THREADS"),
+                    prompt_prefix=prompt_prefix,
+                )
+            except ImportError:
+                logger.error("llama.cpp backend selected but llama-cpp-python is not installed. Falling back to Ollama.")
+            except Exception as e:
+                logger.error(f"Failed to load llama.cpp model: {e}. Falling back to Ollama.", exc_info=True)
+
+    model_name = config.get_config("OLLAMA_MODEL_NAME") or "deepseek-r1:1.5b"
+    if config.get_config("OLLAMA_HOSTS"):
+        pool = get_ollama_pool()
+        return OllamaBackend(pool.hosts[0].client, model_name, pool=pool)
+    client = get_ollama_client()
+    if client is None:
+        return None
+    return OllamaBackend(client, model_name)
+
+
+def get_llm_backend(prompt_prefix=None):
+    """
+    Returns the configured poll generation backend, creating it on first use.
+
+    Args:
+        prompt_prefix (str, optional): Static prompt text shared by every call; backends
+            that keep KV state evaluate it once up front.
+
+    Returns:
+        OllamaBackend | LlamaCppBackend | None: None if no backend could be created.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is not None and isinstance(_backend, OllamaBackend):
+            # Pick up model changes made from the GUI without recreating the client
+            _backend.model_name = config.get_config("OLLAMA_MODEL_NAME") or _backend.model_name
+        if _backend is None:
+            _backend = _create_backend(prompt_prefix)
+            if _backend is not None:
+                logger.info(f"Poll generation backend: {_backend.name} ({_backend.model_id})")
+        return _backend
+
+
+def _current_rss_mb():
+    """Resident set size of this process in MB (current if measurable, otherwise peak)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1 << 20)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return float("nan")
+
+
+def _ollama_model_memory_mb(model_name):
+    """Memory Ollama reports for a loaded model (it lives in the daemon, not this process)."""
+    import requests
+    try:
+        r = requests.get(f"{config.get_config('OLLAMA_API')}/api/ps", timeout=3)
+        for model in r.json().get("models", []):
+            if model.get("name") == model_name or model.get("model") == model_name:
+                return model.get("size", 0) / (1 << 20)
+    except Exception as e:
+        logger.debug(f"Could not query Ollama /api/ps: {e}")
+    return None
+
+
+def benchmark_backend(backend, prompt, runs=5, json_schema=POLL_JSON_SCHEMA, max_tokens=300):
+    """Times `runs` completions of prompt and reports latency, throughput and memory."""
+    latencies, tokens = [], []
+    backend.complete(prompt, 0.7, max_tokens, json_schema) # Warm-up (model load, prefix cache)
+    for _ in range(runs):
+        result = backend.complete(prompt, 0.7, max_tokens, json_schema)
+        latencies.append(result.seconds)
+        tokens.append(result.completion_tokens or 0)
+    latencies.sort()
+    report = {
+        "backend": backend.name,
+        "model": backend.model_id,
+        "p50_seconds": latencies[len(latencies) // 2],
+        "p95_seconds": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "tokens_per_second": sum(tokens) / sum(latencies) if sum(latencies) else 0.0,
+        "process_rss_mb": _current_rss_mb(),
+    }
+    if isinstance(backend, OllamaBackend):
+        report["daemon_model_mb"] = _ollama_model_memory_mb(backend.model_name)
+    else:
+        report["load_seconds"] = backend.load_seconds
+    return report
+
+
+if __name__ == "__main__":
+    # Benchmark the available backends on CPU: python llm_backends.py [runs]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from poller import POLL_PROMPT
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sample_transcript = "The team discussed the deadline for the project. Alice proposed extending it by two weeks. Bob argued for adding more resources instead to meet the original deadline. Carol suggested a compromise, extending by one week and reallocating some tasks. David expressed concerns about budget impacts of adding resources."
+    prompt = POLL_PROMPT.replace("[Insert transcript here]", sample_transcript)
+    prefix = POLL_PROMPT.split("[Insert transcript here]")[0]
+
+    backends = []
+    client = get_ollama_client()
+    if client is not None:
+        backends.append(OllamaBackend(client, config.get_config("OLLAMA_MODEL_NAME") or "deepseek-r1:1.5b"))
+    if config.get_config("LLAMA_CPP_MODEL_PATH"):
+        rss_before = _current_rss_mb()
+        try:
+            backends.append(LlamaCppBackend(config.get_config("LLAMA_CPP_MODEL_PATH"),
+                                            n_ctx=config.get_config_with_default("LLAMA_CPP_N_CTX", 4096),
+                                            n_threads=config.get_config("LLAMA_CPP_THREADS"),
+                                            prompt_prefix=prefix))
+            logger.info(f"llama.cpp model added {_current_rss_mb() - rss_before:.0f} MB RSS")
+        except Exception as e:
+            logger.error(f"Skipping llama.cpp backend: {e}")
+
+    for backend in backends:
+        try:
+            logger.info(f"Benchmark: {json.dumps(benchmark_backend(backend, prompt, runs=runs))}")
+        except Exception as e:
+            logger.error(f"Benchmark failed for {backend.name}: {e}")
@@ -19,7 +19,9 @@ gui_queue = queue.Queue()
 import config
 # Import the app and a function to set the queue it should use
 from app import app, set_gui_queue as set_flask_gui_queue
-from run_loop import run_loop, set_gui_update_callback
+from run_loop import set_gui_update_callback
+from pipelines import get_pipelines
+from poll_staging import get_poll_stager
 import setup_automation
 # from audio_capture import list_audio_devices # Use function via setup_automation
 
@@ -58,6 +60,10 @@ class App(ctk.CTk):
         except:
             logger.warning("Could not load assets/icon.ico")
         
+        # Meeting started from this window; other meetings may run alongside it via webhooks
+        self.automation_meeting_id = None
+        self.automation_stopping = False
+
         # Configure window appearance
         self.configure(fg_color=COLORS["background"])
         
@@ -193,6 +199,10 @@ class App(ctk.CTk):
         self.exit_main_button = ctk.CTkButton(self.main_app_frame, text="Exit Application", command=self.quit)
         self.exit_main_button.grid(row=7, column=2, pady=(10, 0))
 
+        # Launches the next pre-staged poll (POLL_LAUNCH_MODE=staged)
+        self.launch_poll_button = ctk.CTkButton(self.main_app_frame, text="Launch Next Poll", command=self.launch_next_poll, state="disabled")
+        self.launch_poll_button.grid(row=8, column=0, pady=(10, 0))
+
 
         # --- Initial Setup Checks ---
         self.after(100, self.initial_setup_checks) # Start checks after GUI is visible
@@ -228,6 +238,8 @@ class App(ctk.CTk):
                     self.check_enable_start_button() # Check if start button can be enabled
                     # Optional: Automatically transition to main app after a short delay
                     # self.after(2000, self.transition_to_main_app)
+                elif message_type == 'AUTOMATION_STOPPED':
+                    self.automation_stopped(*message_value)
 
 
                 self.update()
@@ -238,6 +250,11 @@ class App(ctk.CTk):
             logger.error(f"Error processing GUI queue message: {e}", exc_info=True)
             self.update_status(f"[red]❌ Error processing GUI update: {e}[/]")
 
+        # The meeting can also stop without the Stop button (meeting.ended webhook, API, crash)
+        if self.automation_meeting_id is not None and not self.automation_stopping \
+                and not get_pipelines().is_running(self.automation_meeting_id):
+            self.automation_stopped(self.automation_meeting_id)
+
         self.after(100, self.poll_queue)
 
     def update_status(self, message):
@@ -367,9 +384,7 @@ class App(ctk.CTk):
 
 
     def start_automation(self):
-        """Starts the main automation loop."""
-        global automation_thread, should_stop_automation
-
+        """Starts the automation loop for the entered meeting on the shared pipeline supervisor."""
         meeting_id = self.meeting_id_entry.get().strip()
         duration_str = self.duration_entry.get().strip()
         selected_device_name = self.audio_device_combo.get()
@@ -391,6 +406,11 @@ class App(ctk.CTk):
             ctk.CTkMessageBox("Warning", "Invalid duration. Please enter a number.").wait_window()
             return
 
+        if not get_pipelines().start(meeting_id, device=selected_device_name, duration=duration):
+            self.update_status(f"[yellow]Automation for meeting {meeting_id} is already running or the meeting limit was reached.[/]")
+            return
+        self.automation_meeting_id = meeting_id
+
         # Disable controls while running
         self.meeting_id_entry.configure(state="disabled")
         self.duration_entry.configure(state="disabled")
@@ -398,22 +418,46 @@ class App(ctk.CTk):
         self.refresh_audio_button.configure(state="disabled")
         self.start_button.configure(state="disabled")
         self.stop_button.configure(state="normal")
+        if get_poll_stager(meeting_id) is not None:
+            self.launch_poll_button.configure(state="normal")
 
-        should_stop_automation.clear()
-        automation_thread = threading.Thread(
-            target=run_loop,
-            args=(meeting_id, duration, selected_device_name, should_stop_automation),
-            daemon=True
-        )
-        automation_thread.start()
         self.update_status("[green]🚀 Automation started.[/]")
         logger.info(f"Automation started for meeting {meeting_id} with {duration}s segments on device '{selected_device_name}'")
 
 
     def stop_automation(self):
-        """Signals the automation loop to stop."""
-        self.update_status("[yellow]Signaling automation to stop...[/]")
-        should_stop_automation.set()
+        """
+        Signals this window's meeting loop to stop.
+
+        Controls stay disabled until the loop has actually exited (within the stop grace
+        period) and its queued polls have drained; the AUTOMATION_STOPPED message then
+        re-enables them.
+        """
+        meeting_id = self.automation_meeting_id
+        if meeting_id is None:
+            return
+        self.update_status("[yellow]Stopping automation...[/]")
+        self.automation_stopping = True
+        self.stop_button.configure(state="disabled", text="Stopping...")
+        self.launch_poll_button.configure(state="disabled")
+
+        def stop():
+            started = time.monotonic()
+            get_pipelines().stop(meeting_id)
+            gui_queue.put(('AUTOMATION_STOPPED', (meeting_id, time.monotonic() - started)))
+        threading.Thread(target=stop, daemon=True).start()
+        logger.info("Stop signal sent to automation thread.")
+
+    def automation_stopped(self, meeting_id, seconds=None):
+        """Re-enables the controls once this window's meeting has really stopped."""
+        if meeting_id != self.automation_meeting_id:
+            return
+        self.automation_meeting_id = None
+        self.automation_stopping = False
+        if seconds is None:
+            self.update_status(f"[yellow]Automation for meeting {meeting_id} has stopped.[/]")
+        else:
+            self.update_status(f"[green]⏹️ Automation stopped ({seconds:.1f}s including queued polls).[/]")
 
         # Re-enable controls
         self.meeting_id_entry.configure(state="normal")
@@ -421,19 +465,32 @@ class App(ctk.CTk):
         self.audio_device_combo.configure(state="normal")
         self.refresh_audio_button.configure(state="normal")
         self.start_button.configure(state="normal")
-        self.stop_button.configure(state="disabled")
-        logger.info("Stop signal sent to automation thread.")
+        self.stop_button.configure(state="disabled", text="Stop Automation")
+        self.launch_poll_button.configure(state="disabled")
+
+    def launch_next_poll(self):
+        """Launches the newest staged poll without blocking the GUI thread."""
+        stager = get_poll_stager(self.automation_meeting_id or self.meeting_id_entry.get().strip())
+        if stager is None:
+            self.update_status("[yellow]Poll pre-staging is off (set POLL_LAUNCH_MODE=staged).[/]")
+            return
+
+        def launch():
+            poll_id = stager.launch_next("gui")
+            if poll_id is None:
+                gui_queue.put(('STATUS', "[yellow]No staged poll to launch yet.[/]"))
+            else:
+                gui_queue.put(('STATUS', f"[green]🚀 Poll launched (avg {stager.stats()['avg_launch_seconds'] * 1000:.0f} ms trigger-to-visible).[/]"))
+        threading.Thread(target=launch, daemon=True).start()
 
 
     def quit(self):
         """Handles application exit."""
         logger.info("Application requested to exit.")
-        # Signal automation thread to stop before exiting if it's running
-        if automation_thread and automation_thread.is_alive():
-            should_stop_automation.set()
-            logger.info("Signaling automation thread to stop before exit.")
-            # Give it a moment to stop, but don't block indefinitely
-            # automation_thread.join(2)
+        # Signal every running meeting loop to stop before exiting
+        stopped = get_pipelines().stop_all(drain=False)
+        if stopped:
+            logger.info(f"Signaled automation for {len(stopped)} meeting(s) to stop before exit.")
 
         # Restore stdout/stderr before closing the window
         sys.stdout = sys.__stdout__
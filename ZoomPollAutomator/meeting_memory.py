@@ -0,0 +1,154 @@
+# meeting_memory.py
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+MEMORY_FIELDS = ("topics", "positions", "decisions")
+MAX_ITEM_CHARS = 160 # Keeps each summary line short so the prompt stays a fixed size
+
+_memories = {} # meeting_id -> MeetingMemory
+_memories_lock = threading.Lock()
+
+
+class MeetingMemory:
+    """
+    Compact running summary of one meeting: key topics, positions and decisions.
+
+    Updated incrementally from each new segment (see poller.update_meeting_summary) and
+    persisted as JSON so a restarted automation resumes the same meeting's summary.
+    """
+
+    def __init__(self, meeting_id, path=None, max_items=6):
+        self.meeting_id = meeting_id
+        self.path = path
+        self.max_items = max(1, int(max_items))
+        self.update_lock = threading.Lock() # Held across an LLM update so updates apply in segment order
+        self._lock = threading.Lock()
+        self._pending = [] # Segments waiting for the meeting's summary worker
+        self._worker_running = False
+        self._state = {field: [] for field in MEMORY_FIELDS}
+        self._state.update(segments=0, updated_at=None)
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            for field in MEMORY_FIELDS:
+                self._state[field] = self._clean_items(saved.get(field))
+            self._state["segments"] = int(saved.get("segments", 0))
+            self._state["updated_at"] = saved.get("updated_at")
+            logger.info(f"Resumed meeting summary for {self.meeting_id} ({self._state['segments']} segments so far)")
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable meeting summary {self.path}: {e}")
+
+    def _persist(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f)
+            os.replace(tmp_path, self.path) # Atomic so a crash never leaves half a summary
+        except OSError as e:
+            logger.warning(f"Failed to save meeting summary {self.path}: {e}")
+
+    def _clean_items(self, items):
+        if not isinstance(items, list):
+            return []
+        cleaned = []
+        for item in items:
+            if isinstance(item, str) and item.strip():
+                item = item.strip()
+                cleaned.append(item if len(item) <= MAX_ITEM_CHARS else item[:MAX_ITEM_CHARS].rsplit(" ", 1)[0] + "…")
+        return cleaned[-self.max_items:] # Most recent items win when the model returns too many
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._state))
+
+    def summary_json(self) -> str:
+        """The summary lists as compact JSON, for the incremental update prompt."""
+        with self._lock:
+            return json.dumps({field: self._state[field] for field in MEMORY_FIELDS}, ensure_ascii=False)
+
+    def summary_text(self) -> str:
+        """The summary as short labelled lines for the poll prompt, or "" before the first update."""
+        labels = {"topics": "Key topics", "positions": "Positions raised", "decisions": "Decisions"}
+        with self._lock:
+            lines = [f"{labels[field]}: {'; '.join(self._state[field])}" for field in MEMORY_FIELDS if self._state[field]]
+        return "\n".join(lines)
+
+    def queue_segment(self, segment) -> bool:
+        """
+        Queues a segment for the summary worker.
+
+        Returns:
+            bool: True if no worker is running and the caller must start one.
+        """
+        with self._lock:
+            self._pending.append(segment)
+            if self._worker_running:
+                return False
+            self._worker_running = True
+            return True
+
+    def take_pending(self) -> str:
+        """Joins and clears the queued segments; returns "" and marks the worker finished once none are left."""
+        with self._lock:
+            if not self._pending:
+                self._worker_running = False
+                return ""
+            text = " ".join(self._pending)
+            self._pending.clear()
+            return text
+
+    def apply(self, update):
+        """
+        Replaces the summary with an updated one and saves it.
+
+        Returns:
+            bool: False if the update had none of the expected fields.
+        """
+        if not isinstance(update, dict) or not any(isinstance(update.get(field), list) for field in MEMORY_FIELDS):
+            return False
+        with self._lock:
+            for field in MEMORY_FIELDS:
+                if isinstance(update.get(field), list):
+                    self._state[field] = self._clean_items(update[field])
+            self._state["segments"] += 1
+            self._state["updated_at"] = time.time()
+            self._persist()
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {"segments": self._state["segments"],
+                    "items": sum(len(self._state[field]) for field in MEMORY_FIELDS),
+                    "summary_chars": sum(len(item) for field in MEMORY_FIELDS for item in self._state[field])}
+
+
+def get_meeting_memory(meeting_id):
+    """Returns the running summary for a meeting, or None when meeting memory is disabled."""
+    if not config.get_config("MEETING_MEMORY_ENABLED"):
+        return None
+    with _memories_lock:
+        memory = _memories.get(meeting_id)
+        if memory is None:
+            memory_dir = config.get_config("MEETING_MEMORY_DIR")
+            safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", str(meeting_id))
+            path = os.path.join(memory_dir, f"{safe_id}.json") if memory_dir else None
+            memory = MeetingMemory(meeting_id, path=path,
+                                   max_items=config.get_config_with_default("MEETING_MEMORY_MAX_ITEMS", 6))
+            _memories[meeting_id] = memory
+    return memory
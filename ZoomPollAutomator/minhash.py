@@ -0,0 +1,81 @@
+# minhash.py
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from text_vectors import tokenize
+
+_MERSENNE_PRIME = (1 << 31) - 1 # Keeps a * h + b inside uint64 for 31-bit hashes
+
+
+def shingle_set(text: str) -> set[str]:
+    """Unigram and bigram shingles of the content words in text."""
+    tokens = tokenize(text)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+class MinHasher:
+    """Computes fixed-size MinHash signatures with numpy-vectorized universal hashing."""
+
+    def __init__(self, num_perm=128, seed=1):
+        self.num_perm = num_perm
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles) -> np.ndarray:
+        """
+        Returns the MinHash signature (uint64 array of num_perm values) of a shingle set.
+
+        An empty set gives an all-sentinel signature that "matches" every other empty set,
+        so callers should not index or query texts without shingles.
+        """
+        if not shingles:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _MERSENNE_PRIME for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity: the fraction of matching signature slots."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class LshIndex:
+    """
+    Banded locality-sensitive hashing over MinHash signatures.
+
+    Each signature is split into `bands` bands; items sharing any band bucket become
+    candidates. Lookup cost depends on the number of bands, not on the index size.
+    """
+
+    def __init__(self, num_perm=128, bands=32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._signatures = {}
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].append(key)
+
+    def query(self, signature, threshold=0.0):
+        """Returns [(key, estimated_jaccard)] for indexed items at or above threshold, best first."""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        matches = [(key, estimate_jaccard(signature, self._signatures[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= threshold), key=lambda m: m[1], reverse=True)
+
+    def __len__(self):
+        return len(self._signatures)
@@ -0,0 +1,108 @@
+# novelty.py
+import logging
+import threading
+
+import config
+import metrics
+from text_vectors import OnlineIdf, cosine_similarity, term_counts
+
+logger = logging.getLogger(__name__)
+
+_gates = {} # meeting_id -> NoveltyGate
+_gates_lock = threading.Lock()
+_checks = metrics.counter("zoompoll_novelty_checks_total", "Transcript windows compared with the last polled text.",
+                          ("meeting",))
+_skips = metrics.counter("zoompoll_novelty_skips_total", "Poll generations skipped because the discussion had not moved on.",
+                         ("meeting",))
+_seconds_saved = metrics.counter("zoompoll_novelty_llm_seconds_saved_total",
+                                 "Estimated LLM seconds saved by skipped generations.", ("meeting",))
+
+
+class NoveltyGate:
+    """
+    Decides whether a transcript window has moved on from the text behind the previous poll.
+
+    Segments are compared with TF-IDF cosine similarity over hashed unigram
+    vectors. IDF is learned online from the meeting's own segments, so recurring
+    meeting vocabulary (product names, attendee names) counts for less over time.
+    A window that isn't novel only counts as a skip once the caller confirms no poll was
+    generated for it (record_skip), e.g. when the cadence's max interval forces one anyway.
+    """
+
+    def __init__(self, threshold=0.5, ewma_alpha=0.3, meeting_id=""):
+        self.meeting_id = str(meeting_id)
+        self.threshold = float(threshold)
+        self.ewma_alpha = ewma_alpha
+        self._idf = OnlineIdf()
+        self._reference_counts = None # Term counts of the text that produced the last poll
+        self._avg_generation_seconds = None
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "skips": 0, "llm_seconds_saved": 0.0, "last_similarity": 0.0}
+
+    def check(self, text: str) -> tuple[bool, float]:
+        """
+        Compares text with the last polled text.
+
+        Returns:
+            tuple: (is_novel, similarity). The first window of a meeting is always novel.
+        """
+        counts = term_counts(text)
+        with self._lock:
+            self._idf.add(counts)
+            self._stats["checks"] += 1
+            if self._reference_counts is None:
+                similarity = 0.0
+            else:
+                similarity = cosine_similarity(self._idf.tfidf(counts), self._idf.tfidf(self._reference_counts))
+            self._stats["last_similarity"] = similarity
+        _checks.labels(self.meeting_id).inc()
+        return similarity < self.threshold, similarity
+
+    def record_skip(self):
+        """Counts a generation that was avoided because the window wasn't novel."""
+        with self._lock:
+            # Credit the skip with what a generation has been costing on this host
+            saved = self._avg_generation_seconds or 0.0
+            self._stats["skips"] += 1
+            self._stats["llm_seconds_saved"] += saved
+        _skips.labels(self.meeting_id).inc()
+        _seconds_saved.labels(self.meeting_id).inc(saved)
+
+    def mark_polled(self, text: str):
+        """Records text as the basis of the poll that was just generated."""
+        counts = term_counts(text)
+        with self._lock:
+            self._reference_counts = counts
+
+    def record_generation_seconds(self, seconds: float):
+        """Feeds a measured LLM generation time into the moving average used for savings."""
+        with self._lock:
+            if self._avg_generation_seconds is None:
+                self._avg_generation_seconds = seconds
+            else:
+                self._avg_generation_seconds += self.ewma_alpha * (seconds - self._avg_generation_seconds)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["avg_generation_seconds"] = self._avg_generation_seconds or 0.0
+        return stats
+
+
+def get_novelty_gate(meeting_id):
+    """Returns the novelty gate for a meeting, or None when the gate is disabled in config."""
+    if not config.get_config("NOVELTY_GATE_ENABLED"):
+        return None
+    with _gates_lock:
+        gate = _gates.get(meeting_id)
+        if gate is None:
+            gate = NoveltyGate(threshold=config.get_config_with_default("NOVELTY_THRESHOLD", 0.5), meeting_id=meeting_id)
+            _gates[meeting_id] = gate
+    return gate
+
+
+def novelty_stats():
+    """Returns skip counts and LLM-seconds saved for every meeting seen so far."""
+    with _gates_lock:
+        gates = dict(_gates)
+    return {meeting_id: gate.stats() for meeting_id, gate in gates.items()}
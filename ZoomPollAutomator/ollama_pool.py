@@ -0,0 +1,296 @@
+# ollama_pool.py
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+# Using openai library which can interface with Ollama's API
+from openai import OpenAI
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_request_seconds = metrics.histogram("zoompoll_ollama_host_request_seconds", "Successful request time per Ollama host.",
+                                     ("host",))
+_requests = metrics.counter("zoompoll_ollama_host_requests_total", "Requests finished per Ollama host, by outcome.",
+                            ("host", "outcome"))
+_routing = metrics.counter("zoompoll_ollama_routing_total", "Requests hedged, won by the hedge, or failed over.",
+                           ("event",))
+_host_in_flight = metrics.gauge("zoompoll_ollama_host_in_flight", "Requests outstanding per Ollama host.", ("host",))
+_host_healthy = metrics.gauge("zoompoll_ollama_host_healthy", "1 if the host's last health probe passed.", ("host",))
+_host_ejected = metrics.gauge("zoompoll_ollama_host_ejected", "1 while the host is ejected after failures.", ("host",))
+
+# Latency samples needed before the hedge percentile is trusted
+_MIN_HEDGE_SAMPLES = 20
+
+
+class OllamaHost:
+    """One Ollama endpoint with its client, health state and latency history."""
+
+    def __init__(self, base_url, weight=1.0):
+        self.base_url = base_url
+        self.weight = weight
+        self.client = OpenAI(base_url=f"{base_url}/v1", api_key="ollama") # api_key can be anything for Ollama
+        self.healthy = True # Optimistic until the first probe says otherwise
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.latencies = deque(maxlen=200) # Seconds, most recent successful requests
+
+    def available(self, now):
+        return self.healthy and now >= self.ejected_until
+
+    def latency_percentile(self, percentile):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100.0))]
+
+
+class OllamaHostPool:
+    """
+    Routes LLM requests across several Ollama hosts.
+
+    Requests go to the available host with the fewest outstanding requests per unit of
+    weight. Hosts are ejected after repeated failures and readmitted by the background
+    /api/tags health probe. Optionally, a request still running past the host's latency
+    percentile is hedged to a second host and the first answer wins.
+    """
+
+    def __init__(self, hosts, probe_interval=10, eject_after=3, eject_seconds=30,
+                 hedge_enabled=False, hedge_percentile=95, max_in_flight=None):
+        self.hosts = [OllamaHost(url, weight) for url, weight in hosts]
+        self.probe_interval = probe_interval
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.hedge_enabled = hedge_enabled and len(self.hosts) > 1
+        self.hedge_percentile = hedge_percentile
+        self.max_in_flight = max_in_flight # Per host; hosts at the cap are used only when all are
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._probe_thread = None
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max(2, 2 * len(self.hosts)), thread_name_prefix="ollama-hedge") \
+            if self.hedge_enabled else None
+        self._stats = {"hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    # --- Health probing -----------------------------------------------------
+    def start(self):
+        """Starts the background health probe thread."""
+        if self._probe_thread is None or not self._probe_thread.is_alive():
+            self._stop.clear()
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="ollama-health", daemon=True)
+            self._probe_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            for host in self.hosts:
+                self.probe(host)
+            self._stop.wait(self.probe_interval)
+
+    def probe(self, host):
+        """Checks one host's /api/tags and updates its health."""
+        try:
+            healthy = requests.get(f"{host.base_url}/api/tags", timeout=3).status_code == 200
+        except requests.exceptions.RequestException:
+            healthy = False
+        with self._lock:
+            if healthy != host.healthy:
+                logger.info(f"Ollama host {host.base_url} is now {'healthy' if healthy else 'unhealthy'}")
+            host.healthy = healthy
+            if healthy and host.ejected_until and time.monotonic() >= host.ejected_until:
+                host.ejected_until = 0.0
+                host.consecutive_failures = 0
+        return healthy
+
+    # --- Routing --------------------------------------------------------------
+    def acquire(self, exclude=()):
+        """
+        Picks a host by least outstanding requests (weighted) and marks a request in flight.
+
+        Returns:
+            OllamaHost: None only if every host is excluded.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [h for h in self.hosts if h not in exclude]
+            if not candidates:
+                return None
+            available = [h for h in candidates if h.available(now)]
+            if self.max_in_flight:
+                available = [h for h in available if h.in_flight < self.max_in_flight] or available
+            # With every host down, still try the one that failed least recently rather than nothing
+            pool = available or sorted(candidates, key=lambda h: h.ejected_until)[:1]
+            host = min(pool, key=lambda h: ((h.in_flight + 1) / h.weight, h.latency_percentile(50) or 0.0))
+            host.in_flight += 1
+            host.requests += 1
+            return host
+
+    def release(self, host, seconds, ok, cancelled=False):
+        """Ends a request on host and records its outcome. Cancelled requests say nothing about the host."""
+        _requests.labels(host.base_url, "cancelled" if cancelled else "ok" if ok else "failed").inc()
+        if ok:
+            _request_seconds.labels(host.base_url).observe(seconds)
+        with self._lock:
+            host.in_flight -= 1
+            if cancelled:
+                return
+            if ok:
+                host.consecutive_failures = 0
+                host.latencies.append(seconds)
+                return
+            host.failures += 1
+            host.consecutive_failures += 1
+            if host.consecutive_failures >= self.eject_after and time.monotonic() >= host.ejected_until:
+                host.ejected_until = time.monotonic() + self.eject_seconds
+                logger.warning(f"Ejecting Ollama host {host.base_url} for {self.eject_seconds}s after "
+                               f"{host.consecutive_failures} consecutive failures")
+
+    def _call(self, host, fn, cancel_event=None):
+        started = time.monotonic()
+        try:
+            result = fn(host)
+        except Exception as e:
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            still_running = getattr(e, "still_running", None)
+            if still_running is not None:
+                # The caller gave up on a request the host is still serving; count it until it stops
+                still_running.add_done_callback(
+                    lambda _: self.release(host, time.monotonic() - started, ok=False, cancelled=cancelled))
+            else:
+                self.release(host, time.monotonic() - started, ok=False, cancelled=cancelled)
+            raise
+        self.release(host, time.monotonic() - started, ok=True)
+        return result
+
+    def _hedge_delay(self, host):
+        with self._lock:
+            if len(host.latencies) < _MIN_HEDGE_SAMPLES:
+                return None
+            return host.latency_percentile(self.hedge_percentile)
+
+    def run(self, fn, cancel_event=None):
+        """
+        Runs fn(host) on a pooled host, failing over once to another host on error.
+
+        Args:
+            fn: Called with the chosen OllamaHost.
+            cancel_event (threading.Event, optional): Once set, failures are treated as
+                cancellations: not counted against the host and not retried.
+
+        Returns:
+            Whatever fn returns. Raises the last error if every attempt failed.
+        """
+        primary = self.acquire()
+        hedge_delay = self._hedge_delay(primary) if self.hedge_enabled else None
+        if hedge_delay is None:
+            try:
+                return self._call(primary, fn, cancel_event)
+            except Exception as e:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise
+                secondary = self.acquire(exclude=(primary,))
+                if secondary is None:
+                    raise
+                logger.warning(f"Ollama host {primary.base_url} failed ({e}); retrying on {secondary.base_url}")
+                with self._lock:
+                    self._stats["failovers"] += 1
+                _routing.labels("failover").inc()
+                return self._call(secondary, fn, cancel_event)
+        return self._run_hedged(primary, fn, hedge_delay, cancel_event)
+
+    def _run_hedged(self, primary, fn, hedge_delay, cancel_event=None):
+        futures = {self._hedge_executor.submit(self._call, primary, fn, cancel_event): primary}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            secondary = self.acquire(exclude=(primary,))
+            if secondary is not None:
+                logger.info(f"Hedging slow request on {primary.base_url} (>{hedge_delay:.1f}s) to {secondary.base_url}")
+                with self._lock:
+                    self._stats["hedged"] += 1
+                _routing.labels("hedged").inc()
+                futures[self._hedge_executor.submit(self._call, secondary, fn, cancel_event)] = secondary
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if futures[future] is not primary:
+                    with self._lock:
+                        self._stats["hedge_wins"] += 1
+                    _routing.labels("hedge_win").inc()
+                return result # The slower request finishes in the background and is discarded
+        raise last_error
+
+    # --- Visibility -------------------------------------------------------------
+    def snapshot(self):
+        """Returns per-host health, in-flight counts and latency percentiles."""
+        with self._lock:
+            now = time.monotonic()
+            hosts = [{
+                "url": h.base_url,
+                "weight": h.weight,
+                "healthy": h.healthy,
+                "ejected": now < h.ejected_until,
+                "in_flight": h.in_flight,
+                "requests": h.requests,
+                "failures": h.failures,
+                "p50_seconds": h.latency_percentile(50),
+                "p95_seconds": h.latency_percentile(95),
+            } for h in self.hosts]
+            return {"hosts": hosts, **self._stats}
+
+
+def get_ollama_pool():
+    """Returns the shared Ollama host pool, creating it (and its health probe) on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            hosts = config.get_ollama_hosts()
+            _pool = OllamaHostPool(
+                hosts,
+                probe_interval=config.get_config_with_default("OLLAMA_PROBE_INTERVAL", 10),
+                eject_after=config.get_config_with_default("OLLAMA_EJECT_AFTER", 3),
+                eject_seconds=config.get_config_with_default("OLLAMA_EJECT_SECONDS", 30),
+                hedge_enabled=config.get_config("OLLAMA_HEDGE_ENABLED"),
+                hedge_percentile=config.get_config_with_default("OLLAMA_HEDGE_PERCENTILE", 95),
+                max_in_flight=config.get_config_with_default("OLLAMA_NUM_PARALLEL", 4),
+            )
+            _pool.start()
+            logger.info(f"Ollama host pool started with {len(hosts)} host(s): {[url for url, _ in hosts]}")
+    return _pool
+
+
+def pool_stats():
+    """Per-host latency and in-flight counts, or None if the pool hasn't been created yet."""
+    return _pool.snapshot() if _pool is not None else None
+
+
+def _collect_hosts():
+    stats = pool_stats()
+    if stats is None:
+        return
+    for host in stats["hosts"]:
+        _host_in_flight.labels(host["url"]).set(host["in_flight"])
+        _host_healthy.labels(host["url"]).set(1 if host["healthy"] else 0)
+        _host_ejected.labels(host["url"]).set(1 if host["ejected"] else 0)
+
+
+metrics.add_collector(_collect_hosts)
@@ -0,0 +1,355 @@
+# pipelines.py
+import json
+import logging
+import os
+import threading
+import time
+
+import config
+from deadline_scheduler import cancel_jobs, set_weight
+from novelty import novelty_stats
+from retry_policy import wake_waiters
+from run_loop import PollPipeline, run_source_loop
+from zoom_outbox import get_zoom_outbox
+
+logger = logging.getLogger(__name__)
+
+_pipelines = None
+_pipelines_lock = threading.Lock()
+
+
+class MeetingSettings:
+    """
+    Per-meeting pipeline settings: audio device, segment length, prompt guidance, the shared
+    audio source the meeting listens to, if any, its scheduling weight and the bounds on the
+    time between its polls (see poll_cadence).
+    """
+
+    __slots__ = ("meeting_id", "device", "duration", "instructions", "source", "weight", "min_interval",
+                 "max_interval")
+
+    def __init__(self, meeting_id, device=None, duration=None, instructions=None, source=None, weight=None,
+                 min_interval=None, max_interval=None):
+        self.meeting_id = str(meeting_id)
+        self.device = device
+        self.duration = duration
+        self.instructions = instructions
+        self.source = source
+        self.weight = weight
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def as_dict(self):
+        return {"device": self.device, "duration": self.duration, "instructions": self.instructions,
+                "source": self.source, "weight": self.weight, "min_interval": self.min_interval,
+                "max_interval": self.max_interval}
+
+
+def load_meeting_settings(path):
+    """
+    Reads per-meeting settings from a JSON file.
+
+    The file maps meeting IDs to {"device", "duration", "instructions", "source", "weight",
+    "min_interval", "max_interval"};
+    any field may be left out to use the default. Meetings naming the same source share one
+    capture and transcription stream (e.g. one room microphone simulcast into several meetings).
+
+    Returns:
+        dict: meeting_id -> MeetingSettings (empty if the file is missing or unreadable).
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        return {str(meeting_id).replace(" ", ""): MeetingSettings(
+                    meeting_id, device=entry.get("device"), duration=entry.get("duration"),
+                    instructions=entry.get("instructions"), source=entry.get("source"),
+                    weight=entry.get("weight"), min_interval=entry.get("min_interval"),
+                    max_interval=entry.get("max_interval"))
+                for meeting_id, entry in saved.items()}
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable meeting settings file {path}: {e}")
+        return {}
+
+
+class _Source:
+    """One capture/transcription loop and the meetings subscribed to it."""
+
+    def __init__(self, source_id, device, duration):
+        self.source_id = source_id
+        self.device = device
+        self.duration = duration
+        self.stop_event = threading.Event()
+        self.started_at = time.monotonic()
+        self.subscribers = {} # meeting_id -> PollPipeline
+        self.thread = threading.Thread(
+            target=run_source_loop,
+            args=(source_id, duration, device, self.stop_event, self.snapshot),
+            name=f"automation-{source_id}",
+            daemon=True,
+        )
+
+    def snapshot(self):
+        # subscribers is replaced on join/leave, never mutated, so the loop reads it without the lock
+        return list(self.subscribers.values())
+
+
+class MeetingPipelines:
+    """
+    Supervises the automation pipelines for any number of Zoom meetings in this process.
+
+    Every pipeline shares the heavy pieces - the Whisper model, the LLM backend and its
+    generation dispatcher, the Zoom session and the token manager - so an extra meeting
+    costs a thread plus its segment buffer, poll history and summary rather than another
+    model. Each meeting has its own settings (device, segment length, prompt guidance) and
+    is started and stopped independently, from the GUI, the HTTP API or the webhook receiver.
+
+    A meeting normally gets its own capture loop (its source is its meeting ID). Meetings
+    whose settings name the same `source` subscribe to one capture and transcription
+    stream instead; the stream takes its device and segment length from the meeting that
+    started it and stops when its last subscriber leaves.
+    Stopping is cooperative through every stage: capture reads in short chunks, a queued or
+    running transcription and the meeting's LLM requests are cancelled, and anything the loop
+    still produces is discarded. The loop gets `stop_grace_seconds` to exit; then polls
+    already queued for the meeting get up to `drain_seconds` to reach Zoom.
+    """
+
+    def __init__(self, default_device=None, default_duration=60, drain_seconds=15, max_meetings=0, settings=None,
+                 stop_grace_seconds=1.0):
+        self.default_device = default_device
+        self.default_duration = default_duration
+        self.drain_seconds = drain_seconds
+        self.stop_grace_seconds = stop_grace_seconds
+        self.max_meetings = max_meetings
+        self._lock = threading.Lock()
+        self._settings = dict(settings or {}) # meeting_id -> MeetingSettings
+        self._sources = {} # source_id -> _Source
+        self._meetings = {} # meeting_id -> (source_id, settings, started_at)
+        self._stats = {"started": 0, "stopped": 0, "rejected": 0}
+
+    def configure(self, meeting_id, device=None, duration=None, instructions=None, source=None, weight=None,
+                  min_interval=None, max_interval=None):
+        """Saves settings used by later starts of the meeting (e.g. a webhook-triggered one)."""
+        settings = MeetingSettings(meeting_id, device=device, duration=duration, instructions=instructions,
+                                   source=source, weight=weight, min_interval=min_interval, max_interval=max_interval)
+        with self._lock:
+            self._settings[settings.meeting_id] = settings
+        return settings
+
+    def settings_for(self, meeting_id, device=None, duration=None, instructions=None, source=None, weight=None,
+                     min_interval=None, max_interval=None):
+        """Effective settings for a start: explicit arguments, then saved settings, then the defaults."""
+        meeting_id = str(meeting_id)
+        with self._lock:
+            saved = self._settings.get(meeting_id) or MeetingSettings(meeting_id)
+        return MeetingSettings(meeting_id,
+                               device=device or saved.device or self.default_device,
+                               duration=duration or saved.duration or self.default_duration,
+                               instructions=instructions or saved.instructions,
+                               source=source or saved.source,
+                               weight=float(weight or saved.weight or 1.0),
+                               min_interval=min_interval if min_interval is not None else saved.min_interval,
+                               max_interval=max_interval if max_interval is not None else saved.max_interval)
+
+    def _alive_locked(self, meeting_id):
+        run = self._meetings.get(meeting_id)
+        return run is not None and self._sources[run[0]].thread.is_alive()
+
+    def start(self, meeting_id, device=None, duration=None, instructions=None, source=None, weight=None,
+              min_interval=None, max_interval=None):
+        """
+        Starts the automation pipeline for a meeting unless it is already running.
+
+        Args:
+            meeting_id (str): Zoom meeting ID.
+            device (str, optional): Audio input device; defaults to the saved or default device.
+            duration (int, optional): Segment length in seconds.
+            instructions (str, optional): Prompt guidance added to this meeting's poll requests.
+            source (str, optional): Shared audio source to subscribe to instead of a capture
+                loop of the meeting's own.
+            weight (float, optional): Scheduling weight of the meeting's transcription and
+                generation jobs against other meetings' (see deadline_scheduler.set_weight).
+            min_interval (float, optional): Seconds between the meeting's polls at the least;
+                defaults to POLL_MIN_INTERVAL.
+            max_interval (float, optional): Seconds after which any new speech gets a poll;
+                defaults to POLL_MAX_INTERVAL.
+
+        Returns:
+            bool: True if the meeting was started.
+        """
+        settings = self.settings_for(meeting_id, device, duration, instructions, source, weight, min_interval,
+                                     max_interval)
+        meeting_id = settings.meeting_id
+        source_id = str(settings.source or meeting_id)
+        with self._lock:
+            if self._alive_locked(meeting_id):
+                return False
+            self._remove_locked(meeting_id) # A loop that died on its own
+            live = sum(1 for other in self._meetings if self._alive_locked(other))
+            if self.max_meetings and live >= self.max_meetings:
+                self._stats["rejected"] += 1
+                logger.warning(f"⚠️ Not starting meeting {meeting_id}: {live} meeting(s) already running "
+                               f"(AUTOMATION_MAX_MEETINGS={self.max_meetings})")
+                return False
+
+            pipeline = PollPipeline(meeting_id, settings.instructions, settings.min_interval, settings.max_interval)
+            pipeline.start()
+            feed = self._sources.get(source_id)
+            shared = feed is not None and feed.thread.is_alive()
+            if not shared:
+                previous = feed
+                feed = self._sources[source_id] = _Source(source_id, settings.device, settings.duration)
+                if previous is not None:
+                    feed.subscribers = previous.subscribers # Restart the meetings of a source whose loop died
+            feed.subscribers = dict(feed.subscribers, **{meeting_id: pipeline})
+            self._meetings[meeting_id] = (source_id, settings, time.monotonic())
+            # Generation is scheduled per meeting, transcription per source at its most urgent subscriber's weight
+            set_weight(meeting_id, settings.weight)
+            self._weigh_source_locked(feed)
+            self._stats["started"] += 1
+            if not shared:
+                feed.thread.start()
+        if shared:
+            if (settings.device, settings.duration) != (feed.device, feed.duration):
+                logger.info(f"Meeting {meeting_id} uses source '{source_id}' as started "
+                            f"({feed.duration}s segments, device '{feed.device or 'default'}')")
+            logger.info(f"▶️ Meeting {meeting_id} joined shared source '{source_id}' "
+                        f"({len(feed.subscribers)} meeting(s) on one capture and transcription stream)")
+        else:
+            logger.info(f"▶️ Started automation for meeting {meeting_id} ({settings.duration}s segments, "
+                        f"device '{settings.device or 'default'}', {live + 1} meeting(s) running)")
+        return True
+
+    def _remove_locked(self, meeting_id):
+        """
+        Unsubscribes a meeting; stops its source once no meeting listens to it.
+
+        Returns:
+            tuple: (run, feed) where feed is the _Source that was stopped, or None if it still
+            has subscribers; run is None if the meeting wasn't running.
+        """
+        run = self._meetings.pop(meeting_id, None)
+        if run is None:
+            return None, None
+        feed = self._sources.get(run[0])
+        if feed is None:
+            return run, None
+        pipeline = feed.subscribers.get(meeting_id)
+        feed.subscribers = {other: p for other, p in feed.subscribers.items() if other != meeting_id}
+        if pipeline is not None:
+            pipeline.stop()
+        if feed.subscribers:
+            self._weigh_source_locked(feed) # The leaving meeting may have been the most urgent
+            return run, None
+        feed.stop_event.set()
+        del self._sources[run[0]]
+        return run, feed
+
+    def _weigh_source_locked(self, feed):
+        """Schedules a source's transcription at the weight of its most urgent subscriber."""
+        weights = [self._meetings[other][1].weight for other in feed.subscribers if other in self._meetings]
+        if weights:
+            set_weight(feed.source_id, max(weights))
+
+    def _join(self, feed, deadline):
+        """Waits until `deadline` for a stopped source's loop to exit."""
+        feed.thread.join(max(0.0, deadline - time.monotonic()))
+        if feed.thread.is_alive():
+            logger.warning(f"⚠️ Automation loop for {feed.source_id} still finishing after the "
+                           f"{self.stop_grace_seconds:.1f}s grace period; its results will be discarded")
+            return False
+        return True
+
+    def stop(self, meeting_id, drain=True, wait=True):
+        """
+        Stops a meeting's pipeline; with drain, waits briefly for its queued polls to post.
+
+        Args:
+            meeting_id (str): Zoom meeting ID.
+            drain (bool): Give the meeting's queued polls up to drain_seconds to post.
+            wait (bool): Wait up to stop_grace_seconds for the capture loop to exit.
+
+        Returns:
+            bool: True if the meeting was running.
+        """
+        meeting_id = str(meeting_id)
+        with self._lock:
+            run, feed = self._remove_locked(meeting_id)
+            if run is not None:
+                self._stats["stopped"] += 1
+        if run is None:
+            return False
+        source_id, _, started_at = run
+        via = f" (source '{source_id}')" if source_id != meeting_id else ""
+        logger.info(f"⏹️ Stopping automation for meeting {meeting_id}{via} after {time.monotonic() - started_at:.0f}s")
+        if feed is not None:
+            wake_waiters() # A loop backing off after a failure exits now rather than after its wait
+            cancel_jobs(source_id) # Drop its queued transcription; a running one stops at the next window
+            if wait:
+                self._join(feed, time.monotonic() + self.stop_grace_seconds)
+        outbox = get_zoom_outbox()
+        if drain and outbox is not None and not outbox.drain(self.drain_seconds, meeting_id=meeting_id):
+            logger.warning(f"⚠️ {outbox.pending(meeting_id)} poll(s) for meeting {meeting_id} still queued after drain")
+        return True
+
+    def stop_all(self, drain=False):
+        """Stops every meeting's pipeline (e.g. on exit), giving all loops one shared grace period."""
+        with self._lock:
+            meeting_ids = list(self._meetings)
+            feeds = list(self._sources.values())
+        for meeting_id in meeting_ids:
+            self.stop(meeting_id, drain=drain, wait=False)
+        deadline = time.monotonic() + self.stop_grace_seconds
+        for feed in feeds:
+            self._join(feed, deadline)
+        return meeting_ids
+
+    def is_running(self, meeting_id):
+        with self._lock:
+            return self._alive_locked(str(meeting_id))
+
+    def running(self):
+        """Meeting IDs with a live automation pipeline."""
+        with self._lock:
+            return [meeting_id for meeting_id in self._meetings if self._alive_locked(meeting_id)]
+
+    def stats(self):
+        """Per-meeting state and settings, the capture sources feeding them, and start/stop counts."""
+        now = time.monotonic()
+        novelty = novelty_stats()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["meetings"] = {
+                meeting_id: dict(settings.as_dict(), source=source_id, running=self._alive_locked(meeting_id),
+                                 uptime_seconds=now - started_at)
+                for meeting_id, (source_id, settings, started_at) in self._meetings.items()
+            }
+            for feed in self._sources.values():
+                for meeting_id, pipeline in feed.subscribers.items():
+                    if meeting_id in stats["meetings"] and pipeline.cadence is not None:
+                        stats["meetings"][meeting_id]["cadence"] = pipeline.cadence.stats()
+            stats["sources"] = {
+                source_id: {"meetings": sorted(feed.subscribers), "device": feed.device, "duration": feed.duration,
+                            "running": feed.thread.is_alive(), "uptime_seconds": now - feed.started_at,
+                            "novelty": novelty.get(source_id)}
+                for source_id, feed in self._sources.items()
+            }
+        stats["running"] = sum(1 for meeting in stats["meetings"].values() if meeting["running"])
+        return stats
+
+
+def get_pipelines():
+    """Returns the shared multi-meeting supervisor."""
+    global _pipelines
+    with _pipelines_lock:
+        if _pipelines is None:
+            _pipelines = MeetingPipelines(
+                default_device=config.get_config("AUTOMATION_DEVICE"),
+                default_duration=config.get_config_with_default("AUTOMATION_SEGMENT_SECONDS", 60),
+                drain_seconds=config.get_config_with_default("AUTOMATION_DRAIN_SECONDS", 15),
+                max_meetings=config.get_config_with_default("AUTOMATION_MAX_MEETINGS", 0),
+                settings=load_meeting_settings(config.get_config("MEETING_SETTINGS_PATH")),
+                stop_grace_seconds=config.get_config_with_default("AUTOMATION_STOP_GRACE_SECONDS", 1.0),
+            )
+    return _pipelines
@@ -0,0 +1,248 @@
+# poll_cache.py
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+from deadline_scheduler import current_owner
+
+logger = logging.getLogger(__name__)
+
+_poll_cache = None
+_poll_cache_lock = threading.Lock()
+_lookups = metrics.counter("zoompoll_poll_cache_lookups_total", "Poll cache lookups by result (memory, disk, miss).",
+                           ("meeting", "result"))
+
+
+def normalize_transcript(text: str) -> str:
+    """
+    Normalizes a transcript so near-identical segments map to the same cache key.
+
+    Lowercases, drops punctuation, collapses whitespace and removes consecutive
+    repeated sentences (Whisper tends to emit "Thank you. Thank you." on silence).
+    """
+    sentences = re.split(r"[.!?\n]+", text.lower())
+    normalized = []
+    for sentence in sentences:
+        words = re.findall(r"[a-z0-9']+", sentence)
+        if not words:
+            continue
+        line = " ".join(words)
+        if normalized and normalized[-1] == line:
+            continue # Skip filler repeated back-to-back
+        normalized.append(line)
+    return " ".join(normalized)
+
+
+def make_cache_key(transcript: str, model: str, prompt_version: str, temperature: float) -> str:
+    """Builds the cache key from the normalized transcript and the generation settings."""
+    material = "\x1f".join([
+        normalize_transcript(transcript),
+        model or "",
+        str(prompt_version),
+        f"{float(temperature):.3f}",
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class PollCache:
+    """
+    Two-tier LRU + TTL cache for generated polls.
+
+    The memory tier is an OrderedDict kept in LRU order. The optional disk tier
+    stores one JSON file per key so cached polls survive a restart. Its keys are
+    indexed in memory (oldest write first), so a miss never touches the disk and the
+    tier is bounded without listing the directory. File I/O runs outside the lock, so
+    lookups never wait on another meeting's disk read or write.
+    """
+
+    def __init__(self, max_entries=128, ttl=900, disk_dir=None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.disk_dir = disk_dir or None
+        self._entries = OrderedDict() # key -> (created_at, poll)
+        self._disk_keys = OrderedDict() # Keys with a file in the disk tier, oldest write first
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0, "writes": 0}
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not create poll cache directory {self.disk_dir}: {e}. Disk tier disabled.")
+                self.disk_dir = None
+        if self.disk_dir:
+            self._index_disk()
+
+    def _index_disk(self):
+        """Indexes the files a previous run left behind, and prunes them to max_entries."""
+        try:
+            files = [name for name in os.listdir(self.disk_dir) if name.endswith(".json")]
+            files.sort(key=lambda name: os.path.getmtime(os.path.join(self.disk_dir, name)))
+        except OSError as e:
+            logger.debug(f"Poll cache disk index failed: {e}")
+            return
+        for name in files:
+            self._disk_keys[name[:-5]] = True
+        for key in self._evict_disk_keys():
+            self._remove_disk(key)
+
+    def _is_fresh(self, created_at):
+        return (time.time() - created_at) <= self.ttl
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        """Returns (created_at, poll) from the disk tier, or None."""
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            poll = entry["poll"]
+            return entry["created_at"], (poll["title"], poll["question"], list(poll["options"]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable poll cache file {path}: {e}")
+            self._drop_disk(key)
+            return None
+
+    def _write_disk(self, key, created_at, poll):
+        title, question, options = poll
+        entry = {"created_at": created_at, "poll": {"title": title, "question": question, "options": options}}
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp" # Per thread, as two meetings may store the same key
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path) # Atomic so readers never see a partial file
+        except OSError as e:
+            logger.warning(f"Failed to write poll cache file {path}: {e}")
+            self._drop_disk(key)
+            return
+        with self._lock:
+            evicted = key not in self._disk_keys # Pushed out by newer writes while this one ran
+        if evicted:
+            self._remove_disk(key)
+
+    def _remove_disk(self, key):
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _drop_disk(self, key):
+        """Removes a key from the disk tier (index and file)."""
+        with self._lock:
+            self._disk_keys.pop(key, None)
+        self._remove_disk(key)
+
+    def _evict_disk_keys(self):
+        """Unindexes the oldest disk keys beyond max_entries; the caller removes their files."""
+        evicted = []
+        while len(self._disk_keys) > self.max_entries:
+            evicted.append(self._disk_keys.popitem(last=False)[0])
+        return evicted
+
+    def get(self, key):
+        """Returns the cached (title, question, options) for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, poll = entry
+                if self._is_fresh(created_at):
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    _lookups.labels(current_owner() or "", "memory").inc()
+                    return poll[0], poll[1], list(poll[2])
+                del self._entries[key]
+                self._stats["expired"] += 1
+            on_disk = key in self._disk_keys
+
+        disk_entry = self._read_disk(key) if on_disk else None
+        if disk_entry is not None:
+            created_at, poll = disk_entry
+            if self._is_fresh(created_at):
+                with self._lock:
+                    self._store_memory(key, created_at, poll) # Promote into the memory tier
+                    self._stats["disk_hits"] += 1
+                _lookups.labels(current_owner() or "", "disk").inc()
+                return poll[0], poll[1], list(poll[2])
+            self._drop_disk(key)
+            with self._lock:
+                self._stats["expired"] += 1
+
+        with self._lock:
+            self._stats["misses"] += 1
+        _lookups.labels(current_owner() or "", "miss").inc()
+        return None
+
+    def _store_memory(self, key, created_at, poll):
+        self._entries[key] = (created_at, poll)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def put(self, key, title, question, options):
+        """Stores a generated poll in both tiers."""
+        poll = (title, question, list(options))
+        created_at = time.time()
+        evicted = []
+        with self._lock:
+            self._store_memory(key, created_at, poll)
+            self._stats["writes"] += 1
+            if self.disk_dir:
+                self._disk_keys[key] = True
+                self._disk_keys.move_to_end(key)
+                evicted = self._evict_disk_keys()
+        if self.disk_dir:
+            self._write_disk(key, created_at, poll)
+            for old_key in evicted:
+                self._remove_disk(old_key)
+
+    def clear(self):
+        """Drops every entry from both tiers."""
+        with self._lock:
+            keys = set(self._entries) | set(self._disk_keys)
+            self._entries.clear()
+            self._disk_keys.clear()
+        if self.disk_dir:
+            try:
+                keys.update(name[:-5] for name in os.listdir(self.disk_dir) if name.endswith(".json"))
+            except OSError:
+                pass
+            for key in keys:
+                self._remove_disk(key)
+
+    def stats(self):
+        """Returns hit/miss counters plus the derived hit ratio."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def get_poll_cache():
+    """Returns the shared poll cache, or None when caching is disabled in config."""
+    global _poll_cache
+    if not config.get_config("POLL_CACHE_ENABLED"):
+        return None
+    with _poll_cache_lock:
+        if _poll_cache is None:
+            _poll_cache = PollCache(
+                max_entries=config.get_config_with_default("POLL_CACHE_SIZE", 128),
+                ttl=config.get_config_with_default("POLL_CACHE_TTL", 900),
+                disk_dir=config.get_config("POLL_CACHE_DIR"),
+            )
+            logger.info(f"Poll cache initialized (size={_poll_cache.max_entries}, ttl={_poll_cache.ttl}s, disk={_poll_cache.disk_dir or 'off'})")
+    return _poll_cache
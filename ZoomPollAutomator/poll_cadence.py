@@ -0,0 +1,166 @@
+# poll_cadence.py
+import logging
+import threading
+import time
+from collections import deque
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_decisions = metrics.counter("zoompoll_cadence_decisions_total", "Poll cadence decisions by reason.",
+                             ("meeting", "decision", "reason"))
+
+MAX_PENDING_WORDS = 1200 # Oldest speech is dropped from the next poll's transcript beyond this
+
+
+class CadenceDecision:
+    """One decision of a CadenceController, kept for tuning."""
+
+    __slots__ = ("at", "fire", "reason", "words", "novel_words", "since_poll", "latency")
+
+    def __init__(self, at, fire, reason, words, novel_words, since_poll, latency):
+        self.at = at
+        self.fire = fire
+        self.reason = reason
+        self.words = words
+        self.novel_words = novel_words
+        self.since_poll = since_poll
+        self.latency = latency
+
+    def as_dict(self):
+        return {"fire": self.fire, "reason": self.reason, "words": self.words, "novel_words": self.novel_words,
+                "since_poll_seconds": self.since_poll, "latency_seconds": self.latency}
+
+
+class CadenceController:
+    """
+    Decides when a meeting's next poll is generated, instead of one poll per segment.
+
+    Transcribed segments accumulate as the meeting's pending speech. Segments that the
+    novelty gate found unchanged since the last poll count towards the pending words but
+    not towards the novel words. After each segment decide() fires when:
+    - at least min_interval seconds will have passed by the time the poll lands (the
+      measured record-to-post latency is subtracted, so polls land on the bound), and
+    - at least min_new_words novel words were spoken, and
+    - the pipeline has capacity (transcription is keeping up and generation isn't queued).
+    Once max_interval has passed, any new speech fires regardless of novelty and load.
+    """
+
+    def __init__(self, meeting_id, min_interval=60.0, max_interval=300.0, min_new_words=60, ewma_alpha=0.3):
+        self.meeting_id = str(meeting_id)
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.min_new_words = max(1, int(min_new_words))
+        self.ewma_alpha = ewma_alpha
+        self._pending = deque() # (text, words)
+        self._words = 0
+        self._novel_words = 0
+        self._last_poll = time.monotonic() # The meeting's start counts as the last poll
+        self._latency = None # EWMA of record-to-post seconds
+        self._decisions = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._stats = {"segments": 0, "decisions": 0, "fired": 0, "held": 0, "forced": 0}
+
+    def add_speech(self, text, novel=True):
+        """Adds a transcribed segment to the speech the next poll will be about."""
+        words = len(text.split())
+        if not words:
+            return
+        with self._lock:
+            self._pending.append((text, words))
+            self._words += words
+            if novel:
+                self._novel_words += words
+            while self._words > MAX_PENDING_WORDS and len(self._pending) > 1:
+                self._words -= self._pending.popleft()[1]
+            self._stats["segments"] += 1
+
+    def pending_text(self):
+        """Speech since the last poll (most recent MAX_PENDING_WORDS words)."""
+        with self._lock:
+            return " ".join(text for text, _ in self._pending)
+
+    def decide(self, busy=False, now=None):
+        """
+        Decides whether to generate the meeting's poll now; the decision is logged.
+
+        Args:
+            busy (bool): Segments are waiting for transcription or generation is saturated.
+
+        Returns:
+            CadenceDecision: .fire is True to poll now.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            since = now - self._last_poll
+            latency = self._latency or 0.0
+            if not self._words:
+                fire, reason = False, "no new speech"
+            elif since >= self.max_interval:
+                fire, reason = True, "max interval reached"
+                self._stats["forced"] += 1
+            elif since + latency < self.min_interval:
+                fire, reason = False, "min interval"
+            elif self._novel_words < self.min_new_words:
+                fire, reason = False, "not enough new material"
+            elif busy:
+                fire, reason = False, "pipeline busy"
+            else:
+                fire, reason = True, "enough new material"
+            decision = CadenceDecision(now, fire, reason, self._words, self._novel_words, since, latency)
+            self._decisions.append(decision)
+            self._stats["decisions"] += 1
+            self._stats["fired" if fire else "held"] += 1
+        _decisions.labels(self.meeting_id, "poll" if fire else "wait", reason).inc()
+        logger.info(f"Cadence {self.meeting_id}: {'poll' if fire else 'wait'} - {reason} "
+                    f"({decision.words} words, {decision.novel_words} novel, {since:.0f}s since last poll, "
+                    f"~{latency:.0f}s latency)")
+        return decision
+
+    def polled(self, latency=None, now=None):
+        """
+        Starts the next interval after a poll was generated for the pending speech.
+
+        Args:
+            latency (float, optional): Seconds from the end of the newest segment's recording
+                to the poll being handed to Zoom.
+        """
+        with self._lock:
+            self._last_poll = time.monotonic() if now is None else now
+            self._pending.clear()
+            self._words = 0
+            self._novel_words = 0
+            if latency is not None:
+                self._latency = latency if self._latency is None \
+                    else self._latency + self.ewma_alpha * (latency - self._latency)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(min_interval=self.min_interval, max_interval=self.max_interval,
+                         min_new_words=self.min_new_words, pending_words=self._words,
+                         novel_words=self._novel_words, latency_seconds=self._latency or 0.0,
+                         since_poll_seconds=time.monotonic() - self._last_poll,
+                         recent=[decision.as_dict() for decision in self._decisions])
+        return stats
+
+
+def create_cadence_controller(meeting_id, min_interval=None, max_interval=None):
+    """
+    Returns a cadence controller for a meeting, or None when POLL_CADENCE_ENABLED is off
+    (one poll per novel segment).
+
+    Args:
+        min_interval (float, optional): Meeting's own bound; defaults to POLL_MIN_INTERVAL.
+        max_interval (float, optional): Meeting's own bound; defaults to POLL_MAX_INTERVAL.
+    """
+    if not config.get_config_with_default("POLL_CADENCE_ENABLED", True):
+        return None
+    return CadenceController(
+        meeting_id,
+        min_interval=min_interval if min_interval is not None else config.get_config_with_default("POLL_MIN_INTERVAL", 60),
+        max_interval=max_interval if max_interval is not None else config.get_config_with_default("POLL_MAX_INTERVAL", 300),
+        min_new_words=config.get_config_with_default("POLL_MIN_NEW_WORDS", 60),
+    )
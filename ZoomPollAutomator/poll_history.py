@@ -0,0 +1,81 @@
+# poll_history.py
+import logging
+import threading
+
+import config
+from minhash import LshIndex, MinHasher, shingle_set
+
+logger = logging.getLogger(__name__)
+
+_NUM_PERM = 128
+_hasher = MinHasher(num_perm=_NUM_PERM) # Shared so every meeting's signatures are comparable
+
+_histories = {} # meeting_id -> PollHistory
+_histories_lock = threading.Lock()
+
+
+def _poll_text(question: str, options: list[str]) -> str:
+    return " ".join([question] + list(options))
+
+
+class PollHistory:
+    """Index of the polls already posted to one meeting, for near-duplicate detection."""
+
+    def __init__(self, threshold=0.6):
+        self.threshold = float(threshold)
+        self._index = LshIndex(num_perm=_NUM_PERM, bands=32)
+        self._polls = [] # (title, question, options) in posting order
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "duplicates": 0}
+
+    def find_duplicate(self, question: str, options: list[str]):
+        """
+        Looks for an earlier poll that is nearly the same as the candidate.
+
+        Returns:
+            tuple: (earlier_poll, similarity) for the closest match, or None.
+        """
+        shingles = shingle_set(_poll_text(question, options))
+        with self._lock:
+            self._stats["checks"] += 1
+        if not shingles:
+            return None # Nothing to compare; empty signatures would all match each other
+        signature = _hasher.signature(shingles)
+        with self._lock:
+            matches = self._index.query(signature, self.threshold)
+            if not matches:
+                return None
+            self._stats["duplicates"] += 1
+            poll_number, similarity = matches[0]
+            return self._polls[poll_number], similarity
+
+    def add(self, title: str, question: str, options: list[str]):
+        """Records a poll that was posted to the meeting."""
+        shingles = shingle_set(_poll_text(question, options))
+        signature = _hasher.signature(shingles) if shingles else None
+        with self._lock:
+            if signature is not None:
+                self._index.add(len(self._polls), signature)
+            self._polls.append((title, question, list(options)))
+
+    def questions(self) -> list[str]:
+        with self._lock:
+            return [poll[1] for poll in self._polls]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["posted"] = len(self._polls)
+        return stats
+
+
+def get_poll_history(meeting_id):
+    """Returns the posted-poll history for a meeting, or None when duplicate checks are disabled."""
+    if not config.get_config("POLL_DEDUP_ENABLED"):
+        return None
+    with _histories_lock:
+        history = _histories.get(meeting_id)
+        if history is None:
+            history = PollHistory(threshold=config.get_config_with_default("POLL_DEDUP_THRESHOLD", 0.6))
+            _histories[meeting_id] = history
+    return history
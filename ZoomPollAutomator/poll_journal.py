@@ -0,0 +1,157 @@
+# poll_journal.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+GENERATED = "generated"
+POSTING = "posting"
+POSTED = "posted"
+FAILED = "failed"
+OPEN_STATES = (GENERATED, POSTING)
+
+_journal = None
+_journal_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    poll_key TEXT NOT NULL,
+    meeting_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    ts REAL NOT NULL,
+    payload TEXT,
+    zoom_poll_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS poll_events_key ON poll_events (poll_key, seq);
+"""
+
+
+class PollJournal:
+    """
+    Append-only SQLite log of poll lifecycle states: generated -> posting -> posted | failed.
+
+    Every state change is one INSERT in WAL mode, so a crash loses at most the change being
+    written. The latest row per poll tells the outbox, on restart, which polls never made it
+    to Zoom ("generated") and which may have (an interrupted "posting"), so the latter can be
+    checked against the meeting's polls before posting again.
+    """
+
+    def __init__(self, path, retention_seconds=7 * 86400):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL in WAL mode survives a process crash; only an OS crash can lose the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._stats = {"writes": 0, "write_seconds": 0.0, "max_write_seconds": 0.0}
+        self._prune(retention_seconds)
+
+    def _prune(self, retention_seconds):
+        """Drops finished polls older than the retention window so the file stays small."""
+        cutoff = time.time() - retention_seconds
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM poll_events WHERE poll_key IN ("
+                " SELECT poll_key FROM poll_events GROUP BY poll_key"
+                " HAVING MAX(ts) < ? AND MAX(CASE WHEN state IN (?, ?) THEN 1 ELSE 0 END) = 1)",
+                (cutoff, POSTED, FAILED)).rowcount
+        if deleted:
+            logger.info(f"Pruned {deleted} old poll journal entries")
+
+    def record(self, poll_key, state, meeting_id, payload=None, zoom_poll_id=None, error=None):
+        """
+        Appends one lifecycle state for a poll.
+
+        Args:
+            poll_key (str): Stable id of the poll across restarts.
+            state (str): GENERATED, POSTING, POSTED or FAILED.
+            meeting_id (str): Zoom meeting ID.
+            payload (dict, optional): Poll content; written with GENERATED so the poll can be rebuilt.
+            zoom_poll_id (str, optional): Id Zoom assigned, with POSTED.
+            error (str, optional): Failure reason, with FAILED.
+        """
+        row = (poll_key, str(meeting_id), state, time.time(),
+               json.dumps(payload, ensure_ascii=False) if payload is not None else None, zoom_poll_id, error)
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                self._conn.execute("INSERT INTO poll_events (poll_key, meeting_id, state, ts, payload, zoom_poll_id, error)"
+                                   " VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            except sqlite3.Error as e:
+                # The journal protects against duplicates after a crash; it must never stop posting
+                logger.warning(f"⚠️ Failed to journal poll {poll_key} as {state}: {e}")
+                return
+            elapsed = time.perf_counter() - started
+            self._stats["writes"] += 1
+            self._stats["write_seconds"] += elapsed
+            self._stats["max_write_seconds"] = max(self._stats["max_write_seconds"], elapsed)
+
+    def open_polls(self):
+        """
+        Polls whose latest state is GENERATED or POSTING, oldest first.
+
+        Returns:
+            list[dict]: poll_key, meeting_id, state, created_ts (wall clock) and payload.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.poll_key, e.meeting_id, e.state, g.ts, g.payload FROM poll_events e"
+                " JOIN (SELECT poll_key, MAX(seq) AS seq FROM poll_events GROUP BY poll_key) last"
+                "   ON e.seq = last.seq"
+                " JOIN (SELECT poll_key, MIN(seq) AS seq FROM poll_events"
+                "       WHERE state = ? AND payload IS NOT NULL GROUP BY poll_key) first"
+                "   ON first.poll_key = e.poll_key"
+                " JOIN poll_events g ON g.seq = first.seq"
+                " WHERE e.state IN (?, ?) ORDER BY g.seq",
+                (GENERATED, *OPEN_STATES)).fetchall()
+        polls = []
+        for poll_key, meeting_id, state, created_ts, payload in rows:
+            try:
+                polls.append({"poll_key": poll_key, "meeting_id": meeting_id, "state": state,
+                              "created_ts": created_ts, "payload": json.loads(payload)})
+            except ValueError:
+                logger.warning(f"Skipping unreadable journal payload for poll {poll_key}")
+        return polls
+
+    def history(self, poll_key):
+        """Every state recorded for one poll, oldest first."""
+        with self._lock:
+            return self._conn.execute("SELECT state, ts, zoom_poll_id, error FROM poll_events"
+                                      " WHERE poll_key = ? ORDER BY seq", (poll_key,)).fetchall()
+
+    def stats(self):
+        """Write counts plus average and worst write time per state change."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_write_seconds"] = stats["write_seconds"] / stats["writes"] if stats["writes"] else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_poll_journal():
+    """Returns the shared poll journal, or None when POLL_JOURNAL_PATH is empty."""
+    global _journal
+    path = config.get_config("POLL_JOURNAL_PATH")
+    if not path:
+        return None
+    with _journal_lock:
+        if _journal is None:
+            try:
+                _journal = PollJournal(path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"⚠️ Poll journal unavailable ({e}); posting without crash recovery")
+                return None
+    return _journal
@@ -0,0 +1,88 @@
+# poll_scoring.py
+from text_vectors import tokenize
+
+# Relative weight of each quality signal in the final score
+SCORE_WEIGHTS = {
+    "validity": 0.35,
+    "distinctness": 0.25,
+    "grounding": 0.25,
+    "question_length": 0.15,
+}
+
+IDEAL_QUESTION_WORDS = (6, 25)
+
+
+def _validity(poll_data) -> float:
+    """1.0 for a complete poll with exactly four non-empty options, partial credit otherwise."""
+    if not isinstance(poll_data, dict):
+        return 0.0
+    score = 0.0
+    if isinstance(poll_data.get("title"), str) and poll_data["title"].strip():
+        score += 0.2
+    if isinstance(poll_data.get("question"), str) and poll_data["question"].strip():
+        score += 0.3
+    options = poll_data.get("options")
+    if isinstance(options, list):
+        usable = [opt for opt in options if isinstance(opt, str) and opt.strip()]
+        score += 0.5 * min(len(usable), 4) / 4
+        if len(options) != 4:
+            score -= 0.1 # Will need padding or truncation before posting
+    return max(score, 0.0)
+
+
+def _distinctness(options) -> float:
+    """1 minus the highest pairwise word overlap (Jaccard) between options."""
+    token_sets = [set(tokenize(opt, drop_stopwords=False)) for opt in options if isinstance(opt, str)]
+    token_sets = [tokens for tokens in token_sets if tokens]
+    if len(token_sets) < 2:
+        return 0.0
+    worst = 0.0
+    for i in range(len(token_sets)):
+        for j in range(i + 1, len(token_sets)):
+            overlap = len(token_sets[i] & token_sets[j]) / len(token_sets[i] | token_sets[j])
+            worst = max(worst, overlap)
+    return 1.0 - worst
+
+
+def _grounding(poll_data, transcript_tokens: set) -> float:
+    """Fraction of the poll's content words that also occur in the transcript."""
+    text = " ".join([poll_data.get("question") or ""] + [opt for opt in poll_data.get("options") or [] if isinstance(opt, str)])
+    tokens = tokenize(text)
+    if not tokens:
+        return 0.0
+    return sum(1 for token in tokens if token in transcript_tokens) / len(tokens)
+
+
+def _question_length(question) -> float:
+    """1.0 inside the ideal word range, decaying linearly outside it; small bonus for a '?'."""
+    if not isinstance(question, str) or not question.strip():
+        return 0.0
+    words = len(question.split())
+    low, high = IDEAL_QUESTION_WORDS
+    if words < low:
+        score = words / low
+    elif words > high:
+        score = max(0.0, 1.0 - (words - high) / high)
+    else:
+        score = 1.0
+    return 0.9 * score + (0.1 if question.strip().endswith("?") else 0.0)
+
+
+def score_poll(poll_data, transcript: str) -> tuple[float, dict]:
+    """
+    Scores a parsed poll candidate against the transcript it was generated from.
+
+    Returns:
+        tuple: (score in [0, 1], per-signal breakdown).
+    """
+    if not isinstance(poll_data, dict):
+        return 0.0, {name: 0.0 for name in SCORE_WEIGHTS}
+    options = poll_data.get("options") if isinstance(poll_data.get("options"), list) else []
+    breakdown = {
+        "validity": _validity(poll_data),
+        "distinctness": _distinctness(options),
+        "grounding": _grounding(poll_data, set(tokenize(transcript))),
+        "question_length": _question_length(poll_data.get("question")),
+    }
+    score = sum(SCORE_WEIGHTS[name] * value for name, value in breakdown.items())
+    return score, breakdown
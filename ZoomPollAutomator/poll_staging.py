@@ -0,0 +1,193 @@
+# poll_staging.py
+import logging
+import threading
+import time
+from collections import deque
+
+import config
+from poller import end_zoom_poll, get_zoom_poll_results, launch_zoom_poll
+from token_manager import get_token_manager
+
+logger = logging.getLogger(__name__)
+
+LAUNCH_MODES = ("manual", "immediate", "staged")
+
+_stagers = {} # meeting_id -> PollStager
+_stagers_lock = threading.Lock()
+
+
+class PollStager:
+    """
+    Holds polls that already exist in a Zoom meeting and launches them on demand.
+
+    The outbox creates each poll as soon as it is generated and hands the Zoom poll id to
+    stage(). A trigger (timer, the /polls/launch endpoint or the GUI button) then only has
+    to send the launch PUT, so trigger-to-visible latency is one small request. The newest
+    staged poll is launched first since it matches the current discussion; older ones stay
+    staged (up to max_staged) for later triggers. In "immediate" mode every staged poll is
+    launched as soon as it is created.
+    """
+
+    def __init__(self, meeting_id, mode="staged", max_staged=3, launch_interval=0, auto_end_seconds=0,
+                 token_provider=None):
+        self.meeting_id = meeting_id
+        self.mode = mode
+        self.launch_interval = launch_interval
+        self.auto_end_seconds = auto_end_seconds
+        self.token_provider = token_provider or (lambda: get_token_manager().get_token())
+        self._staged = deque(maxlen=max(1, int(max_staged))) # (poll_id, title, staged_at)
+        self._active = None # poll_id currently launched
+        self._lock = threading.Lock()
+        self._launch_lock = threading.Lock() # One launch at a time so two triggers can't race
+        self._stop_event = threading.Event()
+        self._timer_thread = None
+        self._stats = {"staged": 0, "launched": 0, "launch_failures": 0, "ended": 0, "empty_triggers": 0,
+                       "launch_seconds": 0.0, "max_launch_seconds": 0.0, "stage_to_launch_seconds": 0.0}
+
+    def stage(self, poll_id, title=None):
+        """Adds a created (not yet launched) poll; launches it right away in immediate mode."""
+        if not poll_id:
+            return
+        with self._lock:
+            if len(self._staged) == self._staged.maxlen:
+                dropped = self._staged[0]
+                logger.info(f"Staged poll '{dropped[1]}' superseded by newer polls; it stays in Zoom unlaunched")
+            self._staged.append((poll_id, title, time.monotonic()))
+            self._stats["staged"] += 1
+        logger.info(f"🗂️ Poll '{title}' staged for meeting {self.meeting_id} (Zoom poll {poll_id})")
+        if self.mode == "immediate":
+            self.launch_next("immediate")
+
+    def launch_next(self, trigger="manual"):
+        """
+        Launches the newest staged poll, ending the previously launched one first.
+
+        Args:
+            trigger (str): What asked for the launch, for the log.
+
+        Returns:
+            str or None: Launched Zoom poll id, or None if nothing was staged or the launch failed.
+        """
+        with self._launch_lock:
+            with self._lock:
+                if not self._staged:
+                    self._stats["empty_triggers"] += 1
+                    logger.info(f"Launch trigger ({trigger}) for meeting {self.meeting_id}: no staged poll")
+                    return None
+                poll_id, title, staged_at = self._staged.pop()
+                previous = self._active
+            # Timed from the trigger, so ending the previous poll counts toward trigger-to-visible
+            started = time.monotonic()
+            token = self.token_provider()
+            if previous is not None:
+                self._end(previous, token) # Zoom shows one poll at a time
+            launched = launch_zoom_poll(self.meeting_id, poll_id, token)
+            elapsed = time.monotonic() - started
+            with self._lock:
+                if not launched:
+                    self._stats["launch_failures"] += 1
+                    self._staged.append((poll_id, title, staged_at)) # Keep it for the next trigger
+                    return None
+                self._active = poll_id
+                self._stats["launched"] += 1
+                self._stats["launch_seconds"] += elapsed
+                self._stats["max_launch_seconds"] = max(self._stats["max_launch_seconds"], elapsed)
+                self._stats["stage_to_launch_seconds"] += started - staged_at
+        logger.info(f"🚀 Launched poll '{title}' in meeting {self.meeting_id} on {trigger} trigger "
+                    f"({elapsed * 1000:.0f} ms trigger-to-visible)")
+        if self.auto_end_seconds > 0:
+            timer = threading.Timer(self.auto_end_seconds, self.end_active, kwargs={"poll_id": poll_id})
+            timer.daemon = True
+            timer.start()
+        return poll_id
+
+    def _end(self, poll_id, token):
+        if end_zoom_poll(self.meeting_id, poll_id, token):
+            with self._lock:
+                self._stats["ended"] += 1
+                if self._active == poll_id:
+                    self._active = None
+            return True
+        return False
+
+    def end_active(self, poll_id=None):
+        """
+        Ends the launched poll (only if it is still poll_id, when given).
+
+        Returns:
+            bool: True if a poll was ended.
+        """
+        with self._launch_lock:
+            with self._lock:
+                active = self._active
+            if active is None or (poll_id is not None and active != poll_id):
+                return False
+            return self._end(active, self.token_provider())
+
+    def note_launched(self, poll_id):
+        """Records a launch reported by Zoom (e.g. the host launched a poll by hand)."""
+        with self._lock:
+            self._active = poll_id
+            self._staged = deque((entry for entry in self._staged if entry[0] != poll_id), maxlen=self._staged.maxlen)
+
+    def note_ended(self, poll_id):
+        """Records that Zoom ended a poll, so the next launch doesn't try to end it again."""
+        with self._lock:
+            if self._active == poll_id:
+                self._active = None
+
+    def results(self):
+        """Tallied answers for the meeting's polls; see poller.get_zoom_poll_results."""
+        return get_zoom_poll_results(self.meeting_id, self.token_provider())
+
+    def start_timer(self):
+        """Launches the newest staged poll every launch_interval seconds until stop()."""
+        if self.launch_interval <= 0 or self._timer_thread is not None:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(self.launch_interval):
+                self.launch_next("timer")
+
+        self._timer_thread = threading.Thread(target=run, name=f"poll-launch-{self.meeting_id}", daemon=True)
+        self._timer_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._timer_thread = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._staged)
+            stats["active_poll_id"] = self._active
+        launched = stats["launched"]
+        stats["avg_launch_seconds"] = stats["launch_seconds"] / launched if launched else 0.0
+        stats["avg_stage_to_launch_seconds"] = stats["stage_to_launch_seconds"] / launched if launched else 0.0
+        return stats
+
+
+def get_poll_stager(meeting_id):
+    """Returns the meeting's poll stager, or None when POLL_LAUNCH_MODE is "manual" (host launches polls)."""
+    mode = config.get_config_with_default("POLL_LAUNCH_MODE", "manual")
+    if mode not in LAUNCH_MODES:
+        logger.warning(f"Unknown POLL_LAUNCH_MODE '{mode}'; leaving polls for the host to launch")
+        return None
+    if mode == "manual":
+        return None
+    with _stagers_lock:
+        stager = _stagers.get(meeting_id)
+        if stager is None:
+            stager = PollStager(meeting_id, mode=mode,
+                                max_staged=config.get_config_with_default("POLL_STAGED_MAX", 3),
+                                launch_interval=config.get_config_with_default("POLL_LAUNCH_INTERVAL", 0),
+                                auto_end_seconds=config.get_config_with_default("POLL_AUTO_END_SECONDS", 0))
+            _stagers[meeting_id] = stager
+    return stager
+
+
+def active_stagers():
+    """Stagers created so far, keyed by meeting ID."""
+    with _stagers_lock:
+        return dict(_stagers)
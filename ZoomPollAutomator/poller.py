@@ -1,35 +1,63 @@
 # poller.py
+import contextvars
 import json
 import requests
 import re
-# Using openai library which can interface with Ollama's API
-from openai import OpenAI
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import logging
 import config # Import config to get Ollama host and Zoom token
+import metrics
+from deadline_scheduler import DeadlineMissed, current_owner, get_scheduler
+from extractive_poll import generate_extractive_poll
+from llm_backends import POLL_JSON_SCHEMA, GenerationCancelled, OllamaBackend, get_llm_backend
+from poll_cache import get_poll_cache, make_cache_key
+from poll_scoring import score_poll
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
 
 logger = logging.getLogger(__name__)
 
-# Using the OpenAI client for compatibility with Ollama's API
-# The base_url is set to the Ollama host from config
-ollama_client = None # Initialize later to use config
+# Bounded pool for concurrent multi-candidate generation, plus per-N latency totals
+_candidate_executor = None
+_candidate_lock = threading.Lock()
+_candidate_latency = {} # candidate count -> accumulated wall/single-request seconds
+_dispatcher = None
+_poll_sources = Counter() # "llm" / "cache" / "extractive" / "fallback" -> polls produced
+_small_backend = None
+_tier_stats = {} # "small" / "large" -> request, win, cancel counts and completed latency
+_repair_stats = {"attempts": 0, "succeeded": 0, "repair_seconds": 0.0, "full_generation_seconds": 0.0,
+                 "repair_tokens": 0, "full_generation_tokens": 0}
 
+_candidate_wall = metrics.histogram("zoompoll_poll_candidates_seconds",
+                                    "Wall time to generate a round of N poll candidates.", ("candidates",))
+_candidate_single = metrics.histogram("zoompoll_poll_candidate_single_seconds",
+                                      "Median single-request time within a round of N poll candidates.", ("candidates",))
+_repairs = metrics.counter("zoompoll_poll_repairs_total", "Repair requests for incomplete polls, by outcome.",
+                           ("outcome",))
+_repair_seconds = metrics.histogram("zoompoll_poll_repair_seconds",
+                                    "Time spent on a repair request and on the full generation it followed.", ("request",))
+_repair_tokens = metrics.counter("zoompoll_poll_repair_tokens_total",
+                                 "Completion tokens spent on repair requests and on the full generations they followed.",
+                                 ("request",))
+_tier_events = metrics.counter("zoompoll_poll_tier_total", "Tiered generation requests, wins, cancellations and completions.",
+                               ("tier", "event"))
+_tier_seconds = metrics.histogram("zoompoll_poll_tier_seconds", "Completed request time per model tier.", ("tier",))
+_poll_source_total = metrics.counter("zoompoll_poll_source_total", "Polls produced, by where they came from.",
+                                     ("meeting", "source"))
+
+# Follow-up requests only need to produce a handful of fields
+POLL_REPAIR_MAX_TOKENS = 160
 
-def get_ollama_client():
-    """Initializes and returns the Ollama client."""
-    global ollama_client
-    if ollama_client is None:
-        ollama_host_v1 = config.get_config("OLLAMA_HOST") # Get the V1 API endpoint from config
-        if not ollama_host_v1:
-             logger.error("Ollama host is not configured. Cannot create Ollama client.")
-             return None
-        try:
-            ollama_client = OpenAI(base_url=ollama_host_v1, api_key="ollama") # api_key can be anything for Ollama
-            logger.info(f"Ollama client initialized with base_url: {ollama_host_v1}")
-        except Exception as e:
-            logger.error(f"Error initializing Ollama client with base_url {ollama_host_v1}: {e}", exc_info=True)
-            return None
-    return ollama_client
 
+# Sampling temperature for poll generation
+POLL_TEMPERATURE = 0.7
+
+# Bump whenever POLL_PROMPT changes so cached polls from the old prompt are not reused
+POLL_PROMPT_VERSION = "1"
 
 # Poll prompt - Keep the same effective prompt
 POLL_PROMPT = """
@@ -78,6 +106,96 @@ Transcript:
 [Insert transcript here]
 """
 
+# Static part of POLL_PROMPT shared by every request (backends may keep its KV state)
+POLL_PROMPT_PREFIX = POLL_PROMPT.split("[Insert transcript here]")[0]
+
+# Appended after the transcript so POLL_PROMPT_PREFIX stays a shared prefix
+POLL_SUMMARY_CONTEXT = """
+
+Earlier in this meeting (running summary, for context only - base the poll on the transcript above):
+{summary}
+"""
+
+# Per-meeting guidance (e.g. "quiz on the lecture's formulas"), also kept after the shared prefix
+POLL_INSTRUCTIONS_CONTEXT = """
+
+Additional instructions from the host for this meeting's polls:
+{instructions}
+"""
+
+# Output budget per question in multi-question mode
+MULTI_POLL_TOKENS_PER_QUESTION = 250
+
+MULTI_POLL_PROMPT = """
+You are an expert meeting assistant. Based solely on the meeting transcript below, create one poll
+with a short, engaging title and exactly {count} questions. Each question must cover a different
+key point, decision or debate from the discussion, and each must have exactly four distinct answer
+options taken or closely paraphrased from what participants said. Never invent content that is not
+in the transcript.
+
+Reply with JSON only, in this format:
+{{"title": "Engaging Title", "questions": [{{"question": "Specific Question?", "options": ["Statement 1", "Statement 2", "Statement 3", "Statement 4"]}}]}}
+Transcript:
+{transcript}
+"""
+
+
+def _multi_poll_schema(count):
+    return {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"question": {"type": "string"},
+                                   "options": POLL_JSON_SCHEMA["properties"]["options"]},
+                    "required": ["question", "options"],
+                },
+                "minItems": count,
+                "maxItems": count,
+            },
+        },
+        "required": ["title", "questions"],
+    }
+
+
+MEETING_SUMMARY_MAX_TOKENS = 300
+
+MEETING_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": "array", "items": {"type": "string"}} for field in ("topics", "positions", "decisions")},
+    "required": ["topics", "positions", "decisions"],
+}
+
+MEETING_SUMMARY_PROMPT = """
+You maintain a running summary of a meeting. This is the summary so far, as JSON:
+{summary}
+
+Update it with the new part of the discussion below. Keep at most {max_items} short items per list,
+merging related items and dropping the least important ones. Use only what was said.
+- "topics": key topics discussed
+- "positions": positions or opinions participants expressed
+- "decisions": decisions or agreements reached
+
+Reply with a JSON object containing exactly these three lists and nothing else.
+New discussion:
+{segment}
+"""
+
+POLL_REPAIR_PROMPT = """
+You are completing a partially generated meeting poll. This is the poll so far, as JSON:
+{partial}
+
+Provide ONLY these missing fields, based strictly on the transcript below:
+{fields}
+
+Reply with a JSON object containing only those fields and nothing else.
+Transcript:
+{transcript}
+"""
+
 def extract_json_from_text(text):
     """
     Extracts JSON from text that might contain markdown or other text.
@@ -114,23 +232,605 @@ def extract_json_from_text(text):
         return None
 
 
-def generate_poll_from_transcript(transcript: str) -> tuple[str, str, list[str]]:
+def _parse_poll_response(raw_response):
+    """
+    Parses a raw LLM response into a poll dict.
+
+    Returns:
+        dict: Poll data with title/question/options, or None if the response is unusable.
+    """
+    # Try to extract and parse JSON from the response
+    poll_data = extract_json_from_text(raw_response)
+
+    # If we couldn't extract or parse JSON successfully
+    if poll_data is None:
+        logger.warning("⚠️ Failed to extract or parse JSON from LLM response.")
+        # Try a basic parse as a fallback, in case extract_json_from_text was too strict
+        try:
+             poll_data = json.loads(raw_response)
+             logger.info("Successfully parsed raw response directly as JSON.")
+             # Basic validation for expected keys and structure
+             if not (isinstance(poll_data, dict) and
+                     "title" in poll_data and isinstance(poll_data["title"], str) and
+                     "question" in poll_data and isinstance(poll_data["question"], str) and
+                     "options" in poll_data and isinstance(poll_data["options"], list) and
+                     len(poll_data["options"]) >= 1 and all(isinstance(opt, str) for opt in poll_data["options"])):
+                  logger.warning("Directly parsed JSON does not match expected poll structure.")
+                  poll_data = None # Treat as invalid if structure is wrong
+
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ JSON parsing error on raw response:[/] {e}")
+            logger.debug(f"Raw response that failed JSON parse: {raw_response[:200]}...")
+            poll_data = None # Ensure poll_data is None on error
+
+    return poll_data
+
+
+def _load_json_object(raw_response):
+    """Parses the response, or the outermost {...} inside it, as a JSON object. Returns None otherwise."""
+    data = None
+    try:
+        data = json.loads(raw_response)
+    except (json.JSONDecodeError, TypeError):
+        match = re.search(r'\{.*\}', raw_response or "", re.DOTALL)
+        if match:
+            try:
+                data = json.loads(match.group(0))
+            except json.JSONDecodeError:
+                data = None
+    return data if isinstance(data, dict) else None
+
+
+def _extract_partial_poll(raw_response):
+    """
+    Salvages whatever valid poll fields a response contains, even if the poll is incomplete.
+
+    Returns:
+        dict: Subset of title/question/options that are usable (possibly empty).
+    """
+    data = _load_json_object(raw_response)
+    if data is None:
+        return {}
+
+    partial = {}
+    for key in ("title", "question"):
+        if isinstance(data.get(key), str) and data[key].strip():
+            partial[key] = data[key].strip()
+    if isinstance(data.get("options"), list):
+        options = [opt.strip() for opt in data["options"] if isinstance(opt, str) and opt.strip()]
+        if options:
+            partial["options"] = options
+    return partial
+
+
+def _missing_poll_fields(partial):
+    """Returns (missing field names, number of options still needed)."""
+    missing = [key for key in ("title", "question") if key not in partial]
+    options_needed = max(0, 4 - len(partial.get("options", [])))
+    if options_needed:
+        missing.append("options")
+    return missing, options_needed
+
+
+def _get_dispatcher():
+    """
+    Returns the shared generation scheduler, sized to OLLAMA_NUM_PARALLEL per host.
+
+    At most that many requests are in flight, so bursts from meetings whose segments end
+    together wait in the scheduler (earliest next-poll deadline first) instead of inside Ollama.
+    """
+    global _dispatcher
+    with _candidate_lock:
+        if _dispatcher is None:
+            if (config.get_config("LLM_BACKEND") or "ollama").lower() == "llama_cpp":
+                capacity = 1 # One in-process model serializes its own calls
+            else:
+                capacity = max(1, config.get_config_with_default("OLLAMA_NUM_PARALLEL", 4)) * len(config.get_ollama_hosts())
+            _dispatcher = get_scheduler("generation", capacity)
+    return _dispatcher
+
+
+def dispatcher_stats():
+    """Queue depth, shed counts and deadline misses (overall and per meeting), or None before the first generation."""
+    return _dispatcher.stats() if _dispatcher is not None else None
+
+
+def _submit_poll_request(backend, prompt, deadline, json_schema=POLL_JSON_SCHEMA, max_tokens=800,
+                         temperature=POLL_TEMPERATURE, owner=None):
+    """
+    Queues one poll generation request on the dispatcher.
+
+    owner names the meeting or source the request runs for when the caller isn't inside a
+    job_owner() block (e.g. a summary worker thread); stopping it cancels the request.
+
+    Returns:
+        tuple: (future, cancel_event). Setting cancel_event stops the request mid-generation.
+    """
+    cancel_event = threading.Event()
+
+    def request():
+        # Request poll from the backend, constrained to the poll schema where supported
+        completion = backend.complete(prompt, temperature, max_tokens, json_schema=json_schema,
+                                      cancel_event=cancel_event)
+        return completion, time.monotonic() # Finish time, since results may be collected later
+
+    # A stopped meeting cancels its jobs (deadline_scheduler.cancel_jobs), which sets cancel_event
+    return _get_dispatcher().submit(request, deadline, owner=owner, cancel_event=cancel_event), cancel_event
+
+
+def _await_poll_request(backend, future, cancel_event, deadline, started, full_poll=True):
+    """
+    Waits for a submitted request until the deadline and parses its response.
+
+    With full_poll False (repairs, which return only some fields) just the partial
+    fields are extracted.
+
+    Returns:
+        dict: "poll" (parsed poll or None), "partial" (salvageable fields), "text" (raw response), "seconds",
+              "completion_tokens" (None if the backend doesn't report usage), "error",
+              "shed" (True if the request was dropped or abandoned to meet the deadline)
+              and "model".
+    """
+    result = {"poll": None, "partial": {}, "text": None, "seconds": 0.0, "completion_tokens": None, "error": None,
+              "shed": False, "model": backend.model_id}
+    try:
+        completion, finished = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        result["seconds"] = finished - started
+        raw_response = result["text"] = completion.text
+        logger.info(f"📥 {backend.name} ({backend.model_id}) raw response received ({len(raw_response)} chars). Attempting to parse JSON.")
+        logger.debug(f"Raw LLM response: {raw_response}")
+        if full_poll:
+            result["poll"] = _parse_poll_response(raw_response)
+        result["partial"] = _extract_partial_poll(raw_response)
+        result["completion_tokens"] = completion.completion_tokens
+    except DeadlineMissed as e:
+        logger.warning(f"⏱️ Poll generation request shed: {e}")
+        result["error"] = e
+        result["shed"] = True
+    except FutureTimeoutError as e:
+        # Stop the generation so it frees its dispatcher slot instead of finishing unused
+        logger.warning(f"⏱️ Poll generation request to {backend.model_id} missed the latency budget; cancelling it.")
+        cancel_event.set()
+        future.cancel()
+        result["error"] = e
+        result["shed"] = True
+    except (GenerationCancelled, CancelledError) as e:
+        result["error"] = e
+        result["shed"] = True
+    except Exception as e:
+        logger.error(f"❌ Unexpected error during poll generation: {e}", exc_info=True)
+        result["error"] = e
+    if result["error"] is not None:
+        result["seconds"] = time.monotonic() - started
+    return result
+
+
+def _request_poll_candidate(backend, prompt, deadline):
+    """Sends one poll generation request through the dispatcher and waits for it (see _await_poll_request)."""
+    started = time.monotonic()
+    future, cancel_event = _submit_poll_request(backend, prompt, deadline)
+    return _await_poll_request(backend, future, cancel_event, deadline, started)
+
+
+def _repair_schema(missing, options_needed):
+    """JSON schema covering only the fields the repair request must return."""
+    properties, required = {}, []
+    for key in missing:
+        if key == "options":
+            properties["options"] = {"type": "array", "items": {"type": "string"},
+                                     "minItems": options_needed, "maxItems": options_needed}
+        else:
+            properties[key] = {"type": "string"}
+        required.append(key)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def _request_poll_repair(backend, transcript, partial, deadline):
+    """
+    Asks the model for only the missing poll fields, using the partial poll as context.
+
+    The response is constrained to a schema of just those fields where the backend
+    supports it.
+
+    Returns:
+        tuple: (completed poll dict or None, elapsed seconds, completion tokens or None).
+    """
+    missing, options_needed = _missing_poll_fields(partial)
+    instructions = []
+    if "title" in missing:
+        instructions.append('"title": a short, engaging poll title')
+    if "question" in missing:
+        instructions.append('"question": one specific poll question')
+    if "options" in missing:
+        instructions.append(f'"options": exactly {options_needed} NEW answer option(s), distinct from the existing ones')
+    prompt = POLL_REPAIR_PROMPT.format(
+        partial=json.dumps(partial, ensure_ascii=False),
+        fields="\n".join(f"- {line}" for line in instructions),
+        transcript=transcript,
+    )
+
+    started = time.monotonic()
+    # Low temperature: filling gaps, not being creative. Cancellation and the deadline are
+    # handled as for the full generation, so a late repair frees its slot.
+    future, cancel_event = _submit_poll_request(backend, prompt, deadline,
+                                                json_schema=_repair_schema(missing, options_needed),
+                                                max_tokens=POLL_REPAIR_MAX_TOKENS, temperature=0.2)
+    result = _await_poll_request(backend, future, cancel_event, deadline, started, full_poll=False)
+    if result["error"] is not None:
+        logger.warning(f"⚠️ Poll repair request failed{' (shed for the latency budget)' if result['shed'] else ''}: "
+                       f"{result['error']!r}")
+        return None, time.monotonic() - started, None
+
+    fill = result["partial"]
+    repaired = dict(partial)
+    for key in ("title", "question"):
+        if key in missing and key in fill:
+            repaired[key] = fill[key]
+    if "options" in missing and "options" in fill:
+        existing = {opt.lower() for opt in partial.get("options", [])}
+        new_options = [opt for opt in fill["options"] if opt.lower() not in existing]
+        repaired["options"] = partial.get("options", []) + new_options[:options_needed]
+
+    still_missing, _ = _missing_poll_fields(repaired)
+    if still_missing:
+        logger.warning(f"⚠️ Poll repair did not supply: {', '.join(still_missing)}")
+        return None, time.monotonic() - started, result["completion_tokens"]
+    return repaired, time.monotonic() - started, result["completion_tokens"]
+
+
+def _record_repair_cost(succeeded, repair_seconds, repair_tokens, full_seconds, full_tokens):
+    """Logs and accumulates what a repair cost against the full generation it salvaged."""
+    with _candidate_lock:
+        _repair_stats["attempts"] += 1
+        _repair_stats["succeeded"] += 1 if succeeded else 0
+        _repair_stats["repair_seconds"] += repair_seconds
+        _repair_stats["full_generation_seconds"] += full_seconds
+        _repair_stats["repair_tokens"] += repair_tokens or 0
+        _repair_stats["full_generation_tokens"] += full_tokens or 0
+    _repairs.labels("succeeded" if succeeded else "failed").inc()
+    _repair_seconds.labels("repair").observe(repair_seconds)
+    _repair_seconds.labels("full_generation").observe(full_seconds)
+    _repair_tokens.labels("repair").inc(repair_tokens or 0)
+    _repair_tokens.labels("full_generation").inc(full_tokens or 0)
+    logger.info(f"🔧 Poll repair {'succeeded' if succeeded else 'failed'}: {repair_seconds:.2f}s"
+                f"{f', {repair_tokens} tokens' if repair_tokens is not None else ''} vs full generation "
+                f"{full_seconds:.2f}s{f', {full_tokens} tokens' if full_tokens is not None else ''}")
+
+
+def repair_stats():
+    """Returns cumulative repair attempts and their cost next to the generations they replaced."""
+    with _candidate_lock:
+        return dict(_repair_stats)
+
+
+def _normalize_poll(poll_data):
+    """Turns parsed poll data into a (title, question, options) tuple with exactly 4 options."""
+    # Extract and validate components from successfully parsed JSON
+    title = poll_data.get("title", "Meeting Poll")
+    question = poll_data.get("question", "What was the main topic discussed?")
+    options = poll_data.get("options", [])
+
+    # Validate and adjust options to ensure exactly 4 string options
+    if not isinstance(options, list) or not all(isinstance(opt, str) for opt in options):
+        logger.warning("⚠️ Options in LLM response are not a list of strings. Creating defaults.")
+        options = [] # Reset options if invalid format
+    options = list(options) # Copy so padding never mutates the parsed response
+
+    # Make sure we have exactly 4 options
+    while len(options) < 4:
+        options.append(f"Additional Point {len(options) + 1}") # Add placeholder options
+
+    if len(options) > 4:
+        logger.warning(f"⚠️ Too many options ({len(options)}). Truncating to 4.")
+        options = options[:4]
+
+    return title, question, options
+
+
+def _get_candidate_executor():
+    """Returns the shared thread pool that bounds concurrent candidate requests."""
+    global _candidate_executor
+    with _candidate_lock:
+        if _candidate_executor is None:
+            workers = max(1, config.get_config_with_default("POLL_CANDIDATE_CONCURRENCY", 2))
+            _candidate_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poll-candidate")
+    return _candidate_executor
+
+
+def _record_candidate_latency(count, wall_seconds, request_seconds):
+    """Accumulates wall time for N candidates against the typical single-request time."""
+    single_seconds = statistics.median(request_seconds)
+    with _candidate_lock:
+        stats = _candidate_latency.setdefault(count, {"rounds": 0, "wall_seconds": 0.0, "single_seconds": 0.0})
+        stats["rounds"] += 1
+        stats["wall_seconds"] += wall_seconds
+        stats["single_seconds"] += single_seconds
+    _candidate_wall.labels(count).observe(wall_seconds)
+    _candidate_single.labels(count).observe(single_seconds)
+    logger.info(f"⏱️ {count} candidate(s) took {wall_seconds:.2f}s vs ~{single_seconds:.2f}s for one "
+                f"(+{wall_seconds - single_seconds:.2f}s for N={count})")
+
+
+def candidate_latency_stats():
+    """
+    Returns average latency per candidate count, so N can be tuned per host.
+
+    Returns:
+        dict: {N: {"rounds", "avg_wall_seconds", "avg_single_seconds", "avg_extra_seconds"}}
+    """
+    with _candidate_lock:
+        snapshot = {count: dict(stats) for count, stats in _candidate_latency.items()}
+    report = {}
+    for count, stats in snapshot.items():
+        rounds = stats["rounds"]
+        report[count] = {
+            "rounds": rounds,
+            "avg_wall_seconds": stats["wall_seconds"] / rounds,
+            "avg_single_seconds": stats["single_seconds"] / rounds,
+            "avg_extra_seconds": (stats["wall_seconds"] - stats["single_seconds"]) / rounds,
+        }
+    return report
+
+
+def _generate_candidates(backend, prompt, count, deadline):
+    """Runs `count` generation requests through the bounded pool and waits for all of them."""
+    started = time.monotonic()
+    if count == 1:
+        results = [_request_poll_candidate(backend, prompt, deadline)]
+    else:
+        executor = _get_candidate_executor()
+        # Copy the context so each candidate is still scheduled as this meeting's job
+        futures = [executor.submit(contextvars.copy_context().run, _request_poll_candidate, backend, prompt, deadline)
+                   for _ in range(count)]
+        results = [future.result() for future in futures]
+    _record_candidate_latency(count, time.monotonic() - started, [result["seconds"] for result in results])
+    return results
+
+
+def _get_small_backend(backend):
+    """Returns an Ollama backend for OLLAMA_SMALL_MODEL sharing the large backend's client and pool."""
+    global _small_backend
+    small_model = config.get_config("OLLAMA_SMALL_MODEL")
+    if not isinstance(backend, OllamaBackend) or not small_model or small_model == backend.model_id:
+        return None
+    with _candidate_lock:
+        if _small_backend is None or _small_backend.model_name != small_model or _small_backend.pool is not backend.pool:
+            _small_backend = OllamaBackend(backend.client, small_model, pool=backend.pool)
+    return _small_backend
+
+
+def _record_tier(tier, event, seconds=None):
+    with _candidate_lock:
+        stats = _tier_stats.setdefault(tier, {"requests": 0, "wins": 0, "cancelled": 0, "completed": 0, "seconds": 0.0})
+        stats[event] += 1
+        if seconds is not None:
+            stats["seconds"] += seconds
+    _tier_events.labels(tier, event).inc()
+    if seconds is not None:
+        _tier_seconds.labels(tier).observe(seconds)
+
+
+def tier_stats():
+    """
+    Returns win rate and average latency per model tier in tiered mode.
+
+    Returns:
+        dict: {tier: {"requests", "wins", "cancelled", "completed", "win_rate", "avg_seconds"}}
+    """
+    with _candidate_lock:
+        snapshot = {tier: dict(stats) for tier, stats in _tier_stats.items()}
+    for stats in snapshot.values():
+        stats["win_rate"] = stats["wins"] / stats["requests"] if stats["requests"] else 0.0
+        seconds = stats.pop("seconds")
+        stats["avg_seconds"] = seconds / stats["completed"] if stats["completed"] else None
+    return snapshot
+
+
+def _is_complete(result):
+    return result["poll"] is not None and not _missing_poll_fields(result["partial"])[0]
+
+
+def _generate_tiered(large_backend, small_backend, prompt, deadline):
+    """
+    Races the small and large model on the same prompt.
+
+    The large model's poll is used if it is complete within POLL_TIER_BUDGET, the small
+    model's otherwise. Whatever is still running once a winner is chosen is cancelled.
+
+    Returns:
+        list: The winning candidate result, or every tier's result if neither produced a complete poll.
+    """
+    started = time.monotonic()
+    budget_deadline = min(deadline, started + config.get_config_with_default("POLL_TIER_BUDGET", 20))
+    tiers = (("large", large_backend, budget_deadline), ("small", small_backend, deadline))
+    requests_by_tier = {}
+    for tier, backend, tier_deadline in tiers:
+        requests_by_tier[tier] = _submit_poll_request(backend, prompt, tier_deadline)
+        _record_tier(tier, "requests")
+
+    results, winner = {}, None
+    for tier, backend, tier_deadline in tiers:
+        future, cancel_event = requests_by_tier[tier]
+        results[tier] = _await_poll_request(backend, future, cancel_event, tier_deadline, started)
+        if results[tier]["error"] is None:
+            _record_tier(tier, "completed", results[tier]["seconds"])
+        elif isinstance(results[tier]["error"], FutureTimeoutError):
+            _record_tier(tier, "cancelled") # Ran past its budget and was stopped
+        if _is_complete(results[tier]):
+            winner = tier
+            break
+
+    for tier, backend, tier_deadline in tiers:
+        if tier in results:
+            continue
+        future, cancel_event = requests_by_tier[tier]
+        if future.done():
+            # Finished before the winner was chosen; still counts toward this tier's latency
+            result = _await_poll_request(backend, future, cancel_event, tier_deadline, started)
+            if result["error"] is None:
+                _record_tier(tier, "completed", result["seconds"])
+        else:
+            cancel_event.set()
+            future.cancel()
+            _record_tier(tier, "cancelled")
+
+    if winner is None:
+        logger.warning("Neither model tier produced a complete poll in time.")
+        return list(results.values())
+    _record_tier(winner, "wins")
+    logger.info(f"🏁 Tiered generation: {winner} model ({results[winner]['model']}) won after "
+                f"{results[winner]['seconds']:.2f}s. Tier stats: {tier_stats()}")
+    return [results[winner]]
+
+
+def _select_best_candidate(results, transcript):
+    """
+    Scores the candidates locally.
+
+    Returns:
+        tuple: (best complete poll data or None, best candidate overall or None). The second
+               value is the most promising incomplete candidate when no complete one exists.
+    """
+    best_complete, best_complete_score = None, -1.0
+    best_any, best_any_score = None, -1.0
+    for index, result in enumerate(results):
+        poll_data = result["poll"] or result["partial"]
+        if not poll_data:
+            continue
+        score, breakdown = score_poll(poll_data, transcript)
+        logger.debug(f"Candidate {index + 1} score {score:.3f}: {breakdown}")
+        if score > best_any_score:
+            best_any, best_any_score = result, score
+        if _is_complete(result) and score > best_complete_score:
+            best_complete, best_complete_score = result["poll"], score
+    if best_complete is not None and len(results) > 1:
+        logger.info(f"🏆 Selected best of {len(results)} poll candidates (score {best_complete_score:.2f}).")
+    return best_complete, best_any
+
+
+def _record_poll_source(source, reason=None):
+    """Counts where a poll came from and labels it in the log."""
+    with _candidate_lock:
+        _poll_sources[source] += 1
+    _poll_source_total.labels(current_owner() or "", source).inc()
+    logger.info(f"🏷️ Poll source: {source}{f' ({reason})' if reason else ''}")
+
+
+def poll_source_stats():
+    """Returns how many polls came from each source (llm, cache, extractive, fallback)."""
+    with _candidate_lock:
+        return dict(_poll_sources)
+
+
+def _fast_path_poll(transcript, reason):
+    """
+    Builds a poll locally with the extractive generator when the LLM can't deliver one.
+
+    Returns:
+        tuple: (title, question, options), or None if the transcript has no usable sentences.
+    """
+    started = time.perf_counter()
+    poll = generate_extractive_poll(transcript)
+    if poll is None:
+        return None
+    title, question, options = _normalize_poll({"title": poll[0], "question": poll[1], "options": poll[2]})
+    _record_poll_source("extractive", f"{reason}; built in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return title, question, options
+
+
+def update_meeting_summary(memory, segment: str) -> bool:
+    """
+    Folds a new transcript segment into a meeting's running summary with one short LLM call.
+
+    Only the current summary and the new segment are sent, so the request stays the same
+    size however long the meeting runs. Runs behind poll requests in the dispatcher.
+
+    Args:
+        memory (meeting_memory.MeetingMemory): The meeting's summary state.
+        segment (str): Transcript not yet summarised: the newest segment, or the segments
+            queued while the previous update ran.
+
+    Returns:
+        bool: True if the summary was updated.
+    """
+    segment = segment.strip()
+    backend = get_llm_backend(prompt_prefix=POLL_PROMPT_PREFIX)
+    if not segment or backend is None:
+        return False
+
+    # A later deadline than any poll due now, so polls go first under load
+    deadline = time.monotonic() + 2 * config.get_config_with_default("POLL_LATENCY_BUDGET", 60)
+    with memory.update_lock:
+        prompt = MEETING_SUMMARY_PROMPT.format(summary=memory.summary_json(), max_items=memory.max_items, segment=segment)
+        started = time.monotonic()
+        # Owned by the feed, so stopping it cancels the request instead of leaving the lock held
+        future, cancel_event = _submit_poll_request(backend, prompt, deadline, json_schema=MEETING_SUMMARY_SCHEMA,
+                                                    max_tokens=MEETING_SUMMARY_MAX_TOKENS, temperature=0.2,
+                                                    owner=memory.meeting_id)
+        result = _await_poll_request(backend, future, cancel_event, deadline, started, full_poll=False)
+        if result["error"] is not None:
+            logger.warning(f"⚠️ Meeting summary update failed: {result['error']!r}")
+            return False
+        if not memory.apply(_load_json_object(result["text"])):
+            logger.warning("⚠️ Meeting summary update returned no usable summary.")
+            return False
+    logger.info(f"🧠 Meeting summary updated in {time.monotonic() - started:.2f}s: {memory.stats()}")
+    return True
+
+
+def _run_summary_worker(memory):
+    """Folds the meeting's queued segments into its summary until none are left."""
+    while True:
+        segments = memory.take_pending()
+        if not segments:
+            return
+        try:
+            update_meeting_summary(memory, segments)
+        except Exception as e:
+            logger.error(f"❌ Meeting summary worker error: {e}", exc_info=True)
+
+
+def update_meeting_summary_async(memory, segment: str):
+    """
+    Folds a segment into the summary on the meeting's single background worker, so it never
+    delays the poll. Segments that arrive while an update runs are folded in together by the
+    next one, so a slow LLM means fewer, larger summary calls rather than piled-up threads.
+
+    Returns:
+        threading.Thread: The worker if this call started it, else None.
+    """
+    segment = segment.strip()
+    if not segment or not memory.queue_segment(segment):
+        return None
+    thread = threading.Thread(target=_run_summary_worker, args=(memory,),
+                              name=f"meeting-summary-{memory.meeting_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def generate_poll_from_transcript(transcript: str, exclude_questions: list[str] = None,
+                                  deadline: float = None, meeting_summary: str = None,
+                                  instructions: str = None) -> tuple[str, str, list[str]]:
     """
     Generate a poll (title, question, options) from a transcript using the local Ollama model.
 
+    When POLL_CANDIDATES is above 1, that many requests are sent concurrently and the
+    best-scoring candidate (see poll_scoring.score_poll) is used. If the LLM is unavailable,
+    fails, or misses the latency budget, the poll is built by the extractive fast path.
+
     Args:
         transcript (str): The meeting transcript to analyze.
-        model_name (str): The Ollama model name to use for generation.
+        exclude_questions (list[str], optional): Earlier poll questions the new poll must not repeat.
+            Used to regenerate after a near-duplicate; bypasses the poll cache.
+        deadline (float, optional): time.monotonic() by which the poll is due. Defaults to
+            POLL_LATENCY_BUDGET from now; LLM requests that would miss it are shed.
+        meeting_summary (str, optional): Running summary of the meeting so far (see
+            meeting_memory), added as context so earlier segments need not be re-sent.
+        instructions (str, optional): Per-meeting prompt guidance from the meeting's settings.
 
     Returns:
         tuple: (title, question, options) of the generated poll. Returns default/fallback values on error or invalid output.
     """
-    client = get_ollama_client()
-    if client is None:
-        logger.error("Ollama client is not available. Cannot generate poll.")
-        # Return a fallback poll indicating an issue
-        return ("Poll Generation Error", "Could not connect to Ollama.", ["Check Ollama server", "See logs for details", "Option 3", "Option 4"])
-
     clean_transcript = transcript.strip()
     if not clean_transcript:
         logger.warning("⚠️ Empty transcript provided for poll generation.")
@@ -138,104 +838,203 @@ def generate_poll_from_transcript(transcript: str) -> tuple[str, str, list[str]]
         return ("Meeting Poll", "What was discussed?",
                 ["(No transcript audio)", "Option 2", "Option 3", "Option 4"])
 
+    backend = get_llm_backend(prompt_prefix=POLL_PROMPT_PREFIX)
+    if backend is None:
+        logger.error("No LLM backend is available. Cannot generate poll.")
+        fast_poll = _fast_path_poll(clean_transcript, "no LLM backend")
+        if fast_poll is not None:
+            return fast_poll
+        _record_poll_source("fallback", "no LLM backend")
+        # Return a fallback poll indicating an issue
+        return ("Poll Generation Error", "Could not connect to Ollama.", ["Check Ollama server", "See logs for details", "Option 3", "Option 4"])
+    logger.debug(f"Using {backend.name} model: {backend.model_id}")
+    if deadline is None:
+        deadline = time.monotonic() + config.get_config_with_default("POLL_LATENCY_BUDGET", 60)
+
+    # Serve retries, replays and repeated filler from the cache instead of the LLM
+    cache = None if exclude_questions else get_poll_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(clean_transcript + (f"\n{meeting_summary}" if meeting_summary else "")
+                                   + (f"\n{instructions}" if instructions else ""),
+                                   backend.model_id, POLL_PROMPT_VERSION, POLL_TEMPERATURE)
+        cached_poll = cache.get(cache_key)
+        if cached_poll is not None:
+            logger.info(f"♻️ Poll cache hit - skipping LLM generation. Cache stats: {cache.stats()}")
+            _record_poll_source("cache")
+            return cached_poll
+        logger.debug("Poll cache miss.")
+
     full_prompt = POLL_PROMPT.replace("[Insert transcript here]", clean_transcript)
-    logger.info("🤖 Generating poll from transcript…")
+    if meeting_summary:
+        full_prompt += POLL_SUMMARY_CONTEXT.format(summary=meeting_summary)
+    if instructions:
+        full_prompt += POLL_INSTRUCTIONS_CONTEXT.format(instructions=instructions)
+    if exclude_questions:
+        full_prompt += ("\nThese questions were already asked in this meeting. Do not repeat or closely "
+                        "paraphrase any of them; pick a different aspect of the transcript:\n"
+                        + "\n".join(f"- {q}" for q in exclude_questions))
     logger.debug(f"Prompting LLM with transcript length: {len(clean_transcript)} characters")
 
-    # Get the model name from config or a default if not set/found
-    ollama_model_name = config.get_config("OLLAMA_MODEL_NAME") or "deepseek-r1:1.5b"
-    logger.debug(f"Using Ollama model: {ollama_model_name}")
+    small_backend = _get_small_backend(backend) if config.get_config("POLL_TIERED_ENABLED") else None
+    if small_backend is not None:
+        logger.info(f"🤖 Generating poll from transcript (tiered: {small_backend.model_id} vs {backend.model_id})…")
+        results = _generate_tiered(backend, small_backend, full_prompt, deadline)
+    else:
+        candidate_count = max(1, config.get_config_with_default("POLL_CANDIDATES", 1))
+        logger.info(f"🤖 Generating poll from transcript ({candidate_count} candidate(s))…")
+        results = _generate_candidates(backend, full_prompt, candidate_count, deadline)
+    if all(result["shed"] for result in results):
+        logger.warning(f"⏱️ LLM missed the poll latency budget; using the extractive fast path. Dispatcher: {dispatcher_stats()}")
+        fast_poll = _fast_path_poll(clean_transcript, "LLM missed latency budget")
+        if fast_poll is not None:
+            return fast_poll
+    poll_data, best_candidate = _select_best_candidate(results, clean_transcript)
 
-    try:
-        # Request poll from Ollama
-        resp = client.chat.completions.create(
-            model=ollama_model_name, # Use the configured model name
-            messages=[{"role": "user", "content": full_prompt}],
-            temperature=0.7, # Adjust for desired creativity
-            max_tokens=800,  # Increased to allow for complete responses
-            response_format={"type": "json_object"} # Request JSON response
-        )
-        raw_response = resp.choices[0].message.content.strip()
-        logger.info(f"📥 Ollama raw response received ({len(raw_response)} chars). Attempting to parse JSON.")
-        logger.debug(f"Raw LLM response: {raw_response}")
+    # Ask only for the missing fields instead of padding with filler or discarding the output
+    if poll_data is None and best_candidate is not None:
+        logger.info(f"Best candidate is incomplete (missing {', '.join(_missing_poll_fields(best_candidate['partial'])[0])}); requesting a repair.")
+        repaired, repair_seconds, repair_tokens = _request_poll_repair(
+            backend, clean_transcript, best_candidate["partial"], deadline)
+        _record_repair_cost(repaired is not None, repair_seconds, repair_tokens,
+                            best_candidate["seconds"], best_candidate["completion_tokens"])
+        # An unrepaired but parseable poll is still padded as before
+        poll_data = repaired or best_candidate["poll"]
 
-        # Try to extract and parse JSON from the response
-        poll_data = extract_json_from_text(raw_response)
+    if poll_data is None:
+        fast_poll = _fast_path_poll(clean_transcript, "LLM request failed" if all(
+            result["error"] is not None for result in results) else "LLM output unusable")
+        if fast_poll is not None:
+            return fast_poll
 
-        # If we couldn't extract or parse JSON successfully
-        if poll_data is None:
-            logger.warning("⚠️ Failed to extract or parse JSON from LLM response.")
-            # Try a basic parse as a fallback, in case extract_json_from_text was too strict
-            try:
-                 poll_data = json.loads(raw_response)
-                 logger.info("Successfully parsed raw response directly as JSON.")
-                 # Basic validation for expected keys and structure
-                 if not (isinstance(poll_data, dict) and
-                         "title" in poll_data and isinstance(poll_data["title"], str) and
-                         "question" in poll_data and isinstance(poll_data["question"], str) and
-                         "options" in poll_data and isinstance(poll_data["options"], list) and
-                         len(poll_data["options"]) >= 1 and all(isinstance(opt, str) for opt in poll_data["options"])):
-                      logger.warning("Directly parsed JSON does not match expected poll structure.")
-                      poll_data = None # Treat as invalid if structure is wrong
-
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ JSON parsing error on raw response:[/] {e}")
-                logger.debug(f"Raw response that failed JSON parse: {raw_response[:200]}...")
-                poll_data = None # Ensure poll_data is None on error
-
-        # If after all attempts, poll_data is still None, use fallback
-        if poll_data is None:
-            logger.error("❌ Poll generation failed: Invalid or unparsable response from LLM.")
-            # Create a fallback poll that indicates there was an error
-            fallback_title = "Poll Generation Failed"
-            fallback_question = "Could not generate poll from transcript."
-            fallback_options = [
-                "Check Ollama server status",
-                "Review application logs",
-                "Try transcribing again",
-                "Use manual poll"
-            ]
-            return fallback_title, fallback_question, fallback_options
-
-
-        # Extract and validate components from successfully parsed JSON
-        title = poll_data.get("title", "Meeting Poll")
-        question = poll_data.get("question", "What was the main topic discussed?")
-        options = poll_data.get("options", [])
-
-        # Validate and adjust options to ensure exactly 4 string options
-        if not isinstance(options, list) or not all(isinstance(opt, str) for opt in options):
-            logger.warning("⚠️ Options in LLM response are not a list of strings. Creating defaults.")
-            options = [] # Reset options if invalid format
-
-        # Make sure we have exactly 4 options
-        while len(options) < 4:
-            options.append(f"Additional Point {len(options) + 1}") # Add placeholder options
-
-        if len(options) > 4:
-            logger.warning(f"⚠️ Too many options ({len(options)}). Truncating to 4.")
-            options = options[:4]
-
-        # Log success
-        logger.info("✅ Successfully generated poll data.")
-        logger.debug(f"Generated Poll: Title='{title}', Question='{question}', Options={options}")
-
-        return title, question, options
+    if poll_data is None and all(result["error"] is not None for result in results):
+        _record_poll_source("fallback", "LLM request failed")
+        # Create a fallback poll for any unexpected errors
+        fallback_title = "Poll Generation Error"
+        fallback_question = "An error occurred during poll generation."
+        fallback_options = [
+            "Check Ollama server connection",
+            "Review application logs",
+            "Try transcribing again",
+            "Contact support"
+        ]
+        return fallback_title, fallback_question, fallback_options
 
-    except Exception as e:
-       logger.error(f"❌ Unexpected error during poll generation: {e}", exc_info=True)
+    # If after all attempts, poll_data is still None, use fallback
+    if poll_data is None:
+        logger.error("❌ Poll generation failed: Invalid or unparsable response from LLM.")
+        _record_poll_source("fallback", "LLM output unusable")
+        # Create a fallback poll that indicates there was an error
+        fallback_title = "Poll Generation Failed"
+        fallback_question = "Could not generate poll from transcript."
+        fallback_options = [
+            "Check Ollama server status",
+            "Review application logs",
+            "Try transcribing again",
+            "Use manual poll"
+        ]
+        return fallback_title, fallback_question, fallback_options
+
+    title, question, options = _normalize_poll(poll_data)
 
-       # Create a fallback poll for any unexpected errors
-       fallback_title = "Poll Generation Error"
-       fallback_question = "An error occurred during poll generation."
-       fallback_options = [
-           "Check Ollama server connection",
-           "Review application logs",
-           "Try transcribing again",
-           "Contact support"
-       ]
+    # Log success
+    logger.info("✅ Successfully generated poll data.")
+    _record_poll_source("llm", results[0]["model"] if len(results) == 1 else backend.model_id)
+    logger.debug(f"Generated Poll: Title='{title}', Question='{question}', Options={options}")
 
-       return fallback_title, fallback_question, fallback_options
+    # Only successful generations are cached; fallbacks should be retried next time
+    if cache is not None:
+        cache.put(cache_key, title, question, options)
+
+    return title, question, options
+
+
+def _validate_poll_questions(data, count):
+    """
+    Validates a multi-question response question by question, padding each one's options to 4.
+
+    Returns:
+        tuple: (title or None, list of (question, options)) with at most `count` distinct questions.
+    """
+    if not isinstance(data, dict):
+        return None, []
+    title = data["title"].strip() if isinstance(data.get("title"), str) and data["title"].strip() else None
+    questions, seen = [], set()
+    for item in data.get("questions") if isinstance(data.get("questions"), list) else []:
+        if not isinstance(item, dict) or not isinstance(item.get("question"), str) or not item["question"].strip():
+            logger.warning("⚠️ Dropping a question without text from the multi-question poll.")
+            continue
+        question = item["question"].strip()
+        if question.lower() in seen:
+            logger.warning(f"⚠️ Dropping repeated question: {question}")
+            continue
+        options = item.get("options") if isinstance(item.get("options"), list) else []
+        options = [opt.strip() for opt in options if isinstance(opt, str) and opt.strip()]
+        _, question, options = _normalize_poll({"question": question, "options": options})
+        seen.add(question.lower())
+        questions.append((question, options))
+    return title, questions[:count]
+
+
+def generate_multi_question_poll(transcript: str, count: int, meeting_summary: str = None,
+                                 deadline: float = None, instructions: str = None) -> tuple[str, list[tuple[str, list[str]]]]:
+    """
+    Generate one poll with `count` questions from a single LLM call.
+
+    Falls back to a single-question poll from generate_poll_from_transcript if the
+    response has no usable question or the request fails.
+
+    Args:
+        transcript (str): The meeting transcript to analyze.
+        count (int): Number of questions to ask for.
+        meeting_summary (str, optional): Running summary of the meeting so far.
+        deadline (float, optional): time.monotonic() by which the poll is due.
+        instructions (str, optional): Per-meeting prompt guidance from the meeting's settings.
+
+    Returns:
+        tuple: (title, [(question, options), ...]).
+    """
+    def single_question_poll():
+        title, question, options = generate_poll_from_transcript(transcript, deadline=deadline,
+                                                                 meeting_summary=meeting_summary,
+                                                                 instructions=instructions)
+        return title, [(question, options)]
+
+    clean_transcript = transcript.strip()
+    backend = get_llm_backend(prompt_prefix=POLL_PROMPT_PREFIX)
+    if count <= 1 or not clean_transcript or backend is None:
+        return single_question_poll()
+    if deadline is None:
+        deadline = time.monotonic() + config.get_config_with_default("POLL_LATENCY_BUDGET", 60)
+
+    prompt = MULTI_POLL_PROMPT.format(count=count, transcript=clean_transcript)
+    if meeting_summary:
+        prompt += POLL_SUMMARY_CONTEXT.format(summary=meeting_summary)
+    if instructions:
+        prompt += POLL_INSTRUCTIONS_CONTEXT.format(instructions=instructions)
+    logger.info(f"🤖 Generating a {count}-question poll from transcript in one request…")
+
+    started = time.monotonic()
+    future, cancel_event = _submit_poll_request(backend, prompt, deadline, json_schema=_multi_poll_schema(count),
+                                                max_tokens=MULTI_POLL_TOKENS_PER_QUESTION * count)
+    title, questions = None, []
+    try:
+        completion, _ = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        title, questions = _validate_poll_questions(_load_json_object(completion.text), count)
+    except FutureTimeoutError:
+        logger.warning("⏱️ Multi-question poll request missed the latency budget; cancelling it.")
+        cancel_event.set()
+        future.cancel()
+    except Exception as e:
+        logger.warning(f"⚠️ Multi-question poll request failed: {e}")
+
+    if not questions:
+        logger.warning("⚠️ No usable questions in the multi-question response; generating a single-question poll.")
+        return single_question_poll()
+    if len(questions) < count:
+        logger.info(f"Model returned {len(questions)} of {count} usable questions; posting those.")
+    _record_poll_source("llm", f"{backend.model_id}, {len(questions)} questions in {time.monotonic() - started:.2f}s")
+    return title or "Meeting Poll", questions
 
 
 def post_poll_to_zoom(title: str, question: str, options: list[str], meeting_id: str, token: str) -> bool:
@@ -252,48 +1051,84 @@ def post_poll_to_zoom(title: str, question: str, options: list[str], meeting_id:
     Returns:
         bool: True if successful (status code 201), False otherwise.
     """
-    url = f"https://api.zoom.us/v2/meetings/{meeting_id}/polls"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    return post_multi_question_poll_to_zoom(title, [(question, options)], meeting_id, token)
 
-    # Ensure we have exactly 4 options for the Zoom API
-    poll_options = options[:] # Create a copy
-    while len(poll_options) < 4:
-        poll_options.append(f"Option {len(poll_options) + 1}")
-    if len(poll_options) > 4:
-        poll_options = poll_options[:4]
 
+def build_poll_payload(title: str, questions: list[tuple[str, list[str]]]) -> dict:
+    """
+    Builds the Zoom "create meeting poll" request body.
 
-    payload = {
-        "title": title,
-        "questions": [{
+    Args:
+        title (str): Poll title.
+        questions (list[tuple[str, list[str]]]): (question, options) pairs; each question's
+            options are truncated/padded to 4.
+
+    Returns:
+        dict: JSON payload for POST /meetings/{meetingId}/polls.
+    """
+    payload_questions = []
+    for question, options in questions:
+        # Ensure we have exactly 4 options for the Zoom API
+        poll_options = options[:] # Create a copy
+        while len(poll_options) < 4:
+            poll_options.append(f"Option {len(poll_options) + 1}")
+        if len(poll_options) > 4:
+            poll_options = poll_options[:4]
+        payload_questions.append({
             "name": question,
             "type": "single", # Zoom Poll API type: single or multiple
             "answer_required": True,
             "answers": poll_options
-        }]
+        })
+
+    return {
+        "title": title,
+        "questions": payload_questions
     }
 
-    logger.info(f"📤 Attempting to post poll to Zoom Meeting ID {meeting_id}:")
+
+def notify_token_expired():
+    """Signals to the GUI that the Zoom token might be expired and needs re-authorization."""
+    try:
+        from main_gui import gui_queue
+        if gui_queue:
+             gui_queue.put(('STATUS', "[red]❌ Zoom token expired or invalid. Please re-authenticate with Zoom.[/]"))
+    except ImportError:
+         pass # Ignore if gui_queue is not available
+
+
+def post_multi_question_poll_to_zoom(title: str, questions: list[tuple[str, list[str]]], meeting_id: str, token: str) -> bool:
+    """
+    Post one poll with one or more questions to a Zoom meeting in a single API request.
+
+    Args:
+        title (str): Poll title.
+        questions (list[tuple[str, list[str]]]): (question, options) pairs; each question's
+            options are truncated/padded to 4.
+        meeting_id (str): Zoom meeting ID.
+        token (str): Zoom API access token.
+
+    Returns:
+        bool: True if successful (status code 201), False otherwise.
+    """
+    payload = build_poll_payload(title, questions)
+
+    logger.info(f"📤 Attempting to post poll ({len(payload['questions'])} question(s)) to Zoom Meeting ID {meeting_id}:")
     logger.debug(f"Payload: {json.dumps(payload)}")
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10) # Added timeout
+        response = get_zoom_client().post(f"/meetings/{meeting_id}/polls", token, json=payload)
+        timing = response.zoom_timing
         if response.status_code == 201:
-            logger.info(f"[green]✅ Poll posted successfully.[/] Response: {response.json()}")
+            logger.info(f"[green]✅ Poll posted successfully[/] (connect {timing['connect_seconds'] * 1000:.0f} ms, "
+                        f"response {timing['response_seconds'] * 1000:.0f} ms). Response: {response.json()}")
             return True
         elif response.status_code == 401:
              logger.error(f"❌ Zoom API error {response.status_code}: Unauthorized. Token may be invalid or expired.")
              logger.error(f"Response body: {response.text}")
-             # Signal to the GUI that the token might be expired and needs re-authorization
-             try:
-                 from main_gui import gui_queue
-                 if gui_queue:
-                      gui_queue.put(('STATUS', "[red]❌ Zoom token expired or invalid. Please re-authenticate with Zoom.[/]"))
-             except ImportError:
-                  pass # Ignore if gui_queue is not available
+             # Start a refresh; only ask the user to re-authenticate if that isn't possible
+             if not get_token_manager().invalidate(token):
+                 notify_token_expired()
              return False
         else:
             logger.error(f"❌ Zoom API error posting poll: {response.status_code} - {response.text}")
@@ -305,6 +1140,80 @@ def post_poll_to_zoom(title: str, question: str, options: list[str], meeting_id:
        logger.error(f"❌ Unexpected error posting poll to Zoom: {e}", exc_info=True)
        return False
 
+def create_zoom_poll(title: str, questions: list[tuple[str, list[str]]], meeting_id: str, token: str):
+    """
+    Creates a poll in a Zoom meeting without launching it.
+
+    Args:
+        title (str): Poll title.
+        questions (list[tuple[str, list[str]]]): (question, options) pairs.
+        meeting_id (str): Zoom meeting ID.
+        token (str): Zoom API access token.
+
+    Returns:
+        str or None: Zoom poll id, or None if the poll wasn't created.
+    """
+    try:
+        response = get_zoom_client().post(f"/meetings/{meeting_id}/polls", token, json=build_poll_payload(title, questions))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"❌ Network or request error creating poll in Zoom: {e}")
+        return None
+    if response.status_code != 201:
+        logger.error(f"❌ Zoom API error creating poll: {response.status_code} - {response.text}")
+        if response.status_code == 401 and not get_token_manager().invalidate(token):
+            notify_token_expired()
+        return None
+    return response.json().get("id")
+
+
+def _poll_action(meeting_id: str, poll_id: str, action: str, token: str) -> bool:
+    try:
+        response = get_zoom_client().put(f"/meetings/{meeting_id}/polls/{poll_id}/{action}", token)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"❌ Network or request error on poll {action}: {e}")
+        return False
+    if response.status_code not in (200, 202, 204):
+        logger.error(f"❌ Zoom API error on poll {action}: {response.status_code} - {response.text}")
+        if response.status_code == 401 and not get_token_manager().invalidate(token):
+            notify_token_expired()
+        return False
+    return True
+
+
+def launch_zoom_poll(meeting_id: str, poll_id: str, token: str) -> bool:
+    """Launches an already created poll so participants see it. Returns True on success."""
+    return _poll_action(meeting_id, poll_id, "launch", token)
+
+
+def end_zoom_poll(meeting_id: str, poll_id: str, token: str) -> bool:
+    """Ends a launched poll. Returns True on success."""
+    return _poll_action(meeting_id, poll_id, "end", token)
+
+
+def get_zoom_poll_results(meeting_id: str, token: str):
+    """
+    Fetches poll answers for a meeting and tallies them.
+
+    Returns:
+        dict or None: {question: {answer: count}}, or None if the results couldn't be fetched.
+    """
+    try:
+        response = get_zoom_client().get(f"/past_meetings/{meeting_id}/polls", token)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"❌ Network or request error fetching poll results: {e}")
+        return None
+    if response.status_code != 200:
+        logger.error(f"❌ Zoom API error fetching poll results: {response.status_code} - {response.text}")
+        return None
+    tally = {}
+    for participant in response.json().get("questions", []):
+        for detail in participant.get("question_details", []):
+            answers = tally.setdefault(detail.get("question"), Counter())
+            for answer in str(detail.get("answer", "")).split(";"): # Multiple-choice answers are ;-joined
+                if answer:
+                    answers[answer] += 1
+    return {question: dict(answers) for question, answers in tally.items()}
+
 if __name__ == "__main__":
     # Example usage for testing poller.py directly
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -0,0 +1,152 @@
+# retry_policy.py
+import logging
+import random
+import threading
+import time
+import weakref
+
+import config
+
+logger = logging.getLogger(__name__)
+
+FAILURE_CLASSES = ("audio", "whisper", "llm", "zoom")
+
+_DEFAULTS = { # failure class -> (base seconds, max seconds)
+    "audio": (1.0, 30.0),
+    "whisper": (2.0, 60.0),
+    "llm": (2.0, 60.0),
+    "zoom": (5.0, 120.0),
+}
+
+_backoffs = weakref.WeakSet() # Backoff objects that may be waiting; woken on stop and config changes
+_backoffs_lock = threading.Lock()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for one failure class.
+
+    The n-th consecutive failure waits base * multiplier**(n-1) seconds, capped at
+    max_delay, minus up to `jitter` of that (0.5 waits between half and all of it) so
+    loops that failed together don't retry together. Jitter never drops the wait to
+    zero, so a device that fails at once can't spin the loop.
+    """
+
+    def __init__(self, failure_class, base=1.0, max_delay=60.0, multiplier=2.0, jitter=0.5):
+        self.failure_class = failure_class
+        self.base = max(0.0, float(base))
+        self.max_delay = max(self.base, float(max_delay))
+        self.multiplier = max(1.0, float(multiplier))
+        self.jitter = min(1.0, max(0.0, float(jitter)))
+
+    def delay(self, failures, fraction=None):
+        """
+        Seconds to wait after `failures` consecutive failures.
+
+        Args:
+            failures (int): Consecutive failures so far, at least 1.
+            fraction (float, optional): Jitter draw in [0, 1); random when omitted. Passing the
+                same draw again recomputes a wait after the policy changes.
+        """
+        if fraction is None:
+            fraction = random.random()
+        delay = min(self.max_delay, self.base * self.multiplier ** max(0, failures - 1))
+        return delay * (1.0 - self.jitter * fraction)
+
+
+def get_retry_policy(failure_class):
+    """Builds the policy for a failure class ("audio", "whisper", "llm" or "zoom") from the current config."""
+    base, max_delay = _DEFAULTS.get(failure_class, (1.0, 60.0))
+    prefix = f"RETRY_{failure_class.upper()}"
+    return RetryPolicy(
+        failure_class,
+        base=config.get_config_with_default(f"{prefix}_BASE", base),
+        max_delay=config.get_config_with_default(f"{prefix}_MAX", max_delay),
+        multiplier=config.get_config_with_default("RETRY_MULTIPLIER", 2.0),
+        jitter=config.get_config_with_default("RETRY_JITTER", 0.5),
+    )
+
+
+class Backoff:
+    """
+    Consecutive-failure counts for one loop, each class retried under its own policy.
+
+    Waits block on an Event, not time.sleep: stopping the loop ends them at once, and a
+    change to a RETRY_* setting wakes them to re-time the wait under the new policy.
+    """
+
+    def __init__(self, name, stop_event):
+        self.name = name
+        self.stop_event = stop_event
+        self._wake = threading.Event()
+        self._failures = dict.fromkeys(FAILURE_CLASSES, 0)
+        self._stats = {"failures": 0, "waits": 0, "wait_seconds": 0.0}
+        with _backoffs_lock:
+            _backoffs.add(self)
+
+    def failures(self, failure_class):
+        """Consecutive failures of the class since its last success."""
+        return self._failures.get(failure_class, 0)
+
+    def success(self, failure_class):
+        """Resets the class's count after a stage succeeds."""
+        self._failures[failure_class] = 0
+
+    def failure(self, failure_class, since=None):
+        """
+        Records a failure and waits out its backoff.
+
+        Args:
+            failure_class (str): Which stage failed.
+            since (float, optional): time.monotonic() when the failed attempt began; time the
+                attempt already took (e.g. a segment that recorded only silence) counts
+                towards the wait.
+
+        Returns:
+            bool: False if the loop was stopped while waiting.
+        """
+        failures = self._failures[failure_class] = self._failures.get(failure_class, 0) + 1
+        self._stats["failures"] += 1
+        fraction = random.random()
+        started = since if since is not None else time.monotonic()
+        delay = get_retry_policy(failure_class).delay(failures, fraction)
+        remaining = started + delay - time.monotonic()
+        if remaining > 0:
+            logger.info(f"{self.name}: {failure_class} failure {failures} - retrying in {remaining:.1f}s")
+        while not self.stop_event.is_set():
+            remaining = started + delay - time.monotonic()
+            if remaining <= 0:
+                break
+            self._stats["waits"] += 1
+            waited = time.monotonic()
+            woken = self._wake.wait(remaining)
+            self._stats["wait_seconds"] += time.monotonic() - waited
+            if woken:
+                self._wake.clear()
+                delay = get_retry_policy(failure_class).delay(failures, fraction)
+        return not self.stop_event.is_set()
+
+    def wake(self):
+        """Ends the current wait early; it re-checks the stop event and the policy."""
+        self._wake.set()
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["consecutive"] = dict(self._failures)
+        return stats
+
+
+def wake_waiters():
+    """Wakes every waiting Backoff, e.g. after a loop's stop event was set."""
+    with _backoffs_lock:
+        backoffs = list(_backoffs)
+    for backoff in backoffs:
+        backoff.wake()
+
+
+def _on_config_change(key, value):
+    if key.startswith("RETRY_"):
+        wake_waiters()
+
+
+config.add_config_listener(_on_config_change)
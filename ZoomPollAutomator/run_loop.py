@@ -1,16 +1,41 @@
 # run_loop.py
-import os, time
+import os, re, time
 import logging
+import queue
 import threading # Import threading Event
+from concurrent.futures import ThreadPoolExecutor
 
 # Local imports
-from audio_capture import record_segment
+from audio_capture import AudioCapture, record_segment
+from deadline_scheduler import cancel_jobs, job_owner, pipeline_jobs, scheduler_stats
 from transcribe_whisper import transcribe_segment
-from poller import generate_poll_from_transcript, post_poll_to_zoom
+from poller import (create_zoom_poll, generate_multi_question_poll, generate_poll_from_transcript,
+                    post_multi_question_poll_to_zoom, update_meeting_summary_async)
+from meeting_memory import get_meeting_memory
+from novelty import get_novelty_gate
+from poll_cadence import create_cadence_controller
+from poll_history import get_poll_history
+from poll_staging import get_poll_stager
+from retry_policy import Backoff
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
+from zoom_outbox import get_zoom_outbox
 import config # Import config to get token and meeting ID
+import metrics
 
 logger = logging.getLogger(__name__)
 
+_stage_seconds = metrics.histogram("zoompoll_stage_seconds",
+                                   "Time per pipeline stage (record, transcribe, generate, post).", ("stage", "meeting"))
+_poll_latency = metrics.histogram("zoompoll_poll_latency_seconds",
+                                  "End of the newest segment's recording to its poll being handed to Zoom.", ("meeting",))
+_audio_failures = metrics.counter("zoompoll_audio_failures_total",
+                                  "Segments that could not be recorded (device errors or silence).", ("meeting",))
+_segments_dropped = metrics.counter("zoompoll_segments_dropped_total",
+                                    "Recorded segments dropped because transcription fell behind.", ("meeting",))
+_segment_backlog = metrics.gauge("zoompoll_segment_backlog", "Recorded segments waiting for transcription.",
+                                 ("meeting",))
+
 # Callback function to send updates to the GUI (set by main_gui.py)
 _gui_update_callback = None
 
@@ -27,56 +52,393 @@ def update_gui_status(message):
         logger.info(f"STATUS: {message}") # Log if no GUI callback set
 
 
-def run_loop(meeting_id, duration, device, should_stop: threading.Event):
-    """Optimized run loop with better error handling and recovery."""
-    cycle = 0
-    consecutive_failures = 0
-    MAX_CONSECUTIVE_FAILURES = 3
-    
-    logger.info(f"Starting automation loop for meeting {meeting_id}")
-    update_gui_status("[green]Automation started[/]")
+def _submit_poll(meeting_id, title, questions, outbox, stager, on_posted):
+    """
+    Hands a poll to the outbox (or posts it inline when the outbox is off).
+
+    on_posted(title, questions, response) runs once Zoom has the poll. With the outbox it
+    runs as the meeting's posted hook, which also covers polls resumed from the journal.
+    """
+    if outbox is not None:
+        # Posting happens on the outbox worker; the next segment starts recording now
+        outbox.submit(meeting_id, title, questions)
+    elif stager is not None:
+        poll_id = create_zoom_poll(title, questions, meeting_id, get_token_manager().get_token())
+        if poll_id is not None:
+            on_posted(title, questions, {"id": poll_id})
+    elif post_multi_question_poll_to_zoom(title, questions, meeting_id, get_token_manager().get_token()):
+        on_posted(title, questions, {})
+
+
+class PollPipeline:
+    """
+    One meeting's poll stage: generation (with the meeting's own prompt instructions, if any),
+    de-duplication against the meeting's poll history, and posting.
+
+    A capture loop (run_source_loop) feeds it transcripts. Several pipelines can subscribe to
+    one loop when a single microphone feed is simulcast into several Zoom meetings. The
+    meeting's cadence controller (None when POLL_CADENCE_ENABLED is off) decides which
+    transcripts lead to a poll.
+    """
+
+    def __init__(self, meeting_id, instructions=None, min_interval=None, max_interval=None):
+        self.meeting_id = str(meeting_id)
+        self.instructions = instructions or None
+        self.cadence = create_cadence_controller(self.meeting_id, min_interval, max_interval)
+        self.poll_history = get_poll_history(self.meeting_id)
+        self.stager = get_poll_stager(self.meeting_id)
+        self.outbox = get_zoom_outbox()
+        self.stopped = threading.Event()
+        if self.outbox is not None:
+            self.outbox.add_posted_hook(self.meeting_id, self._posted)
+
+    def start(self):
+        if self.stager is not None:
+            self.stager.start_timer()
+
+    def stop(self):
+        """Stops the stager and cancels this meeting's queued and running LLM requests; nothing more is posted."""
+        self.stopped.set()
+        if self.stager is not None:
+            self.stager.stop()
+        cancel_jobs(pipeline_jobs(self.meeting_id))
+
+    def _posted(self, title, questions, response):
+        """
+        Records a poll Zoom accepted: its questions go into the meeting's poll history and, with
+        pre-staging on, its Zoom poll id goes to the stager to be launched on the next trigger.
+        """
+        if self.poll_history is not None:
+            for question, options in questions:
+                self.poll_history.add(title, question, options)
+        if self.stager is not None:
+            self.stager.stage(response.get("id"), title)
+
+    def generate(self, text, meeting_summary=None, deadline=None):
+        """
+        Generates a poll for the transcript; LLM requests are scheduled as this meeting's jobs.
+
+        Args:
+            deadline (float, optional): time.monotonic() by which the meeting's next poll is due.
+
+        Returns:
+            tuple: (title, [(question, options), ...]).
+        """
+        question_count = max(1, config.get_config_with_default("POLL_QUESTIONS", 1))
+        with job_owner(self.meeting_id, pipeline_jobs(self.meeting_id)), \
+                _stage_seconds.labels("generate", self.meeting_id).time():
+            if question_count > 1:
+                return generate_multi_question_poll(text, question_count, meeting_summary=meeting_summary,
+                                                    deadline=deadline, instructions=self.instructions)
+            title, question, options = generate_poll_from_transcript(text, meeting_summary=meeting_summary,
+                                                                     deadline=deadline, instructions=self.instructions)
+        return title, [(question, options)]
 
-    while not should_stop.is_set():
-        cycle += 1
+    def post(self, title, questions, text, meeting_summary=None, deadline=None):
+        """
+        Drops questions this meeting has already asked, then submits the poll.
+
+        A single-question poll that repeats an earlier one is regenerated once for this meeting.
+
+        Returns:
+            bool: True if a poll was submitted.
+        """
+        with _stage_seconds.labels("post", self.meeting_id).time():
+            return self._post(title, questions, text, meeting_summary, deadline)
+
+    def _post(self, title, questions, text, meeting_summary, deadline):
+        if self.stopped.is_set():
+            logger.info(f"Meeting {self.meeting_id} stopped - discarding poll '{title}'")
+            return False
+        if self.poll_history is not None and len(questions) > 1:
+            # One Zoom poll carrying every question; drop the ones already asked
+            fresh = [(q, opts) for q, opts in questions if self.poll_history.find_duplicate(q, opts) is None]
+            if len(fresh) < len(questions):
+                logger.info(f"Dropped {len(questions) - len(fresh)} question(s) that repeat earlier polls "
+                            f"in meeting {self.meeting_id}")
+            questions = fresh
+            if not questions:
+                update_gui_status("[yellow]Skipped a poll that repeated earlier questions[/]")
+                return False
+        elif self.poll_history is not None:
+            # Keep near-duplicates of earlier polls from reaching Zoom
+            question, options = questions[0]
+            duplicate = self.poll_history.find_duplicate(question, options)
+            if duplicate is not None:
+                logger.info(f"Generated poll is a near-duplicate ({duplicate[1]:.2f}) of '{duplicate[0][1]}' - regenerating")
+                with job_owner(self.meeting_id, pipeline_jobs(self.meeting_id)):
+                    title, question, options = generate_poll_from_transcript(
+                        text, exclude_questions=self.poll_history.questions(), meeting_summary=meeting_summary,
+                        deadline=deadline, instructions=self.instructions)
+                duplicate = self.poll_history.find_duplicate(question, options)
+                if duplicate is not None:
+                    logger.warning(f"Regenerated poll is still a near-duplicate ({duplicate[1]:.2f}) - not posting")
+                    update_gui_status("[yellow]Skipped a poll that repeated an earlier question[/]")
+                    return False
+                questions = [(question, options)]
+
+        _submit_poll(self.meeting_id, title, questions, self.outbox, self.stager, self._posted)
+        return True
+
+
+def _fan_out(fn, pipelines, action):
+    """
+    Calls fn(pipeline) for each pipeline, concurrently when there is more than one.
+
+    A failure is logged for its meeting and returns None, so one meeting can't hold up the others.
+    """
+    def call(pipeline):
         try:
-            # Record audio
-            if not record_segment(duration, device=device):
-                consecutive_failures += 1
-                if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+            return fn(pipeline)
+        except Exception as e:
+            logger.error(f"Poll {action} error for meeting {pipeline.meeting_id}: {e}")
+            return None
+
+    if len(pipelines) == 1:
+        return [call(pipelines[0])]
+    with ThreadPoolExecutor(max_workers=len(pipelines), thread_name_prefix=f"poll-{action}") as executor:
+        return list(executor.map(call, pipelines))
+
+
+def _remove_segment(segment_path):
+    if os.path.exists(segment_path):
+        try:
+            os.remove(segment_path)
+        except OSError:
+            pass
+
+
+def _capture_segments(source_id, duration, device, should_stop: threading.Event, segments: queue.Queue,
+                      segment_base):
+    """
+    Cuts segments back to back from one open input stream and queues (path, recorded_at) on
+    `segments` until should_stop is set, then queues None.
+
+    Recording never waits for transcription or generation. If transcription falls
+    SEGMENT_BACKLOG_MAX segments behind, the oldest waiting segment is dropped.
+    """
+    ALERT_AFTER_FAILURES = 3
+    backlog_max = max(1, config.get_config_with_default("SEGMENT_BACKLOG_MAX", 2))
+    backoff = Backoff(f"Capture for {source_id}", should_stop)
+    token_manager = get_token_manager()
+    record_seconds = _stage_seconds.labels("record", source_id)
+    audio_failures = _audio_failures.labels(source_id)
+    backlog = _segment_backlog.labels(source_id)
+    capture = AudioCapture(device) # One input stream for the whole feed; segments are cut from it
+    index = 0
+    try:
+        while not should_stop.is_set():
+            # No valid token and the refresh failed: don't spend Whisper and LLM time on polls
+            # that couldn't be posted; resume as soon as a refresh or a new OAuth login succeeds
+            if not token_manager.is_ready():
+                logger.warning("No valid Zoom token - pausing capture until it is refreshed")
+                update_gui_status("[yellow]⏸️ Waiting for a valid Zoom token (re-authenticate if this persists)...[/]")
+                if not token_manager.wait_until_ready(stop_event=should_stop):
+                    continue
+                capture.flush() # Start from now rather than with audio buffered while paused
+                update_gui_status("[green]Zoom token available - resuming automation[/]")
+
+            index += 1
+            segment_path = f"{segment_base}_{index}.wav"
+            recording_started = time.monotonic()
+            if not record_segment(duration, output_path=segment_path, stop_event=should_stop, capture=capture):
+                _remove_segment(segment_path)
+                if should_stop.is_set():
+                    break
+                audio_failures.inc()
+                if backoff.failures("audio") + 1 == ALERT_AFTER_FAILURES:
                     logger.error("Too many consecutive recording failures")
                     update_gui_status("[red]Recording issues detected. Please check audio setup.[/]")
-                    time.sleep(5)
-                    consecutive_failures = 0
+                backoff.failure("audio", since=recording_started)
+                capture.flush()
                 continue
+            backoff.success("audio")
+            record_seconds.observe(time.monotonic() - recording_started)
+
+            while segments.qsize() >= backlog_max:
+                try:
+                    dropped = segments.get_nowait()
+                except queue.Empty:
+                    break
+                logger.warning(f"Transcription for {source_id} is behind real time - dropping the oldest waiting segment")
+                _remove_segment(dropped[0])
+                _segments_dropped.labels(source_id).inc()
+            segments.put((segment_path, time.monotonic()))
+            backlog.set(segments.qsize())
+    finally:
+        capture.close()
+        segments.put(None)
+        backlog.set(0)
+
+
+def run_source_loop(source_id, duration, device, should_stop: threading.Event, subscribers):
+    """
+    Records and transcribes one audio feed and hands every transcript to each subscribed meeting.
+
+    Capture runs continuously on its own thread; this loop transcribes the recorded segments
+    in order. Whisper runs once per segment however many meetings subscribe. The running
+    summary and the novelty gate follow the feed, since every subscriber hears the same
+    audio. Each meeting's cadence controller then decides whether its speech since the last
+    poll is worth a poll now. Meetings polling on the same speech without prompt instructions
+    share one generated poll; each distinct set of instructions gets its own generation.
+    Those generations, and posting to every meeting, run concurrently.
+    Failures back off per stage (audio, whisper, llm, zoom; see retry_policy.Backoff), and
+    every wait ends as soon as should_stop is set.
 
-            # Reset failure counter on successful recording
-            consecutive_failures = 0
+    Args:
+        source_id (str): Name of the feed; the meeting ID when a meeting has a feed to itself.
+        duration (int): Segment length in seconds.
+        device (str): Audio input device name.
+        should_stop (threading.Event): Ends the loop once set.
+        subscribers (callable): Returns the current list of PollPipeline; meetings may join or
+            leave between segments.
+    """
+    cycle = 0
+    backoff = Backoff(f"Automation loop for {source_id}", should_stop)
+    novelty_gate = get_novelty_gate(source_id)
+    meeting_memory = get_meeting_memory(source_id)
+    segment_base = "segment_{}".format(re.sub(r"[^A-Za-z0-9_-]", "_", str(source_id)))
+    segments = queue.Queue()
+    backlog = _segment_backlog.labels(source_id)
+
+    logger.info(f"Starting automation loop for {source_id}")
+    update_gui_status("[green]Automation started[/]")
+    # Open the Zoom connection now so the first poll doesn't pay for DNS, TCP and TLS
+    threading.Thread(target=get_zoom_client().warm, name="zoom-warm", daemon=True).start()
+    threading.Thread(target=_capture_segments, args=(source_id, duration, device, should_stop, segments, segment_base),
+                     name=f"capture-{source_id}", daemon=True).start()
+
+    item = segments.get()
+    while item is not None:
+        segment_path, recorded_at = item
+        backlog.set(segments.qsize())
+        stage = "whisper" # Failure class for an unexpected error in this cycle
+        try:
+            if should_stop.is_set():
+                continue # Capture queues None once it sees the stop; what it recorded meanwhile is discarded
+            cycle += 1
+            # This segment's poll should be out before the next one is; transcription and
+            # generation are scheduled against that deadline across meetings
+            poll_deadline = recorded_at + min(duration, config.get_config_with_default("POLL_LATENCY_BUDGET", 60))
 
             # Process recording
-            text = transcribe_segment()
+            transcribe_started = time.monotonic()
+            text = transcribe_segment(segment_path, deadline=poll_deadline, owner=source_id, cancel_event=should_stop,
+                                      raise_errors=True)
+            _stage_seconds.labels("transcribe", source_id).observe(time.monotonic() - transcribe_started)
+            if should_stop.is_set():
+                continue
+            backoff.success("whisper")
             if not text:
                 logger.warning("Empty transcription - skipping poll")
                 continue
 
-            # Generate and post poll
-            try:
-                poll_data = generate_poll_from_transcript(text)
-                if poll_data:
-                    post_poll_to_zoom(meeting_id, poll_data)
-            except Exception as e:
-                logger.error(f"Poll generation/posting error: {e}")
+            # Poll on the summary so far plus the new speech; fold the segment in meanwhile
+            meeting_summary = None
+            if meeting_memory is not None:
+                meeting_summary = meeting_memory.summary_text()
+                update_meeting_summary_async(meeting_memory, text)
+
+            is_novel = True
+            if novelty_gate is not None:
+                is_novel, similarity = novelty_gate.check(text)
+                if not is_novel:
+                    logger.info(f"Transcript similarity {similarity:.2f} to last poll - not new material")
+
+            pipelines = [pipeline for pipeline in subscribers() if not pipeline.stopped.is_set()]
+            if not pipelines:
+                continue
+
+            # Which meetings poll now, and on which speech
+            generation = scheduler_stats().get("generation")
+            busy = segments.qsize() > 0 or (generation is not None and generation["queued"] >= generation["capacity"])
+            poll_texts = {} # meeting_id -> transcript the meeting's poll is generated from
+            for pipeline in pipelines:
+                if pipeline.cadence is None:
+                    if is_novel:
+                        poll_texts[pipeline.meeting_id] = text
+                    continue
+                pipeline.cadence.add_speech(text, novel=is_novel)
+                if pipeline.cadence.decide(busy=busy).fire:
+                    poll_texts[pipeline.meeting_id] = pipeline.cadence.pending_text()
+            firing = [pipeline for pipeline in pipelines if pipeline.meeting_id in poll_texts]
+            if not firing:
+                if not is_novel:
+                    novelty_gate.record_skip()
+                    stats = novelty_gate.stats()
+                    logger.info(f"Skipped poll generation (skipped {stats['skips']}, "
+                                f"~{stats['llm_seconds_saved']:.1f} LLM-seconds saved)")
+                    update_gui_status(f"[yellow]Discussion unchanged since last poll - skipped "
+                                      f"({stats['skips']} so far)[/]")
+                continue
+
+            # Generate once per distinct prompt and transcript, then post to every meeting
+            stage = "llm"
+            generation_started = time.monotonic()
+            def poll_key(pipeline):
+                return pipeline.instructions, poll_texts[pipeline.meeting_id]
+
+            generators = {}
+            for pipeline in firing:
+                generators.setdefault(poll_key(pipeline), pipeline)
+            polls = dict(zip(generators, _fan_out(
+                lambda p: p.generate(poll_texts[p.meeting_id], meeting_summary, poll_deadline),
+                list(generators.values()), "generation")))
+            if novelty_gate is not None:
+                novelty_gate.record_generation_seconds(time.monotonic() - generation_started)
+            if len(pipelines) > 1:
+                logger.info(f"Segment {cycle} of {source_id}: {len(generators)} generation(s) "
+                            f"for {len(firing)} of {len(pipelines)} meeting(s)")
+
+            ready = [pipeline for pipeline in firing if polls.get(poll_key(pipeline)) is not None]
+            if not ready:
+                backoff.failure("llm", since=generation_started)
                 continue
+            backoff.success("llm")
+            if novelty_gate is not None:
+                # Only speech a poll was produced for counts as polled; after a failed generation
+                # the same discussion stays novel and is tried again
+                novelty_gate.mark_polled(max((poll_texts[p.meeting_id] for p in ready), key=len))
+            stage = "zoom"
+            posted = _fan_out(lambda p: p.post(*polls[poll_key(p)], poll_texts[p.meeting_id], meeting_summary,
+                                               poll_deadline), ready, "posting")
+            latency = time.monotonic() - recorded_at
+            for pipeline in ready:
+                _poll_latency.labels(pipeline.meeting_id).observe(latency)
+                if pipeline.cadence is not None:
+                    pipeline.cadence.polled(latency)
+            if all(result is None for result in posted):
+                backoff.failure("zoom") # Every meeting's post raised
+            else:
+                backoff.success("zoom")
 
         except Exception as e:
-            logger.error(f"Cycle {cycle} error: {e}", exc_info=True)
-            time.sleep(5)  # Brief pause before next cycle
-            
+            logger.error(f"Cycle {cycle} error ({stage}): {e}", exc_info=True)
+            backoff.failure(stage)
+
         finally:
             # Clean up any temporary files
-            if os.path.exists("segment.wav"):
-                try:
-                    os.remove("segment.wav")
-                except OSError:
-                    pass
+            _remove_segment(segment_path)
+            item = segments.get()
+
+    logger.info(f"Automation loop for {source_id} stopped after {cycle} cycle(s)")
+
+
+def run_loop(meeting_id, duration, device, should_stop: threading.Event, instructions=None, min_interval=None,
+             max_interval=None):
+    """
+    Runs automation for one meeting on its own audio feed until should_stop is set.
+
+    Args:
+        instructions (str, optional): Per-meeting prompt guidance added to every poll request.
+        min_interval (float, optional): Seconds between polls at the least; see poll_cadence.
+        max_interval (float, optional): Seconds after which any new speech gets a poll.
+    """
+    pipeline = PollPipeline(meeting_id, instructions, min_interval, max_interval)
+    pipeline.start()
+    try:
+        run_source_loop(str(meeting_id), duration, device, should_stop, lambda: [pipeline])
+    finally:
+        pipeline.stop()
 
 # Note: This run_loop function is designed to be called in a separate thread by main_gui.py
\ No newline at end of file
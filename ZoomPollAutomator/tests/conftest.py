@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# The app's modules import each other by bare name (import config), as when run from ZoomPollAutomator/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
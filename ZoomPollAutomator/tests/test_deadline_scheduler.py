@@ -0,0 +1,135 @@
+# test_deadline_scheduler.py
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError
+
+import pytest
+
+from deadline_scheduler import DeadlineMissed, DeadlineScheduler, job_owner, set_weight
+
+
+def _owner(name):
+    return f"{name}-{uuid.uuid4().hex[:8]}" # Weights are process-wide; keep each test's owners apart
+
+
+class Gate:
+    """Holds a capacity-1 scheduler's only worker busy while jobs are queued behind it."""
+
+    def __init__(self, scheduler):
+        self.release = threading.Event()
+        started = threading.Event()
+        self.future = scheduler.submit(lambda: (started.set(), self.release.wait(5)), time.monotonic() + 60,
+                                       owner=_owner("gate"), shed=False)
+        assert started.wait(2)
+
+    def open(self):
+        self.release.set()
+
+
+def _run_queued(scheduler, jobs):
+    """Queues (owner, seconds to deadline) jobs behind a busy worker and returns the owners in run order."""
+    order = []
+    gate = Gate(scheduler)
+    now = time.monotonic()
+    futures = [scheduler.submit(lambda owner=owner: order.append(owner), now + slack, owner=owner, shed=False)
+               for owner, slack in jobs]
+    gate.open()
+    for future in futures:
+        future.result(timeout=2)
+    return order
+
+
+def test_earliest_deadline_runs_first():
+    scheduler = DeadlineScheduler("test-edf", 1)
+    late, soon, middle = _owner("late"), _owner("soon"), _owner("middle")
+    assert _run_queued(scheduler, [(late, 300), (soon, 10), (middle, 60)]) == [soon, middle, late]
+
+
+def test_equal_deadlines_run_in_submission_order():
+    scheduler = DeadlineScheduler("test-fifo", 1)
+    owners = [_owner(f"job{index}") for index in range(4)]
+    assert _run_queued(scheduler, [(owner, 30) for owner in owners]) == owners
+
+
+def test_weight_pulls_deadlines_closer():
+    scheduler = DeadlineScheduler("test-weight", 1)
+    heavy, light = _owner("heavy"), _owner("light")
+    set_weight(heavy, 4)
+    # 100s left at weight 4 compares as 25s, ahead of 40s at weight 1
+    assert _run_queued(scheduler, [(light, 40), (heavy, 100)]) == [heavy, light]
+
+
+def test_weight_does_not_push_overdue_jobs_back():
+    scheduler = DeadlineScheduler("test-overdue", 1)
+    heavy, light = _owner("heavy"), _owner("light")
+    set_weight(heavy, 4)
+    now = time.monotonic()
+    assert scheduler._priority(heavy, now - 40, now) == now
+    assert scheduler._priority(heavy, now + 40, now) == pytest.approx(now + 10)
+    # Scaling negative slack would rank the heavy owner's 40s-late job behind a 30s-late one
+    assert _run_queued(scheduler, [(heavy, -40), (light, -30)]) == [heavy, light]
+
+
+def test_starved_job_is_promoted_over_earlier_deadlines():
+    scheduler = DeadlineScheduler("test-starvation", 1, starvation_seconds=0.2)
+    patient, urgent = _owner("patient"), _owner("urgent")
+    order = []
+    gate = Gate(scheduler)
+    starving = scheduler.submit(lambda: order.append(patient), time.monotonic() + 600, owner=patient, shed=False)
+    time.sleep(0.3)
+    pressing = scheduler.submit(lambda: order.append(urgent), time.monotonic() + 1, owner=urgent, shed=False)
+    gate.open()
+    starving.result(timeout=2)
+    pressing.result(timeout=2)
+    assert order == [patient, urgent]
+    assert scheduler.stats()["starvation_promotions"] == 1
+
+
+def test_job_that_cannot_meet_its_deadline_is_shed_on_submit():
+    scheduler = DeadlineScheduler("test-shed", 1)
+    owner = _owner("meeting")
+    scheduler.submit(lambda: time.sleep(0.2), time.monotonic() + 60, owner=owner).result(timeout=2)
+    gate = Gate(scheduler) # The worker is busy and a job takes ~0.2s
+    future = scheduler.submit(lambda: None, time.monotonic() + 0.05, owner=owner)
+    with pytest.raises(DeadlineMissed):
+        future.result(timeout=1)
+    gate.open()
+    assert scheduler.stats()["owners"][owner]["shed"] == 1
+
+
+def test_unshed_job_runs_late_and_counts_a_miss():
+    scheduler = DeadlineScheduler("test-miss", 1)
+    owner = _owner("meeting")
+    assert scheduler.run(lambda: "done", time.monotonic() - 1, owner=owner) == "done"
+    assert scheduler.stats()["owners"][owner]["deadline_misses"] == 1
+
+
+def test_cancel_drops_queued_jobs_and_signals_running_ones():
+    scheduler = DeadlineScheduler("test-cancel", 1)
+    owner, other = _owner("stopped"), _owner("other")
+    running_event, started = threading.Event(), threading.Event()
+    running = scheduler.submit(lambda: (started.set(), running_event.wait(5)), time.monotonic() + 60,
+                               owner=owner, shed=False, cancel_event=running_event)
+    assert started.wait(2)
+    queued = scheduler.submit(lambda: None, time.monotonic() + 60, owner=owner, shed=False)
+    kept = scheduler.submit(lambda: "kept", time.monotonic() + 60, owner=other, shed=False)
+    assert scheduler.cancel(owner) == 2
+    assert running_event.is_set()
+    with pytest.raises(CancelledError):
+        queued.result(timeout=2)
+    assert kept.result(timeout=2) == "kept"
+    assert running.result(timeout=2) is not None
+
+
+def test_job_owner_block_sets_owner_and_cancel_key():
+    scheduler = DeadlineScheduler("test-owner", 1)
+    owner = _owner("meeting")
+    gate = Gate(scheduler)
+    with job_owner(owner, cancel_key=f"key-{owner}"):
+        future = scheduler.submit(lambda: None, time.monotonic() + 60, shed=False)
+    assert scheduler.cancel(owner) == 0 # Filed under its cancel key, not the owner
+    assert scheduler.cancel(f"key-{owner}") == 1
+    with pytest.raises(CancelledError):
+        future.result(timeout=2)
+    gate.open()
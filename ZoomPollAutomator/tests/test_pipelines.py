@@ -0,0 +1,102 @@
+# test_pipelines.py
+import threading
+import time
+import uuid
+
+import pytest
+
+import deadline_scheduler
+import pipelines
+import run_loop
+from deadline_scheduler import get_scheduler
+from pipelines import MeetingPipelines
+
+
+class FakeFeeds:
+    """Stands in for run_source_loop: each feed parks a cancellable transcription job and waits to be stopped."""
+
+    def __init__(self):
+        self.scheduler = get_scheduler(f"test-transcription-{uuid.uuid4().hex[:8]}", 4)
+        self.loops = {} # source_id -> (subscribers, transcription cancel_event)
+        self.started = threading.Event()
+
+    def run_source_loop(self, source_id, duration, device, should_stop, subscribers):
+        cancelled, running = threading.Event(), threading.Event()
+        self.scheduler.submit(lambda: (running.set(), cancelled.wait(5)), time.monotonic() + 60, owner=source_id,
+                              shed=False, cancel_event=cancelled)
+        running.wait(2)
+        self.loops[source_id] = (subscribers, cancelled)
+        self.started.set()
+        should_stop.wait(5)
+
+
+@pytest.fixture
+def feeds(monkeypatch):
+    feeds = FakeFeeds()
+    monkeypatch.setattr(pipelines, "run_source_loop", feeds.run_source_loop)
+    monkeypatch.setattr(pipelines, "get_zoom_outbox", lambda: None)
+    monkeypatch.setattr(run_loop, "get_zoom_outbox", lambda: None)
+    monkeypatch.setattr(run_loop, "get_poll_stager", lambda meeting_id: None)
+    return feeds
+
+
+def _ids():
+    token = uuid.uuid4().hex[:8]
+    return f"host-{token}", f"guest-{token}"
+
+
+def _shared(feeds, host_weight=1.0, guest_weight=1.0):
+    """Starts a host meeting (its ID names the feed) and a guest subscribed to the same feed."""
+    host, guest = _ids()
+    supervisor = MeetingPipelines(stop_grace_seconds=2.0)
+    assert supervisor.start(host, weight=host_weight)
+    assert feeds.started.wait(2)
+    assert supervisor.start(guest, source=host, weight=guest_weight)
+    return supervisor, host, guest
+
+
+def test_meetings_naming_one_source_share_a_feed(feeds):
+    supervisor, host, guest = _shared(feeds)
+    try:
+        assert list(feeds.loops) == [host]
+        subscribers, _ = feeds.loops[host]
+        assert sorted(pipeline.meeting_id for pipeline in subscribers()) == sorted([host, guest])
+        assert supervisor.stats()["sources"][host]["meetings"] == sorted([host, guest])
+    finally:
+        supervisor.stop_all()
+
+
+def test_stopping_the_meeting_that_names_a_shared_feed_keeps_the_feed(feeds):
+    supervisor, host, guest = _shared(feeds)
+    subscribers, transcription_cancelled = feeds.loops[host]
+    [host_pipeline] = [pipeline for pipeline in subscribers() if pipeline.meeting_id == host]
+    try:
+        assert supervisor.stop(host, drain=False)
+        assert host_pipeline.stopped.is_set()
+        # Its own jobs are cancelled under pipeline_jobs(host), which must not match the feed's
+        assert not transcription_cancelled.is_set()
+        assert [pipeline.meeting_id for pipeline in subscribers()] == [guest]
+        assert supervisor.stats()["sources"][host]["running"]
+        assert supervisor.running() == [guest]
+    finally:
+        supervisor.stop_all()
+
+
+def test_last_subscriber_leaving_stops_the_feed(feeds):
+    supervisor, host, guest = _shared(feeds)
+    _, transcription_cancelled = feeds.loops[host]
+    assert supervisor.stop(host, drain=False)
+    assert supervisor.stop(guest, drain=False)
+    assert transcription_cancelled.is_set()
+    assert supervisor.stats()["sources"] == {}
+    assert not supervisor.stop(guest, drain=False)
+
+
+def test_source_weight_follows_its_remaining_subscribers(feeds):
+    supervisor, host, guest = _shared(feeds, host_weight=4.0, guest_weight=1.5)
+    try:
+        assert deadline_scheduler._weights[host] == 4.0
+        assert supervisor.stop(host, drain=False)
+        assert deadline_scheduler._weights[host] == 1.5
+    finally:
+        supervisor.stop_all()
@@ -0,0 +1,138 @@
+# test_poll_journal.py
+import threading
+
+import pytest
+
+import poll_journal
+import zoom_outbox
+from poll_journal import PollJournal
+from zoom_outbox import ZoomOutbox
+
+from test_zoom_outbox import QUESTIONS, FakeResponse, FakeZoomClient
+
+PAYLOAD = {"account": "default", "title": "Shipping order", "questions": [[q, opts] for q, opts in QUESTIONS]}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = PollJournal(str(tmp_path / "journal.sqlite3"))
+    yield journal
+    journal.close()
+
+
+def _reopen(journal):
+    journal.close()
+    return PollJournal(journal.path)
+
+
+def test_open_polls_follow_each_polls_latest_state(journal):
+    journal.record("generated", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.record("posting", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.record("posting", poll_journal.POSTING, "111")
+    journal.record("posted", poll_journal.GENERATED, "222", payload=PAYLOAD)
+    journal.record("posted", poll_journal.POSTING, "222")
+    journal.record("posted", poll_journal.POSTED, "222", zoom_poll_id="zp1")
+    journal.record("failed", poll_journal.GENERATED, "222", payload=PAYLOAD)
+    journal.record("failed", poll_journal.FAILED, "222", error="400")
+
+    journal = _reopen(journal) # What a restarted process sees
+    try:
+        polls = journal.open_polls()
+        assert [(poll["poll_key"], poll["state"]) for poll in polls] == [
+            ("generated", poll_journal.GENERATED), ("posting", poll_journal.POSTING)]
+        assert all(poll["payload"] == PAYLOAD and poll["meeting_id"] == "111" for poll in polls)
+    finally:
+        journal.close()
+
+
+def test_requeued_poll_reopens_after_failure(journal):
+    journal.record("p", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.record("p", poll_journal.FAILED, "111", error="400")
+    journal.record("p", poll_journal.GENERATED, "111") # requeue_dead_letters() writes no new payload
+    [poll] = journal.open_polls()
+    assert poll["state"] == poll_journal.GENERATED and poll["payload"] == PAYLOAD
+
+
+def test_prune_keeps_open_polls(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    journal = PollJournal(path)
+    journal.record("done", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.record("done", poll_journal.POSTED, "111", zoom_poll_id="zp1")
+    journal.record("open", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.close()
+
+    journal = PollJournal(path, retention_seconds=-1) # Everything finished counts as old
+    try:
+        assert journal.history("done") == []
+        assert [poll["poll_key"] for poll in journal.open_polls()] == ["open"]
+    finally:
+        journal.close()
+
+
+def _replay(journal, monkeypatch, client):
+    monkeypatch.setattr(zoom_outbox, "get_zoom_client", lambda: client)
+    outbox = ZoomOutbox(token_provider=lambda account: "token", journal=journal, backoff_base=0.01)
+    received = []
+    done = threading.Event()
+    outbox.add_posted_hook("111", lambda title, questions, body: (received.append((title, questions, body)), done.set()))
+    return outbox, received, done
+
+
+def test_replay_posts_generated_polls_without_reconciling(journal, monkeypatch):
+    journal.record("p", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    client = FakeZoomClient(FakeResponse(201, {"id": "zp1"}))
+    outbox, received, done = _replay(journal, monkeypatch, client)
+    try:
+        assert outbox.resume() == 1
+        assert done.wait(2)
+        assert received == [("Shipping order", QUESTIONS, {"id": "zp1"})]
+        assert [method for method, _ in client.calls] == ["POST"]
+        assert [state for state, *_ in journal.history("p")] == [
+            poll_journal.GENERATED, poll_journal.POSTING, poll_journal.POSTED]
+        assert journal.open_polls() == []
+    finally:
+        outbox.stop()
+
+
+def test_replay_of_interrupted_post_does_not_post_twice(journal, monkeypatch):
+    journal.record("p", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.record("p", poll_journal.POSTING, "111") # Crashed before Zoom's reply was journalled
+    existing = [{"id": "zp1", "title": "Shipping order", "questions": [{"name": QUESTIONS[0][0]}]}]
+    client = FakeZoomClient(FakeResponse(201, {"id": "duplicate"}), existing=existing)
+    outbox, received, done = _replay(journal, monkeypatch, client)
+    try:
+        assert outbox.resume() == 1
+        assert done.wait(2)
+        assert [method for method, _ in client.calls] == ["GET"]
+        assert received[0][2] == {"id": "zp1"}
+        state, _, zoom_poll_id, _ = journal.history("p")[-1]
+        assert (state, zoom_poll_id) == (poll_journal.POSTED, "zp1")
+    finally:
+        outbox.stop()
+
+
+def test_replay_of_interrupted_post_posts_when_zoom_has_no_copy(journal, monkeypatch):
+    journal.record("p", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    journal.record("p", poll_journal.POSTING, "111")
+    client = FakeZoomClient(FakeResponse(201, {"id": "zp2"}))
+    outbox, received, done = _replay(journal, monkeypatch, client)
+    try:
+        assert outbox.resume() == 1
+        assert done.wait(2)
+        assert [method for method, _ in client.calls] == ["GET", "POST"]
+    finally:
+        outbox.stop()
+
+
+def test_replayed_poll_older_than_max_age_expires(journal, monkeypatch):
+    journal.record("p", poll_journal.GENERATED, "111", payload=PAYLOAD)
+    client = FakeZoomClient(FakeResponse(201, {"id": "zp1"}))
+    monkeypatch.setattr(zoom_outbox, "get_zoom_client", lambda: client)
+    outbox = ZoomOutbox(token_provider=lambda account: "token", journal=journal, max_age=-1)
+    try:
+        assert outbox.resume() == 1
+        assert outbox.drain(2)
+        assert client.calls == []
+        assert journal.history("p")[-1][0] == poll_journal.FAILED
+    finally:
+        outbox.stop()
@@ -0,0 +1,234 @@
+# test_zoom_outbox.py
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+import zoom_outbox
+from zoom_outbox import TokenBucket, ZoomOutbox, parse_retry_after
+
+QUESTIONS = [("Which option should we ship first?", ["A", "B", "C", "D"])]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {}
+        self.headers = headers or {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+class FakeZoomClient:
+    """Answers POSTs from a scripted list (the last answer repeats) and GETs with `existing` polls."""
+
+    def __init__(self, *answers, existing=()):
+        self.answers = list(answers)
+        self.existing = list(existing)
+        self.calls = []
+
+    def post(self, path, token=None, **kwargs):
+        self.calls.append(("POST", path))
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def get(self, path, token=None, **kwargs):
+        self.calls.append(("GET", path))
+        return FakeResponse(200, {"polls": self.existing})
+
+
+@pytest.fixture
+def zoom(monkeypatch):
+    def install(*answers, existing=()):
+        client = FakeZoomClient(*answers, existing=existing)
+        monkeypatch.setattr(zoom_outbox, "get_zoom_client", lambda: client)
+        return client
+    return install
+
+
+@pytest.fixture
+def outboxes():
+    created = []
+
+    def make(**kwargs):
+        kwargs.setdefault("token_provider", lambda account: "token")
+        kwargs.setdefault("backoff_base", 0.01)
+        kwargs.setdefault("backoff_max", 0.05)
+        outbox = ZoomOutbox(**kwargs)
+        created.append(outbox)
+        return outbox
+
+    yield make
+    for outbox in created:
+        outbox.stop()
+
+
+def _submit(outbox, meeting_id="111"):
+    posted = []
+    done = threading.Event()
+
+    def on_posted(body):
+        posted.append(body)
+        done.set()
+
+    outbox.submit(meeting_id, "Shipping order", QUESTIONS, on_posted=on_posted)
+    return posted, done
+
+
+def test_created_poll_is_posted_once(zoom, outboxes):
+    client = zoom(FakeResponse(201, {"id": "zp1"}))
+    outbox = outboxes()
+    posted, done = _submit(outbox)
+    assert done.wait(2)
+    assert posted == [{"id": "zp1"}]
+    assert client.calls == [("POST", "/meetings/111/polls")]
+    assert outbox.stats()["posted"] == 1
+    assert outbox.drain(1)
+
+
+def test_server_error_is_retried_after_checking_for_an_earlier_post(zoom, outboxes):
+    client = zoom(FakeResponse(503), FakeResponse(201, {"id": "zp2"}))
+    outbox = outboxes()
+    posted, done = _submit(outbox)
+    assert done.wait(2)
+    assert posted == [{"id": "zp2"}]
+    # The 503 may have followed an accepted POST, so the meeting's polls are checked first
+    assert [method for method, _ in client.calls] == ["POST", "GET", "POST"]
+    assert outbox.stats()["retries"] == 1
+
+
+def test_poll_already_on_zoom_is_not_posted_again(zoom, outboxes):
+    existing = [{"id": "zp3", "title": "Shipping order", "questions": [{"name": QUESTIONS[0][0]}]}]
+    client = zoom(requests.exceptions.ReadTimeout("read timed out"), existing=existing)
+    outbox = outboxes()
+    posted, done = _submit(outbox)
+    assert done.wait(2)
+    assert posted == [{"id": "zp3"}]
+    assert [method for method, _ in client.calls] == ["POST", "GET"]
+
+
+def test_connection_error_retries_without_reconciling(zoom, outboxes):
+    client = zoom(requests.exceptions.ConnectionError("refused"), FakeResponse(201, {"id": "zp4"}))
+    outbox = outboxes()
+    posted, done = _submit(outbox)
+    assert done.wait(2)
+    assert [method for method, _ in client.calls] == ["POST", "POST"]
+
+
+def test_rate_limit_waits_for_retry_after(zoom, outboxes):
+    client = zoom(FakeResponse(429, headers={"Retry-After": "0.3", "X-RateLimit-Type": "QPS"}),
+                  FakeResponse(201, {"id": "zp5"}))
+    outbox = outboxes()
+    started = time.monotonic()
+    posted, done = _submit(outbox)
+    assert done.wait(3)
+    assert time.monotonic() - started >= 0.3
+    assert outbox.stats()["rate_limited"] == 1
+    assert len(client.calls) == 2
+
+
+def test_rate_limit_beyond_max_retry_after_dead_letters(zoom, outboxes):
+    zoom(FakeResponse(429, headers={"Retry-After": "3600"}))
+    outbox = outboxes(max_retry_after=60)
+    _submit(outbox)
+    assert outbox.drain(2)
+    [dead] = outbox.dead_letters()
+    assert "rate limited" in dead["error"]
+
+
+def test_client_error_dead_letters_and_requeue_posts(zoom, outboxes):
+    client = zoom(FakeResponse(400, {"message": "bad poll"}), FakeResponse(201, {"id": "zp6"}))
+    outbox = outboxes()
+    posted, done = _submit(outbox)
+    assert outbox.drain(2)
+    assert not posted
+    assert [dead["title"] for dead in outbox.dead_letters()] == ["Shipping order"]
+
+    assert outbox.requeue_dead_letters() == 1
+    assert done.wait(2)
+    assert posted == [{"id": "zp6"}]
+    assert outbox.dead_letters() == []
+    assert len(client.calls) == 2
+
+
+def test_gives_up_after_max_attempts(zoom, outboxes):
+    client = zoom(FakeResponse(500))
+    outbox = outboxes(max_attempts=3, meeting_rate=100) # Default pacing would hold the third attempt 5s
+    _submit(outbox)
+    assert outbox.drain(3)
+    [dead] = outbox.dead_letters()
+    assert dead["attempts"] == 3
+    assert [method for method, _ in client.calls].count("POST") == 3
+
+
+def test_meeting_bucket_paces_posts_to_one_meeting(zoom, outboxes):
+    zoom(FakeResponse(201, {"id": "zp"}))
+    outbox = outboxes(meeting_rate=5, meeting_burst=1)
+    started = time.monotonic()
+    _, first = _submit(outbox)
+    _, second = _submit(outbox)
+    assert second.wait(2)
+    assert first.is_set() # Posted in order; a new bucket doesn't hold back the first poll
+    assert time.monotonic() - started >= 0.2
+    assert outbox.stats()["throttled"] >= 1
+
+
+def test_posted_hook_receives_polls_posted_before_it_was_added(zoom, outboxes):
+    zoom(FakeResponse(201, {"id": "zp7"}))
+    outbox = outboxes()
+    outbox.submit("222", "Shipping order", QUESTIONS)
+    assert outbox.drain(2)
+    received = []
+    outbox.add_posted_hook("222", lambda title, questions, body: received.append((title, body)))
+    assert received == [("Shipping order", {"id": "zp7"})]
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=2, burst=2)
+    now = bucket.updated
+    for _ in range(2):
+        assert bucket.wait_time(now) == 0
+        bucket.consume(now)
+    assert bucket.wait_time(now) == pytest.approx(0.5)
+    assert bucket.wait_time(now + 0.5) == pytest.approx(0.0)
+
+
+def test_token_bucket_refill_is_capped_at_burst():
+    bucket = TokenBucket(rate=10, burst=3)
+    now = bucket.updated + 60
+    for _ in range(3):
+        bucket.consume(now)
+    assert bucket.wait_time(now) == pytest.approx(0.1)
+
+
+def test_token_bucket_block_outlasts_refill():
+    bucket = TokenBucket(rate=100, burst=5)
+    now = bucket.updated
+    bucket.block(now + 4)
+    bucket.block(now + 1) # An earlier Retry-After never shortens the block
+    assert bucket.wait_time(now) == pytest.approx(4)
+    assert bucket.wait_time(now + 4) == 0
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120", 120.0),
+    ("1.5", 1.5),
+    ("-3", 0.0),
+    ("", None),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    now = 1_700_000_000
+    assert parse_retry_after(formatdate(now + 30, usegmt=True), now=now) == pytest.approx(30)
+    assert parse_retry_after(formatdate(now - 30, usegmt=True), now=now) == 0.0
@@ -0,0 +1,135 @@
+# test_zoom_webhooks.py
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+import zoom_webhooks
+from zoom_webhooks import SIGNATURE_MAX_AGE, WebhookDispatcher, url_validation_response, verify_request
+
+SECRET = "webhook-secret"
+NOW = 1_700_000_000
+BODY = json.dumps({"event": "meeting.started", "payload": {"object": {"id": 111}}}).encode()
+
+
+def _signed_headers(body=BODY, secret=SECRET, timestamp=NOW):
+    message = b"v0:" + str(timestamp).encode() + b":" + body
+    signature = "v0=" + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return {"x-zm-request-timestamp": str(timestamp), "x-zm-signature": signature}
+
+
+def test_valid_signature_is_accepted():
+    assert verify_request(_signed_headers(), BODY, secret_token=SECRET, now=NOW) == (True, None)
+
+
+def test_tampered_body_is_rejected():
+    assert verify_request(_signed_headers(), BODY + b" ", secret_token=SECRET, now=NOW) == (False, "signature mismatch")
+
+
+def test_signature_from_another_secret_is_rejected():
+    headers = _signed_headers(secret="someone-else")
+    assert verify_request(headers, BODY, secret_token=SECRET, now=NOW) == (False, "signature mismatch")
+
+
+@pytest.mark.parametrize("skew", [SIGNATURE_MAX_AGE + 1, -(SIGNATURE_MAX_AGE + 1)])
+def test_stale_or_future_timestamp_is_rejected_as_a_replay(skew):
+    ok, reason = verify_request(_signed_headers(timestamp=NOW - skew), BODY, secret_token=SECRET, now=NOW)
+    assert not ok and "old" in reason
+
+
+def test_timestamp_within_the_window_is_accepted():
+    headers = _signed_headers(timestamp=NOW - SIGNATURE_MAX_AGE)
+    assert verify_request(headers, BODY, secret_token=SECRET, now=NOW) == (True, None)
+
+
+@pytest.mark.parametrize("timestamp", ["", "yesterday"])
+def test_missing_or_invalid_timestamp_is_rejected(timestamp):
+    headers = dict(_signed_headers(), **{"x-zm-request-timestamp": timestamp})
+    assert verify_request(headers, BODY, secret_token=SECRET, now=NOW) == (False, "missing or invalid timestamp")
+
+
+def test_secret_token_takes_precedence_over_verification_token():
+    headers = {"authorization": "legacy"}
+    ok, _ = verify_request(headers, BODY, secret_token=SECRET, verification_token="legacy", now=NOW)
+    assert not ok
+
+
+def test_legacy_verification_token():
+    assert verify_request({"authorization": "legacy"}, BODY, verification_token="legacy") == (True, None)
+    assert verify_request({"authorization": "wrong"}, BODY, verification_token="legacy") == \
+        (False, "verification token mismatch")
+
+
+def test_nothing_configured_rejects_everything():
+    ok, reason = verify_request(_signed_headers(), BODY, now=NOW)
+    assert not ok and "configured" in reason
+
+
+def test_url_validation_response():
+    response = url_validation_response(SECRET, "plain")
+    assert response == {"plainToken": "plain",
+                        "encryptedToken": hmac.new(SECRET.encode(), b"plain", hashlib.sha256).hexdigest()}
+
+
+class FakePipelines:
+    def __init__(self):
+        self.calls = []
+
+    def start(self, meeting_id):
+        self.calls.append(("start", meeting_id))
+        return True
+
+    def stop(self, meeting_id, drain=True):
+        self.calls.append(("stop", meeting_id))
+        return True
+
+
+def _event(name, meeting_id, event_ts=NOW):
+    return {"event": name, "event_ts": event_ts, "payload": {"object": {"id": meeting_id}}}
+
+
+def _wait_handled(dispatcher, count):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        stats = dispatcher.stats()
+        if stats["handled"] + stats["ignored"] + stats["errors"] >= count:
+            return stats
+        time.sleep(0.01)
+    raise AssertionError(f"dispatcher handled too few events: {dispatcher.stats()}")
+
+
+@pytest.fixture(autouse=True)
+def no_stagers(monkeypatch):
+    monkeypatch.setattr(zoom_webhooks, "get_poll_stager", lambda meeting_id: None)
+
+
+def test_meeting_events_start_and_stop_automation():
+    pipelines = FakePipelines()
+    dispatcher = WebhookDispatcher(pipelines)
+    assert dispatcher.submit(_event("meeting.started", 111))
+    assert dispatcher.submit(_event("meeting.ended", 111, NOW + 60))
+    _wait_handled(dispatcher, 2)
+    assert pipelines.calls == [("start", "111"), ("stop", "111")]
+
+
+def test_redelivered_event_is_dropped():
+    pipelines = FakePipelines()
+    dispatcher = WebhookDispatcher(pipelines)
+    assert dispatcher.submit(_event("meeting.started", 111))
+    assert not dispatcher.submit(_event("meeting.started", 111))
+    stats = _wait_handled(dispatcher, 1)
+    assert stats["duplicates"] == 1
+    assert pipelines.calls == [("start", "111")]
+
+
+def test_unwatched_meetings_and_disabled_autostart_are_ignored():
+    pipelines = FakePipelines()
+    dispatcher = WebhookDispatcher(pipelines, autostart=False, meeting_ids=["111"])
+    dispatcher.submit(_event("meeting.started", 222))
+    dispatcher.submit(_event("meeting.started", 111))
+    dispatcher.submit(_event("meeting.ended", 111, NOW + 60))
+    stats = _wait_handled(dispatcher, 3)
+    assert stats["ignored"] == 2
+    assert pipelines.calls == [("stop", "111")]
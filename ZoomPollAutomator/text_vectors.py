@@ -0,0 +1,74 @@
+# text_vectors.py
+import re
+import zlib
+
+import numpy as np
+
+# Common English filler that carries no topic signal in meeting speech
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just let me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you your
+yours yourself yourselves yeah yes okay ok um uh like really right well going gonna get got know think
+mean thing things kind sort actually basically one two also maybe lot thank thanks
+""".split())
+
+DEFAULT_DIMS = 4096
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> list[str]:
+    """Lowercases and splits text into word tokens, optionally dropping stopwords."""
+    tokens = re.findall(r"[a-z0-9']+", text.lower())
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in STOPWORDS and len(t) > 1]
+    return tokens
+
+
+def _bucket(term: str, dims: int) -> int:
+    return zlib.crc32(term.encode("utf-8")) % dims
+
+
+def term_counts(text: str, dims: int = DEFAULT_DIMS, bigrams: bool = False) -> np.ndarray:
+    """
+    Hashes unigrams (and optionally bigrams) of text into a fixed-size count vector.
+
+    The hashing trick keeps vectors comparable across segments without a shared vocabulary.
+    """
+    tokens = tokenize(text)
+    terms = tokens + ([f"{a} {b}" for a, b in zip(tokens, tokens[1:])] if bigrams else [])
+    vector = np.zeros(dims, dtype=np.float32)
+    if terms:
+        np.add.at(vector, np.fromiter((_bucket(t, dims) for t in terms), dtype=np.int64, count=len(terms)), 1.0)
+    return vector
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine similarity of two vectors; 0.0 when either is empty."""
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    if norm == 0.0:
+        return 0.0
+    return float(np.dot(a, b) / norm)
+
+
+class OnlineIdf:
+    """Document frequencies accumulated over the segments seen so far in a meeting."""
+
+    def __init__(self, dims: int = DEFAULT_DIMS):
+        self.dims = dims
+        self.doc_freq = np.zeros(dims, dtype=np.float32)
+        self.docs = 0
+
+    def add(self, counts: np.ndarray):
+        self.doc_freq += counts > 0
+        self.docs += 1
+
+    def weights(self) -> np.ndarray:
+        # Smoothed IDF so unseen terms still get a finite, highest weight
+        return np.log((1.0 + self.docs) / (1.0 + self.doc_freq)) + 1.0
+
+    def tfidf(self, counts: np.ndarray) -> np.ndarray:
+        tf = np.log1p(counts) # Sublinear TF keeps repeated filler from dominating
+        return tf * self.weights()
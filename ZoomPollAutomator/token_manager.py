@@ -0,0 +1,299 @@
+# token_manager.py
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+import config
+from zoom_client import get_zoom_client
+
+logger = logging.getLogger(__name__)
+
+ZOOM_TOKEN_URL = "https://zoom.us/oauth/token"
+EXPIRY_SKEW = 30 # Treat a token as expired this many seconds early so in-flight calls don't race expiry
+MAX_RETRY_SECONDS = 60
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def _notify_gui(message):
+    try:
+        from main_gui import gui_queue
+        if gui_queue:
+            gui_queue.put(('STATUS', message))
+    except ImportError:
+        pass # Ignore if gui_queue is not available
+
+
+class ZoomTokenManager:
+    """
+    Keeps a valid Zoom OAuth access token available without callers ever waiting on a refresh.
+
+    Stores the access token, the refresh token and the expiry from each OAuth response, and
+    refreshes in a background thread `refresh_margin` seconds before expiry. Refreshes are
+    single-flight: concurrent refresh() calls (e.g. several 401s at once) share one token
+    request, and Zoom's rotated refresh token is saved immediately. get_token() only reads
+    the current token; when no valid token is available it returns None and upstream stages
+    should wait_until_ready() rather than generate polls that can't be posted.
+    """
+
+    def __init__(self, client_id, client_secret, path=None, refresh_margin=300, token_url=ZOOM_TOKEN_URL):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.token_url = token_url
+        self._cond = threading.Condition() # Guards the token state; notified on every change
+        self._refresh_lock = threading.Lock() # Single-flight refreshes
+        self._wake = threading.Event()
+        self._access_token = None
+        self._refresh_token = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._needs_reauth = False
+        self._thread = None
+        self._stats = {"refreshes": 0, "refresh_failures": 0, "shared_refreshes": 0, "invalidations": 0,
+                       "refresh_seconds": 0.0}
+        self._load()
+
+    # --- Storage ---------------------------------------------------------------------------
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self._access_token = saved.get("access_token")
+            self._refresh_token = saved.get("refresh_token")
+            self._expires_at = float(saved.get("expires_at", 0))
+            self._refresh_at = self._expires_at - self.refresh_margin
+            self._publish()
+            logger.info(f"Loaded saved Zoom tokens (access token valid for {max(0, self._expires_at - time.time()):.0f}s)")
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable Zoom token file {self.path}: {e}")
+
+    def _persist(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600) # Tokens are credentials
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"access_token": self._access_token, "refresh_token": self._refresh_token,
+                           "expires_at": self._expires_at}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save Zoom tokens to {self.path}: {e}")
+
+    def _publish(self):
+        """Mirrors the access token into config for code that still reads ZOOM_TOKEN."""
+        config.set_config("ZOOM_TOKEN", self._access_token)
+        config.set_config("TOKEN_EXPIRY", self._expires_at)
+
+    # --- Token access ----------------------------------------------------------------------
+
+    def set_tokens(self, token_response):
+        """
+        Stores the tokens from an OAuth token response (authorization_code or refresh_token grant).
+
+        Args:
+            token_response (dict): Zoom's JSON with access_token, refresh_token and expires_in.
+        """
+        with self._cond:
+            self._access_token = token_response.get("access_token")
+            # Zoom rotates refresh tokens; keep the old one only if the response didn't include one
+            self._refresh_token = token_response.get("refresh_token") or self._refresh_token
+            expires_in = float(token_response.get("expires_in", 3600))
+            self._expires_at = time.time() + expires_in
+            # Refresh refresh_margin early, but never in the first half of a short-lived token's life
+            self._refresh_at = time.time() + max(expires_in - self.refresh_margin, expires_in / 2)
+            self._needs_reauth = False
+            self._persist()
+            self._publish()
+            self._cond.notify_all()
+        self._wake.set() # Reschedule the background refresh for the new expiry
+        self.start()
+
+    def _valid(self, now=None):
+        return bool(self._access_token) and (now or time.time()) < self._expires_at - EXPIRY_SKEW
+
+    def get_token(self):
+        """
+        Returns the current access token without blocking, or None if it has expired.
+
+        A token inside the refresh margin is still returned; the background thread is nudged
+        so the refresh is already under way.
+        """
+        with self._cond:
+            token = self._access_token if self._valid() else None
+            due = self._refresh_token and time.time() >= self._refresh_at
+        if due:
+            self._wake.set()
+        return token
+
+    def has_tokens(self):
+        """True once an OAuth login (or the saved token file) has provided tokens."""
+        with self._cond:
+            return bool(self._access_token or self._refresh_token)
+
+    def is_ready(self):
+        with self._cond:
+            return self._valid()
+
+    def needs_reauth(self):
+        """True when the refresh token was rejected and the user must authorize again."""
+        with self._cond:
+            return self._needs_reauth
+
+    def wait_until_ready(self, timeout=None, stop_event=None):
+        """
+        Blocks until a valid access token is available.
+
+        Args:
+            timeout (float, optional): Max seconds to wait.
+            stop_event (threading.Event, optional): Returns early once set.
+
+        Returns:
+            bool: True if a valid token is available.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._valid():
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(1.0 if remaining is None else min(1.0, remaining))
+            return True
+
+    def invalidate(self, token):
+        """
+        Reports that Zoom rejected `token` (a 401) and starts a refresh if it is still current.
+
+        Returns:
+            bool: True if a refresh is possible, so the caller can retry shortly.
+        """
+        with self._cond:
+            if token and token == self._access_token:
+                self._expires_at = self._refresh_at = 0.0
+                self._stats["invalidations"] += 1
+            can_refresh = bool(self._refresh_token) and not self._needs_reauth
+        if can_refresh:
+            self._wake.set()
+            self.start()
+        return can_refresh
+
+    # --- Refresh ---------------------------------------------------------------------------
+
+    def refresh(self):
+        """
+        Exchanges the refresh token for a new access token (single-flight).
+
+        Returns:
+            bool: True if a valid access token is available afterwards.
+        """
+        with self._cond:
+            token_before = self._access_token
+        with self._refresh_lock:
+            with self._cond:
+                if self._access_token != token_before and self._valid():
+                    self._stats["shared_refreshes"] += 1 # Another caller refreshed while we waited
+                    return True
+                refresh_token = self._refresh_token
+            if not refresh_token or not self.client_id or not self.client_secret:
+                return False
+
+            started = time.monotonic()
+            try:
+                response = get_zoom_client().post(self.token_url, auth=(self.client_id, self.client_secret),
+                                                  data={"grant_type": "refresh_token", "refresh_token": refresh_token})
+            except requests.exceptions.RequestException as e:
+                self._refresh_failed(f"network error: {e}")
+                return False
+            if response.status_code in (400, 401):
+                # invalid_grant: the refresh token was revoked, expired or already used
+                with self._cond:
+                    self._needs_reauth = True
+                self._refresh_failed(f"{response.status_code} - {response.text[:200]}")
+                _notify_gui("[red]❌ Zoom authorization expired. Please re-authenticate with Zoom.[/]")
+                return False
+            if not response.ok:
+                self._refresh_failed(f"{response.status_code} - {response.text[:200]}")
+                return False
+            try:
+                self.set_tokens(response.json())
+            except ValueError as e:
+                self._refresh_failed(f"unreadable response: {e}")
+                return False
+            with self._cond:
+                self._stats["refreshes"] += 1
+                self._stats["refresh_seconds"] += time.monotonic() - started
+            logger.info(f"🔑 Refreshed Zoom access token ({(time.monotonic() - started) * 1000:.0f} ms)")
+            return True
+
+    def _refresh_failed(self, reason):
+        with self._cond:
+            self._stats["refresh_failures"] += 1
+        logger.error(f"❌ Zoom token refresh failed: {reason}")
+
+    def start(self):
+        """Starts the background refresher (idempotent)."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="zoom-token-refresh", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                can_refresh = bool(self._refresh_token) and not self._needs_reauth
+                due_in = self._refresh_at - time.time()
+            if not can_refresh:
+                failures = 0
+                self._wake.wait() # Until set_tokens() brings a usable refresh token
+                self._wake.clear()
+                continue
+            if failures:
+                due_in = max(due_in, min(MAX_RETRY_SECONDS, 2 ** failures)) # Back off between failed refreshes
+            if due_in > 0:
+                self._wake.wait(due_in)
+                self._wake.clear()
+                with self._cond:
+                    if time.time() < self._refresh_at:
+                        failures = 0 # New tokens arrived while we waited
+                        continue
+            failures = 0 if self.refresh() else failures + 1
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["ready"] = self._valid()
+            stats["needs_reauth"] = self._needs_reauth
+            stats["expires_in_seconds"] = max(0.0, self._expires_at - time.time())
+        stats["avg_refresh_seconds"] = stats["refresh_seconds"] / stats["refreshes"] if stats["refreshes"] else 0.0
+        return stats
+
+
+def get_token_manager():
+    """Returns the shared Zoom token manager, creating it (and loading saved tokens) on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ZoomTokenManager(
+                config.get_config("CLIENT_ID"),
+                config.get_config("CLIENT_SECRET"),
+                path=config.get_config("ZOOM_TOKEN_PATH") or None,
+                refresh_margin=config.get_config_with_default("ZOOM_TOKEN_REFRESH_MARGIN", 300),
+            )
+            if _manager.has_tokens():
+                _manager.start()
+    return _manager
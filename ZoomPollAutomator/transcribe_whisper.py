@@ -6,12 +6,22 @@ import logging
 import soundfile as sf
 import threading
 import numpy as np # Import numpy for array checks
+from concurrent.futures import CancelledError
+
+import config
+import metrics
+from deadline_scheduler import get_scheduler
 
 logger = logging.getLogger(__name__)
 
 _model = None
 _model_lock = threading.Lock()
 
+_stats_lock = threading.Lock()
+_stats = {"transcriptions": 0, "transcribe_seconds": 0.0}
+_whisper_seconds = metrics.histogram("zoompoll_whisper_seconds", "Whisper model time per segment (queue wait excluded).",
+                                     ("meeting",))
+
 def get_model():
     """Loads and returns the Whisper tiny.en model (thread-safe lazy loading)."""
     global _model
@@ -27,8 +37,53 @@ def get_model():
     return _model
 
 
-def transcribe_segment(audio_path: str = "segment.wav") -> str:
-    """Enhanced transcription with better error handling."""
+class TranscriptionCancelled(Exception):
+    """Raised inside a transcription job when its cancel flag is set."""
+
+
+class _CancellableModel:
+    """
+    Stands in for the shared Whisper model in whisper.transcribe and checks a cancel flag
+    before each 30 s window is decoded. Whisper still seeks on its own timestamps, so no
+    words are split at window edges, and the shared model itself is left untouched.
+    """
+
+    def __init__(self, model, *cancel_events):
+        self._model = model
+        self._cancel_events = cancel_events
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def decode(self, mel, options):
+        if any(event.is_set() for event in self._cancel_events):
+            raise TranscriptionCancelled("stopped between windows")
+        return self._model.decode(mel, options)
+
+
+def _get_scheduler():
+    # One model serves every meeting; Whisper's decoder keeps per-call state on the model, so
+    # transcriptions run one at a time, earliest next-poll deadline first
+    return get_scheduler("transcription", 1)
+
+
+def transcribe_segment(audio_path: str = "segment.wav", deadline: float = None, owner: str = None,
+                       cancel_event: threading.Event = None, raise_errors: bool = False) -> str:
+    """
+    Enhanced transcription with better error handling.
+
+    Args:
+        audio_path (str): WAV file to transcribe.
+        deadline (float, optional): time.monotonic() by which the meeting's next poll is due;
+            orders this job against other meetings' segments. Defaults to POLL_LATENCY_BUDGET from now.
+        owner (str, optional): Meeting or source the segment belongs to, for weights and miss counts.
+        cancel_event (threading.Event, optional): Cancel flag (e.g. the capture loop's stop
+            event); only read, never set. Once set, or once the job is cancelled through the
+            scheduler, a queued job is dropped and a running one stops before Whisper decodes
+            its next 30 s window; "" is returned.
+        raise_errors (bool): Raise model and transcription errors instead of returning "", so
+            a caller can tell a failure from a segment without speech.
+    """
     if not os.path.exists(audio_path):
         logger.error(f"Audio file not found: {audio_path}")
         return ""
@@ -48,24 +103,59 @@ def transcribe_segment(audio_path: str = "segment.wav") -> str:
             model = get_model()
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {e}")
+            if raise_errors:
+                raise
             return ""
 
         # Transcribe with improved parameters
-        result = model.transcribe(
-            audio_path,
-            fp16=False,
-            temperature=0.0,
-            language='en',
-            task='transcribe'
-        )
+        def transcribe():
+            started = time.monotonic()
+            result = whisper.transcribe(
+                _CancellableModel(model, job_cancelled, *([cancel_event] if cancel_event is not None else [])),
+                audio_path,
+                fp16=False,
+                temperature=0.0,
+                language='en',
+                task='transcribe'
+            )
+            elapsed = time.monotonic() - started
+            with _stats_lock:
+                _stats["transcriptions"] += 1
+                _stats["transcribe_seconds"] += elapsed
+            _whisper_seconds.labels(owner or "").observe(elapsed)
+            return result
+
+        if deadline is None:
+            deadline = time.monotonic() + config.get_config_with_default("POLL_LATENCY_BUDGET", 60)
+        if cancel_event is not None and cancel_event.is_set():
+            return ""
+        # The job gets its own flag: the scheduler sets it to cancel this job only, and must
+        # never set the caller's event (a capture loop's stop event ends the whole feed)
+        job_cancelled = threading.Event()
+        result = _get_scheduler().run(transcribe, deadline, owner=owner, cancel_event=job_cancelled)
 
         text = result.get("text", "").strip()
         if not text:
             logger.warning("Transcription returned empty text")
         return text
 
+    except (TranscriptionCancelled, CancelledError) as e:
+        logger.info(f"Transcription cancelled: {e or 'dropped from the queue'}")
+        return ""
     except Exception as e:
         logger.error(f"Transcription error: {e}", exc_info=True)
+        if raise_errors:
+            raise
         return ""
 
+
+def transcription_stats():
+    """Transcriptions run on the shared model; per-meeting waits and deadline misses are in "scheduler"."""
+    with _stats_lock:
+        stats = dict(_stats)
+    count = stats["transcriptions"]
+    stats["avg_transcribe_seconds"] = stats["transcribe_seconds"] / count if count else 0.0
+    stats["scheduler"] = _get_scheduler().stats()
+    return stats
+
 # ... (if __name__ == "__main__" block for testing)
\ No newline at end of file
@@ -0,0 +1,553 @@
+# zoom_outbox.py
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import config
+import metrics
+import poll_journal
+from poll_journal import get_poll_journal
+from poller import build_poll_payload, notify_token_expired
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = "default"
+RETRYABLE_STATUS = (500, 502, 503, 504)
+TOKEN_WAIT_SECONDS = 2 # Re-check interval while no valid Zoom token is available
+UNCLAIMED_MAX = 50 # Posted polls kept per meeting until that meeting registers its posted hook
+
+_outbox = None
+_outbox_lock = threading.Lock()
+_post_latency = metrics.histogram("zoompoll_outbox_post_seconds", "Time from a poll entering the outbox to Zoom accepting it.",
+                                  ("meeting",))
+_dead_lettered = metrics.counter("zoompoll_outbox_dead_letters_total", "Polls the outbox gave up on.", ("meeting",))
+_pending = metrics.gauge("zoompoll_outbox_pending", "Polls queued or being posted.", ("meeting",))
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` requests per second with bursts of up to `burst`.
+
+    A 429 from Zoom can also block the bucket outright until its Retry-After has passed.
+    Not thread-safe on its own; the outbox calls it under its lock.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = max(float(rate), 1e-6)
+        self.capacity = max(float(burst), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        # `now` may predate the bucket when it was read before the bucket was created
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def consume(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until):
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class OutboxItem:
+    """One poll waiting to be posted, with its retry state."""
+
+    def __init__(self, item_id, meeting_id, account, title, questions, on_posted=None, key=None):
+        self.id = item_id
+        self.key = key or uuid.uuid4().hex # Journal key; survives restarts unlike id
+        self.meeting_id = meeting_id
+        self.account = account
+        self.title = title
+        self.questions = questions
+        self.on_posted = on_posted
+        self.attempts = 0
+        self.created_at = time.monotonic()
+        self.next_attempt = self.created_at
+        self.last_error = None
+        self.needs_reconcile = False # A previous POST may have reached Zoom without us seeing the reply
+
+    def payload(self):
+        return {"account": self.account, "title": self.title, "questions": [[q, opts] for q, opts in self.questions]}
+
+    def describe(self):
+        return {"id": self.id, "key": self.key, "meeting_id": self.meeting_id, "account": self.account, "title": self.title,
+                "questions": [q for q, _ in self.questions], "attempts": self.attempts,
+                "age_seconds": time.monotonic() - self.created_at, "error": self.last_error}
+
+
+def parse_retry_after(value, now=None):
+    """
+    Converts a Retry-After header (delta-seconds or an HTTP date) into seconds to wait.
+
+    Returns:
+        float or None: Seconds from now, or None if the header is missing or unreadable.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+class ZoomOutbox:
+    """
+    Posts polls to Zoom from background workers so the capture loop never waits on the API.
+
+    Polls are queued by next-attempt time. Before each POST the worker takes a token from the
+    account's bucket and from the meeting's bucket; if either is empty the poll is re-queued
+    for when a token frees up, so one busy meeting doesn't hold up the others.
+    - 201: posted; the item's on_posted callback, or else the meeting's posted hook (see
+      add_posted_hook), runs on the worker thread.
+    - 429: the account bucket is blocked for Retry-After (or the backoff delay without one).
+    - 5xx and network errors: retried with exponential backoff and full jitter.
+    - 401: retried once the token manager has refreshed the token; dead-lettered if it can't.
+    - other 4xx, too many attempts, or a poll older than max_age: dead-lettered.
+
+    With a PollJournal every state change is journalled. resume() requeues polls a previous
+    process left unposted, and any poll whose earlier POST ended ambiguously (timeout, 5xx, or
+    a crash mid-request) is first looked up in GET /meetings/{id}/polls so it isn't posted twice.
+    """
+
+    def __init__(self, account_rate=10, account_burst=10, meeting_rate=0.2, meeting_burst=2, max_attempts=6,
+                 backoff_base=1.0, backoff_max=60.0, max_age=600.0, max_retry_after=300.0, dead_letter_size=100,
+                 token_provider=None, journal=None, workers=1):
+        self.account_rate = account_rate
+        self.account_burst = account_burst
+        self.meeting_rate = meeting_rate
+        self.meeting_burst = meeting_burst
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_age = max_age
+        self.max_retry_after = max_retry_after
+        self.token_provider = token_provider or (lambda account: get_token_manager().get_token())
+        self.journal = journal
+        self._queue = [] # heap of (next_attempt, seq, OutboxItem)
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._account_buckets = {}
+        self._meeting_buckets = {}
+        self._dead_letters = deque(maxlen=dead_letter_size)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._in_flight = 0
+        self._in_flight_meetings = Counter()
+        self._posted_hooks = {} # meeting_id -> hook(title, questions, response)
+        self._unclaimed = {} # meeting_id -> (title, questions, response) posted before its hook was added
+        self._stats = {"submitted": 0, "posted": 0, "attempts": 0, "retries": 0, "rate_limited": 0,
+                       "throttled": 0, "dead_lettered": 0, "post_latency_seconds": 0.0}
+        # Several workers let polls for different meetings (e.g. one segment fanned out to
+        # simulcast meetings) post concurrently; the buckets still pace each meeting and account
+        self._workers = [threading.Thread(target=self._run, name=f"zoom-outbox-{index}", daemon=True)
+                         for index in range(max(1, int(workers)))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, meeting_id, title, questions, account=None, on_posted=None):
+        """
+        Queues a poll for posting and returns immediately.
+
+        Args:
+            meeting_id (str): Zoom meeting ID.
+            title (str): Poll title.
+            questions (list[tuple[str, list[str]]]): (question, options) pairs.
+            account (str, optional): Zoom account the meeting belongs to, for the account rate limit.
+            on_posted (callable, optional): Called with the Zoom response JSON once the poll is posted.
+
+        Returns:
+            int: Outbox item id.
+        """
+        item = OutboxItem(next(self._ids), meeting_id, account or DEFAULT_ACCOUNT, title, questions, on_posted)
+        self._journal(item, poll_journal.GENERATED, payload=item.payload()) # Before the worker can see it
+        with self._cond:
+            heapq.heappush(self._queue, (item.next_attempt, next(self._seq), item))
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        logger.info(f"📮 Queued poll '{title}' for meeting {meeting_id} (outbox item {item.id}, {len(self._queue)} queued)")
+        return item.id
+
+    def add_posted_hook(self, meeting_id, hook):
+        """
+        Registers hook(title, questions, response) for every poll posted to the meeting without
+        its own on_posted, including polls resumed from the journal after a restart. Polls that
+        were posted before the meeting registered its hook are handed to it now.
+        """
+        meeting_id = str(meeting_id)
+        with self._cond:
+            self._posted_hooks[meeting_id] = hook
+            missed = list(self._unclaimed.pop(meeting_id, ()))
+        for title, questions, body in missed:
+            self._run_callback(lambda: hook(title, questions, body), f"posted hook for meeting {meeting_id}")
+
+    def _run_callback(self, callback, what):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"❌ {what} failed: {e}", exc_info=True)
+
+    def _journal(self, item, state, **fields):
+        if self.journal is not None:
+            self.journal.record(item.key, state, item.meeting_id, **fields)
+
+    def resume(self):
+        """
+        Requeues polls the journal shows as generated or mid-post from an earlier run.
+
+        Polls interrupted while posting are reconciled against the meeting's existing polls
+        before any new POST. Their age counts from when they were first generated, so polls
+        from a meeting long over expire instead of posting.
+
+        Returns:
+            int: Number of polls requeued.
+        """
+        if self.journal is None:
+            return 0
+        polls = self.journal.open_polls()
+        now, wall_now = time.monotonic(), time.time()
+        with self._cond:
+            for poll in polls:
+                payload = poll["payload"]
+                item = OutboxItem(next(self._ids), poll["meeting_id"], payload.get("account", DEFAULT_ACCOUNT),
+                                  payload.get("title", "Meeting Poll"),
+                                  [(q, list(opts)) for q, opts in payload.get("questions", [])], key=poll["poll_key"])
+                item.created_at = now - max(0.0, wall_now - poll["created_ts"])
+                item.next_attempt = now
+                item.needs_reconcile = poll["state"] == poll_journal.POSTING
+                heapq.heappush(self._queue, (item.next_attempt, next(self._seq), item))
+                self._stats["submitted"] += 1
+            self._cond.notify()
+        if polls:
+            interrupted = sum(1 for poll in polls if poll["state"] == poll_journal.POSTING)
+            logger.info(f"📮 Resumed {len(polls)} unposted poll(s) from the journal ({interrupted} interrupted mid-post)")
+        return len(polls)
+
+    def _find_existing(self, item, token):
+        """
+        Looks for this poll among the meeting's polls on Zoom.
+
+        Returns:
+            str or None: Zoom poll id if an identical poll (title and question texts) exists.
+            Raises requests.exceptions.RequestException or ValueError if the lookup failed.
+        """
+        response = get_zoom_client().get(f"/meetings/{item.meeting_id}/polls", token)
+        if response.status_code == 404:
+            return None # No such meeting (or no polls yet); the POST will report the real error
+        if response.status_code != 200:
+            raise ValueError(f"poll lookup returned {response.status_code}")
+        wanted = [q for q, _ in item.questions]
+        for poll in response.json().get("polls", []):
+            if poll.get("title") == item.title and [q.get("name") for q in poll.get("questions", [])] == wanted:
+                return poll.get("id")
+        return None
+
+    def _buckets(self, item):
+        account = self._account_buckets.get(item.account)
+        if account is None:
+            account = self._account_buckets[item.account] = TokenBucket(self.account_rate, self.account_burst)
+        meeting = self._meeting_buckets.get(item.meeting_id)
+        if meeting is None:
+            meeting = self._meeting_buckets[item.meeting_id] = TokenBucket(self.meeting_rate, self.meeting_burst)
+        return account, meeting
+
+    def _next_ready(self):
+        """Blocks until an item is due and both its buckets have a token; returns None on stop."""
+        with self._cond:
+            while not self._stopping:
+                now = time.monotonic()
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                due, _, item = self._queue[0]
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._queue)
+                account_bucket, meeting_bucket = self._buckets(item)
+                wait = max(account_bucket.wait_time(now), meeting_bucket.wait_time(now))
+                if wait > 0:
+                    self._stats["throttled"] += 1
+                    item.next_attempt = now + wait
+                    heapq.heappush(self._queue, (item.next_attempt, next(self._seq), item))
+                    continue
+                account_bucket.consume(now)
+                meeting_bucket.consume(now)
+                self._in_flight += 1
+                self._in_flight_meetings[item.meeting_id] += 1
+                return item
+        return None
+
+    def _run(self):
+        while True:
+            item = self._next_ready()
+            if item is None:
+                return
+            try:
+                self._attempt(item)
+            except Exception as e:
+                logger.error(f"❌ Unexpected outbox error for item {item.id}: {e}", exc_info=True)
+                self._dead_letter(item, f"unexpected error: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._in_flight_meetings[item.meeting_id] -= 1
+                    self._cond.notify_all()
+
+    def _backoff(self, attempts):
+        # Full jitter: spreads retries from many meetings instead of synchronising them
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1))))
+
+    def _attempt(self, item):
+        if time.monotonic() - item.created_at > self.max_age:
+            self._dead_letter(item, f"expired after {self.max_age:.0f}s ({item.last_error})")
+            return
+
+        token = self.token_provider(item.account)
+        if not token:
+            # Token expired and refresh pending or failed; wait without spending an attempt
+            item.last_error = "waiting for a valid Zoom token"
+            item.next_attempt = time.monotonic() + TOKEN_WAIT_SECONDS
+            with self._cond:
+                heapq.heappush(self._queue, (item.next_attempt, next(self._seq), item))
+            return
+
+        item.attempts += 1
+        with self._cond:
+            self._stats["attempts"] += 1
+        if item.needs_reconcile:
+            try:
+                existing_id = self._find_existing(item, token)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self._retry(item, f"could not check for an earlier post: {e}", self._backoff(item.attempts))
+                return
+            if existing_id is not None:
+                logger.info(f"Poll '{item.title}' is already on meeting {item.meeting_id} (Zoom poll {existing_id}); not posting again")
+                self._posted(item, None, zoom_poll_id=existing_id)
+                return
+            item.needs_reconcile = False
+
+        payload = build_poll_payload(item.title, item.questions)
+        logger.debug(f"Outbox item {item.id} attempt {item.attempts}: {json.dumps(payload)}")
+        self._journal(item, poll_journal.POSTING)
+        try:
+            response = get_zoom_client().post(f"/meetings/{item.meeting_id}/polls", token, json=payload)
+        except requests.exceptions.RequestException as e:
+            # A read timeout can follow a POST that Zoom accepted; check before posting again
+            item.needs_reconcile = not isinstance(e, requests.exceptions.ConnectionError)
+            self._retry(item, f"network error: {e}", self._backoff(item.attempts))
+            return
+
+        status = response.status_code
+        if status == 201:
+            self._posted(item, response)
+        elif status == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            limit_type = response.headers.get("X-RateLimit-Type", "unknown")
+            with self._cond:
+                self._stats["rate_limited"] += 1
+            if retry_after is not None and retry_after > self.max_retry_after:
+                self._dead_letter(item, f"rate limited ({limit_type}) for {retry_after:.0f}s")
+                return
+            delay = retry_after if retry_after is not None else self._backoff(item.attempts)
+            with self._cond:
+                self._account_buckets[item.account].block(time.monotonic() + delay)
+            logger.warning(f"⚠️ Zoom rate limit ({limit_type}) for account {item.account}; pausing posts for {delay:.1f}s")
+            self._retry(item, f"429 rate limited ({limit_type})", delay)
+        elif status in RETRYABLE_STATUS:
+            item.needs_reconcile = True
+            self._retry(item, f"{status}: {response.text[:200]}", self._backoff(item.attempts))
+        elif status == 401:
+            if get_token_manager().invalidate(token):
+                self._retry(item, "401 unauthorized; token refresh started", TOKEN_WAIT_SECONDS)
+                return
+            logger.error(f"❌ Zoom API error {status}: Unauthorized. Token may be invalid or expired.")
+            notify_token_expired()
+            self._dead_letter(item, f"{status}: {response.text[:200]}")
+        else:
+            self._dead_letter(item, f"{status}: {response.text[:200]}")
+
+    def _posted(self, item, response, zoom_poll_id=None):
+        latency = time.monotonic() - item.created_at
+        body = {"id": zoom_poll_id}
+        if response is not None:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+        self._journal(item, poll_journal.POSTED, zoom_poll_id=body.get("id"))
+        with self._cond:
+            self._stats["posted"] += 1
+            self._stats["post_latency_seconds"] += latency
+        _post_latency.labels(item.meeting_id).observe(latency)
+        timing = getattr(response, "zoom_timing", None) or {} # No response when recovered from the poll list
+        logger.info(f"[green]✅ Poll posted successfully[/] to meeting {item.meeting_id} after {item.attempts} attempt(s), "
+                    f"{latency:.2f}s in outbox (response {timing.get('response_seconds', 0) * 1000:.0f} ms)")
+        if item.on_posted is not None:
+            self._run_callback(lambda: item.on_posted(body), f"on_posted callback for outbox item {item.id}")
+            return
+        meeting_id = str(item.meeting_id)
+        with self._cond:
+            hook = self._posted_hooks.get(meeting_id)
+            if hook is None:
+                self._unclaimed.setdefault(meeting_id, deque(maxlen=UNCLAIMED_MAX)).append(
+                    (item.title, item.questions, body))
+        if hook is not None:
+            self._run_callback(lambda: hook(item.title, item.questions, body), f"posted hook for outbox item {item.id}")
+
+    def _retry(self, item, error, delay):
+        item.last_error = error
+        if item.attempts >= self.max_attempts:
+            self._dead_letter(item, f"gave up after {item.attempts} attempts ({error})")
+            return
+        item.next_attempt = time.monotonic() + delay
+        with self._cond:
+            self._stats["retries"] += 1
+            heapq.heappush(self._queue, (item.next_attempt, next(self._seq), item))
+            self._cond.notify()
+        logger.warning(f"⚠️ Posting outbox item {item.id} failed ({error}); retry {item.attempts}/{self.max_attempts - 1} in {delay:.1f}s")
+
+    def _dead_letter(self, item, error):
+        item.last_error = error
+        self._journal(item, poll_journal.FAILED, error=error)
+        with self._cond:
+            self._stats["dead_lettered"] += 1
+            self._dead_letters.append(item)
+        _dead_lettered.labels(item.meeting_id).inc()
+        logger.error(f"❌ Poll '{item.title}' for meeting {item.meeting_id} moved to dead letters: {error}")
+
+    def dead_letters(self):
+        """Polls that could not be posted, oldest first."""
+        with self._cond:
+            return [item.describe() for item in self._dead_letters]
+
+    def requeue_dead_letters(self):
+        """
+        Puts every dead-lettered poll back in the queue with a fresh attempt budget.
+
+        Returns:
+            int: Number of polls requeued.
+        """
+        with self._cond:
+            items = list(self._dead_letters)
+            self._dead_letters.clear()
+            now = time.monotonic()
+            for item in items:
+                item.attempts = 0
+                item.created_at = item.next_attempt = now
+                heapq.heappush(self._queue, (now, next(self._seq), item))
+            self._cond.notify()
+        for item in items:
+            self._journal(item, poll_journal.GENERATED)
+        return len(items)
+
+    def _pending_locked(self, meeting_id=None):
+        if meeting_id is None:
+            return len(self._queue) + self._in_flight
+        return (sum(1 for _, _, item in self._queue if item.meeting_id == meeting_id)
+                + self._in_flight_meetings[meeting_id])
+
+    def pending(self, meeting_id=None):
+        """Number of polls queued or being posted (optionally for one meeting)."""
+        with self._cond:
+            return self._pending_locked(meeting_id)
+
+    def pending_by_meeting(self):
+        """Polls queued or being posted, per meeting."""
+        with self._cond:
+            pending = Counter(item.meeting_id for _, _, item in self._queue)
+            pending.update(self._in_flight_meetings)
+        return pending
+
+    def drain(self, timeout, meeting_id=None):
+        """
+        Waits until nothing (or nothing for meeting_id) is queued or in flight.
+
+        Returns:
+            bool: True if the outbox emptied within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending_locked(meeting_id):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._queue)
+            stats["in_flight"] = self._in_flight
+            stats["dead_letters"] = len(self._dead_letters)
+        if self.journal is not None:
+            stats["journal"] = self.journal.stats()
+        stats["avg_post_latency_seconds"] = stats["post_latency_seconds"] / stats["posted"] if stats["posted"] else 0.0
+        return stats
+
+
+def get_zoom_outbox():
+    """Returns the shared posting outbox, or None when posting is synchronous (OUTBOX_ENABLED off)."""
+    global _outbox
+    if not config.get_config("OUTBOX_ENABLED"):
+        return None
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = ZoomOutbox(
+                account_rate=config.get_config_with_default("ZOOM_ACCOUNT_RATE", 10),
+                account_burst=config.get_config_with_default("ZOOM_ACCOUNT_BURST", 10),
+                meeting_rate=config.get_config_with_default("ZOOM_MEETING_RATE", 0.2),
+                meeting_burst=config.get_config_with_default("ZOOM_MEETING_BURST", 2),
+                max_attempts=config.get_config_with_default("OUTBOX_MAX_ATTEMPTS", 6),
+                backoff_base=config.get_config_with_default("OUTBOX_BACKOFF_BASE", 1.0),
+                backoff_max=config.get_config_with_default("OUTBOX_BACKOFF_MAX", 60.0),
+                max_age=config.get_config_with_default("OUTBOX_MAX_AGE", 600.0),
+                max_retry_after=config.get_config_with_default("OUTBOX_MAX_RETRY_AFTER", 300.0),
+                journal=get_poll_journal(),
+                workers=config.get_config_with_default("OUTBOX_WORKERS", 4),
+            )
+            _outbox.resume()
+    return _outbox
+
+
+def _collect_pending():
+    outbox = _outbox
+    if outbox is None:
+        return
+    for series in _pending.series():
+        series.set(0) # Meetings whose polls have all gone out
+    for meeting_id, count in outbox.pending_by_meeting().items():
+        _pending.labels(meeting_id).set(count)
+
+
+metrics.add_collector(_collect_pending)
@@ -0,0 +1,169 @@
+# zoom_webhooks.py
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import config
+from pipelines import get_pipelines
+from poll_staging import get_poll_stager
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_MAX_AGE = 300 # Seconds; older signed requests are treated as replays
+SEEN_EVENTS = 256 # Recent event ids remembered to drop Zoom's redeliveries
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _hmac_hex(secret, message):
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_request(headers, body: bytes, secret_token=None, verification_token=None, now=None):
+    """
+    Checks that a webhook request came from Zoom.
+
+    With a secret token, x-zm-signature must equal "v0=" + HMAC-SHA256 of
+    "v0:{x-zm-request-timestamp}:{body}" and the timestamp must be recent. Without one,
+    the legacy verification token must match the authorization header. Both comparisons
+    are constant-time.
+
+    Returns:
+        tuple: (ok, reason) where reason explains a rejection.
+    """
+    if secret_token:
+        timestamp = headers.get("x-zm-request-timestamp", "")
+        signature = headers.get("x-zm-signature", "")
+        try:
+            age = abs((now or time.time()) - int(timestamp))
+        except ValueError:
+            return False, "missing or invalid timestamp"
+        if age > SIGNATURE_MAX_AGE:
+            return False, f"timestamp {age:.0f}s old"
+        expected = "v0=" + _hmac_hex(secret_token, b"v0:" + timestamp.encode() + b":" + body)
+        if not hmac.compare_digest(expected.encode(), signature.encode()):
+            return False, "signature mismatch"
+        return True, None
+    if verification_token:
+        if hmac.compare_digest(verification_token.encode(), headers.get("authorization", "").encode()):
+            return True, None
+        return False, "verification token mismatch"
+    return False, "no SECRET_TOKEN or VERIFICATION_TOKEN configured"
+
+
+def url_validation_response(secret_token, plain_token):
+    """Body Zoom expects for an endpoint.url_validation challenge."""
+    return {"plainToken": plain_token, "encryptedToken": _hmac_hex(secret_token, plain_token.encode())}
+
+
+class WebhookDispatcher:
+    """
+    Applies Zoom webhook events on a background thread so the HTTP handler returns at once.
+
+    - meeting.started: starts the meeting's automation loop (if WEBHOOK_AUTOSTART and the
+      meeting is in WEBHOOK_MEETING_IDS, or that list is empty).
+    - meeting.ended: stops capture and drains the meeting's queued polls.
+    - meeting.poll_started / meeting.poll_ended: keeps the poll stager's idea of the
+      launched poll in step with launches and ends done by the host.
+    Redelivered events (same event, timestamp and meeting) are dropped.
+    """
+
+    def __init__(self, pipelines, autostart=True, meeting_ids=None):
+        self.pipelines = pipelines
+        self.autostart = autostart
+        self.meeting_ids = set(meeting_ids or [])
+        self._queue = queue.Queue()
+        self._seen = deque(maxlen=SEEN_EVENTS)
+        self._seen_lock = threading.Lock()
+        self._stats = {"received": 0, "duplicates": 0, "handled": 0, "ignored": 0, "errors": 0}
+        self._worker = threading.Thread(target=self._run, name="zoom-webhooks", daemon=True)
+        self._worker.start()
+
+    def submit(self, event):
+        """
+        Queues an event for handling.
+
+        Returns:
+            bool: False if the event was a redelivery and was dropped.
+        """
+        meeting = (event.get("payload") or {}).get("object") or {}
+        event_id = (event.get("event"), event.get("event_ts"), str(meeting.get("id")))
+        with self._seen_lock:
+            self._stats["received"] += 1
+            if event_id in self._seen:
+                self._stats["duplicates"] += 1
+                return False
+            self._seen.append(event_id)
+        self._queue.put(event)
+        return True
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                handled = self._handle(event)
+            except Exception as e:
+                logger.error(f"❌ Error handling Zoom webhook {event.get('event')}: {e}", exc_info=True)
+                handled = None
+            with self._seen_lock:
+                key = "errors" if handled is None else "handled" if handled else "ignored"
+                self._stats[key] += 1
+
+    def _handle(self, event):
+        name = event.get("event")
+        meeting = (event.get("payload") or {}).get("object") or {}
+        meeting_id = str(meeting.get("id", ""))
+        if not meeting_id:
+            return False
+        if self.meeting_ids and meeting_id not in self.meeting_ids:
+            logger.debug(f"Ignoring {name} for unwatched meeting {meeting_id}")
+            return False
+
+        if name == "meeting.started":
+            if not self.autostart:
+                return False
+            logger.info(f"📡 Meeting {meeting_id} started ('{meeting.get('topic', '')}')")
+            return self.pipelines.start(meeting_id)
+        if name == "meeting.ended":
+            logger.info(f"📡 Meeting {meeting_id} ended")
+            stager = get_poll_stager(meeting_id)
+            if stager is not None:
+                stager.stop()
+            return self.pipelines.stop(meeting_id, drain=True)
+        if name in ("meeting.poll_started", "meeting.poll_ended"):
+            poll = meeting.get("poll") or {}
+            poll_id = poll.get("poll_id") or poll.get("id")
+            stager = get_poll_stager(meeting_id)
+            if stager is None or not poll_id:
+                return False
+            if name == "meeting.poll_started":
+                stager.note_launched(poll_id)
+            else:
+                stager.note_ended(poll_id)
+            return True
+        return False
+
+    def stats(self):
+        with self._seen_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+def get_webhook_dispatcher():
+    """Returns the shared webhook dispatcher, creating it on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            watched = config.get_config_with_default("WEBHOOK_MEETING_IDS", "")
+            _dispatcher = WebhookDispatcher(
+                get_pipelines(),
+                autostart=config.get_config_with_default("WEBHOOK_AUTOSTART", True),
+                meeting_ids=[m.strip().replace(" ", "") for m in watched.split(",") if m.strip()],
+            )
+    return _dispatcher
@@ -7,7 +7,10 @@ from rich.live import Live
 from rich.panel import Panel
 from run_loop import run_loop
 import config
+import metrics
 from audio_capture import list_audio_devices
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
 from urllib.parse import urlencode
 
 console = Console()
@@ -78,11 +81,12 @@ def oauth_callback():
     }
 
     try:
-        response = requests.post(token_url, auth=auth, data=data)
+        response = get_zoom_client().post(token_url, auth=auth, data=data)
         response.raise_for_status()
         tokens = response.json()
         
-        # Store access token in session
+        # Keep access + refresh tokens for background refresh; the session gets the access token
+        get_token_manager().set_tokens(tokens)
         session['zoom_token'] = tokens['access_token']
         console.log("[green]✓[/] Successfully obtained Zoom access token")
         
@@ -189,6 +193,11 @@ def stop():
     flash("Automation has been signaled to stop.")
     return redirect(url_for("setup"))
 
+@app.route("/metrics")
+def prometheus_metrics():
+    """Stage latencies, audio failures, Whisper time, Zoom status codes and RSS, per meeting."""
+    return app.response_class(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 @app.route("/config", methods=["GET"])
 def show_config():
     """Show the configuration form"""
@@ -18,4 +18,27 @@ LLAMA_HOST_BASE = LLAMA_HOST_BASE.rstrip('/')
 # For OpenAI client compatibility
 LLAMA_HOST = f"{LLAMA_HOST_BASE}/v1"
 # For direct Ollama API calls
-OLLAMA_API = LLAMA_HOST_BASE
\ No newline at end of file
+OLLAMA_API = LLAMA_HOST_BASE
+
+# Seconds poll generation may take before the extractive fast path is used
+POLL_LATENCY_BUDGET = float(os.getenv("POLL_LATENCY_BUDGET", "60"))
+
+# Shared Zoom API client: connect/read timeouts (seconds) and retries for idempotent calls
+ZOOM_CONNECT_TIMEOUT = float(os.getenv("ZOOM_CONNECT_TIMEOUT", "3.05"))
+ZOOM_READ_TIMEOUT    = float(os.getenv("ZOOM_READ_TIMEOUT", "10"))
+ZOOM_MAX_RETRIES     = int(os.getenv("ZOOM_MAX_RETRIES", "3"))
+
+# OAuth tokens (access + refresh) are saved here and refreshed this many seconds before expiry
+ZOOM_TOKEN_PATH             = os.getenv("ZOOM_TOKEN_PATH", os.path.join("cache", "zoom_tokens.json"))
+ZOOM_TOKEN_REFRESH_MARGIN   = float(os.getenv("ZOOM_TOKEN_REFRESH_MARGIN", "300"))
+
+# Run-loop retries per failure class: (base seconds, max seconds); waits double up to the max,
+# and RETRY_JITTER of each wait is randomised so loops that failed together don't retry together
+RETRY_POLICIES = {
+    "audio":   (float(os.getenv("RETRY_AUDIO_BASE", "1")),   float(os.getenv("RETRY_AUDIO_MAX", "30"))),
+    "whisper": (float(os.getenv("RETRY_WHISPER_BASE", "2")), float(os.getenv("RETRY_WHISPER_MAX", "60"))),
+    "llm":     (float(os.getenv("RETRY_LLM_BASE", "2")),     float(os.getenv("RETRY_LLM_MAX", "60"))),
+    "zoom":    (float(os.getenv("RETRY_ZOOM_BASE", "5")),    float(os.getenv("RETRY_ZOOM_MAX", "120"))),
+}
+RETRY_MULTIPLIER = float(os.getenv("RETRY_MULTIPLIER", "2"))
+RETRY_JITTER     = float(os.getenv("RETRY_JITTER", "0.5"))
@@ -0,0 +1,257 @@
+# metrics.py
+import bisect
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cache hit (milliseconds) to a slow LLM generation (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_metrics = {} # name -> metric, in registration order
+_metrics_lock = threading.Lock()
+_collectors = [] # Called before each render to refresh gauges (queue depths, RSS)
+
+
+class _Value:
+    """One labelled counter or gauge series."""
+
+    __slots__ = ("labels", "value", "lock")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Histogram:
+    """One labelled histogram series: per-bucket counts, sum and count."""
+
+    __slots__ = ("labels", "buckets", "counts", "sum", "lock")
+
+    def __init__(self, labels, buckets):
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observes the seconds spent in the block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class _Metric:
+    """
+    A metric family. labels(...) returns the series for a set of label values; callers on
+    hot paths keep that series and call inc()/observe() on it directly.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {} # label values as passed (and as strings) -> series
+        self._ordered = [] # Unique series in creation order, for rendering
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self._create(())
+
+    def _new_series(self, labels):
+        return _Value(labels)
+
+    def _create(self, values):
+        labels = tuple(str(value) for value in values)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = self._new_series(labels)
+                self._ordered.append(series)
+            self._series[values] = series
+        return series
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            series = self._create(values)
+        return series
+
+    def series(self):
+        with self._lock:
+            return list(self._ordered)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_series(self, labels):
+        return _Histogram(labels, self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+def _register(cls, name, documentation, labelnames, **kwargs):
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind} with labels {metric.labelnames}")
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    """Returns the counter `name`, registering it on first use (names should end in _total)."""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    """Returns the gauge `name`, registering it on first use."""
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Returns the histogram `name`, registering it on first use."""
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def add_collector(collector):
+    """Registers collector(), called before every render to set gauges that are sampled rather than recorded."""
+    _collectors.append(collector)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value))
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+
+    Returns:
+        str: Body for a /metrics response; serve it with CONTENT_TYPE.
+    """
+    for collector in list(_collectors):
+        try:
+            collector()
+        except Exception:
+            pass # A broken collector must not break the scrape
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for series in metric.series():
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, series.labels)} "
+                             f"{_format_value(series.value)}")
+                continue
+            with series.lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, series.labels, le)} {cumulative}")
+            labels = _format_labels(metric.labelnames, series.labels)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{metric.name}_count{labels} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _rss_bytes():
+    """Resident set size of this process (current on Linux, peak elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+_process_rss = gauge("process_resident_memory_bytes", "Resident memory size in bytes.")
+
+
+def _collect_process():
+    _process_rss.set(_rss_bytes())
+
+
+add_collector(_collect_process)
@@ -1,11 +1,13 @@
 #poller.py
 import json
-import requests
 import re
 from openai import OpenAI
 from rich.console import Console
 import config
+from extractive_poll import generate_extractive_poll
 from poll_prompt import POLL_PROMPT
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
 
 console = Console()
 llama = OpenAI(base_url=config.LLAMA_HOST, api_key="ollama")
@@ -63,7 +65,8 @@ def generate_poll_from_transcript(transcript: str) -> tuple[str, str, list[str]]
             messages=[{"role": "user", "content": full_prompt}],
             temperature=0.7,
             max_tokens=800,  # Increased to allow for complete responses
-            response_format={"type": "json_object"}  # Request JSON response
+            response_format={"type": "json_object"},  # Request JSON response
+            timeout=config.POLL_LATENCY_BUDGET  # Past the budget, the extractive fast path is used
         )
         raw_response = resp.choices[0].message.content.strip()
         console.log(f"📥 LLaMA raw response received ({len(raw_response)} chars)")
@@ -119,7 +122,7 @@ def generate_poll_from_transcript(transcript: str) -> tuple[str, str, list[str]]
                 options.append(f"Additional point from discussion {len(options) + 1}")
         
         # Log success
-        console.log(f"[green]✅ Successfully generated poll:[/]")
+        console.log(f"[green]✅ Successfully generated poll:[/] (source: llm)")
         console.log(f"Title: {title}")
         console.log(f"Question: {question}")
         console.log(f"Options: {options}")
@@ -128,7 +131,16 @@ def generate_poll_from_transcript(transcript: str) -> tuple[str, str, list[str]]
 
     except Exception as e:
         console.log(f"[red]❌ Poll generation error:[/] {e}")
-        
+
+        # Build the poll from the transcript itself rather than posting a generic one
+        extractive_poll = generate_extractive_poll(clean_transcript)
+        if extractive_poll is not None:
+            title, question, options = extractive_poll
+            while len(options) < 4:
+                options.append(f"Additional point from discussion {len(options) + 1}")
+            console.log(f"[yellow]⚡ Using extractive poll (source: extractive):[/] {title}")
+            return title, question, options
+
         # Create a fallback poll that indicates there was an error
         fallback_title = "Meeting Discussion Poll"
         fallback_question = "What topic should we focus on next?"
@@ -156,12 +168,6 @@ def post_poll_to_zoom(title: str, question: str, options: list[str], meeting_id:
     Returns:
         bool: True if successful, False otherwise.
     """
-    url = f"https://api.zoom.us/v2/meetings/{meeting_id}/polls"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    
     # Make sure we have exactly 4 options
     if len(options) > 4:
         options = options[:4]
@@ -182,10 +188,18 @@ def post_poll_to_zoom(title: str, question: str, options: list[str], meeting_id:
     console.log(f"Options: {options}")
 
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        zoom_client = get_zoom_client()
+        response = zoom_client.post(f"/meetings/{meeting_id}/polls", token, json=payload)
+        timing = zoom_client.last_timing
+        console.log(f"⏱️ Zoom connect {timing['connect_seconds'] * 1000:.0f} ms, response {timing['response_seconds'] * 1000:.0f} ms")
         if response.status_code == 201:
             console.log(f"[green]✅ Poll posted successfully[/]: {response.json()}")
             return True
+        elif response.status_code == 401:
+            console.log(f"[red]❌ Zoom API error[/]: 401 Unauthorized {response.text}")
+            if get_token_manager().invalidate(token):
+                console.log("[yellow]⚠️ Refreshing the Zoom token; later polls will use the new one[/]")
+            return False
         else:
             console.log(f"[red]❌ Zoom API error[/]: {response.status_code} {response.text}")
             return False
@@ -0,0 +1,59 @@
+# retry_policy.py
+import random
+import time
+from rich.console import Console
+
+import config
+
+console = Console()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for one failure class ("audio", "whisper", "llm", "zoom").
+
+    The n-th consecutive failure waits base * multiplier**(n-1) seconds, capped at max_delay,
+    minus a random share of up to `jitter` of it. The wait never drops to zero, so a stage
+    that fails at once can't spin the loop.
+    """
+
+    def __init__(self, base=1.0, max_delay=60.0, multiplier=2.0, jitter=0.5):
+        self.base = max(0.0, base)
+        self.max_delay = max(self.base, max_delay)
+        self.multiplier = max(1.0, multiplier)
+        self.jitter = min(1.0, max(0.0, jitter))
+
+    def delay(self, failures):
+        delay = min(self.max_delay, self.base * self.multiplier ** max(0, failures - 1))
+        return delay * (1.0 - self.jitter * random.random())
+
+
+class Backoff:
+    """Consecutive failures per class for one loop; waits end as soon as stop_event is set."""
+
+    def __init__(self, stop_event, policies=None):
+        self.stop_event = stop_event
+        self.policies = policies or {
+            name: RetryPolicy(base, max_delay, config.RETRY_MULTIPLIER, config.RETRY_JITTER)
+            for name, (base, max_delay) in config.RETRY_POLICIES.items()
+        }
+        self._failures = {}
+
+    def success(self, failure_class):
+        self._failures[failure_class] = 0
+
+    def failure(self, failure_class, since=None):
+        """
+        Records a failure and waits out its backoff; time the failed attempt took since
+        `since` (a time.monotonic() value) counts towards the wait.
+
+        Returns False if the loop was stopped while waiting.
+        """
+        failures = self._failures[failure_class] = self._failures.get(failure_class, 0) + 1
+        policy = self.policies.get(failure_class) or RetryPolicy()
+        started = since if since is not None else time.monotonic()
+        remaining = started + policy.delay(failures) - time.monotonic()
+        if remaining > 0:
+            console.log(f"[yellow]⏳ {failure_class} failure {failures} - retrying in {remaining:.1f}s[/]")
+            self.stop_event.wait(remaining)
+        return not self.stop_event.is_set()
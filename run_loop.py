@@ -5,45 +5,88 @@ from rich.console import Console
 from audio_capture import record_segment
 from transcribe_whisper import transcribe_segment
 from poller import generate_poll_from_transcript, post_poll_to_zoom
+from retry_policy import Backoff
+import metrics
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
 
 console = Console()
 
+_stage_seconds = metrics.histogram("zoompoll_stage_seconds",
+                                   "Time per pipeline stage (record, transcribe, generate, post).", ("stage", "meeting"))
+_poll_latency = metrics.histogram("zoompoll_poll_latency_seconds",
+                                  "End of the segment's recording to its poll being posted.", ("meeting",))
+_audio_failures = metrics.counter("zoompoll_audio_failures_total",
+                                  "Segments that could not be recorded (device errors or silence).", ("meeting",))
+
 def run_loop(zoom_token, meeting_id, duration, device, should_stop):
     """
     Forever: record → transcribe → generate + post poll → delete files
-    Until should_stop Event is set.
+    Until should_stop Event is set. Failures back off per stage (see retry_policy.Backoff);
+    every wait ends as soon as should_stop is set.
     
     Args:
-        zoom_token: The Zoom API token
+        zoom_token: The Zoom API token, used when the token manager has none
         meeting_id: The Zoom meeting ID
         duration: Duration in seconds to record each segment
         device: Audio device name to use for recording
         should_stop: threading.Event object to signal loop termination
     """
     cycle = 0
+    backoff = Backoff(should_stop)
+    token_manager = get_token_manager()
+    # Open the Zoom connection now so the first poll doesn't pay for DNS, TCP and TLS
+    get_zoom_client().warm()
     while not should_stop.is_set():
+        # Token expired and the refresh failed: wait instead of recording polls we can't post
+        if token_manager.has_tokens() and not token_manager.is_ready():
+            console.log("[yellow]⏸️ No valid Zoom token - pausing until it is refreshed[/]")
+            if not token_manager.wait_until_ready(stop_event=should_stop):
+                continue
+            console.log("[green]▶️  Zoom token available - resuming[/]")
+
         cycle += 1
         console.log(f"[blue]▶️  Cycle {cycle}[/]")
+        stage = "audio"
         try:
             # 1) Record
+            recording_started = time.monotonic()
             record_success = record_segment(duration=duration, output="segment.wav", device=device)
+            recorded_at = time.monotonic()
+            _stage_seconds.labels("record", meeting_id).observe(recorded_at - recording_started)
             if not record_success:
                 console.log("[yellow]⚠️ Recording failed—skipping cycle[/]")
-                time.sleep(5)  # Wait a bit before next cycle
+                _audio_failures.labels(meeting_id).inc()
+                backoff.failure("audio", since=recording_started)
                 continue
+            backoff.success("audio")
 
             # 2) Transcribe
-            text = transcribe_segment("segment.wav")
+            stage = "whisper"
+            with _stage_seconds.labels("transcribe", meeting_id).time():
+                text = transcribe_segment("segment.wav", meeting_id=meeting_id)
             if not text.strip():
+                # Usually just silence; not a Whisper failure, and the next segment is already due
                 console.log("[yellow]⚠️ Empty transcript—skipping poll[/]")
-                time.sleep(5)  # Wait a bit before next cycle
                 continue
+            backoff.success("whisper")
 
             # 3) Generate poll
-            title, question, options = generate_poll_from_transcript(text)
+            stage = "llm"
+            with _stage_seconds.labels("generate", meeting_id).time():
+                title, question, options = generate_poll_from_transcript(text)
+            backoff.success("llm")
 
             # 4) Post poll
-            post_poll_to_zoom(title, question, options, meeting_id, zoom_token)
+            stage = "zoom"
+            with _stage_seconds.labels("post", meeting_id).time():
+                posted = post_poll_to_zoom(title, question, options, meeting_id, token_manager.get_token() or zoom_token)
+            if posted:
+                _poll_latency.labels(meeting_id).observe(time.monotonic() - recorded_at)
+                backoff.success("zoom")
+            else:
+                # Don't back off here: that would pause capture and lose the speech in between
+                console.log("[yellow]⚠️ Poll was not posted—continuing capture[/]")
 
             # 5) Cleanup
             for f in ("segment.wav", "temp_stereo.wav"):
@@ -52,15 +95,12 @@ def run_loop(zoom_token, meeting_id, duration, device, should_stop):
             console.log("[green]🗑️  Cleaned up audio files[/]")
 
         except Exception as e:
-            console.log(f"[red]❌ Error in run_loop:[/] {e}")
-            time.sleep(5)  # Pause on error to avoid rapid error loops
+            console.log(f"[red]❌ Error in run_loop ({stage}):[/] {e}")
+            backoff.failure(stage)
 
         # Check if we should stop before continuing
         if should_stop.is_set():
             console.log("[yellow]⚠️ Stopping automation as requested[/]")
             break
-
-        # small pause before next cycle
-        time.sleep(1)
     
     console.log("[green]✅ Automation loop terminated[/]")
\ No newline at end of file
@@ -5,7 +5,10 @@ import os
 from rich.console import Console
 import torch
 
+import metrics
+
 console = Console()
+_whisper_seconds = metrics.histogram("zoompoll_whisper_seconds", "Whisper model time per segment.", ("meeting",))
 _model = None  # Lazy loading to avoid slow startup
 
 def get_model():
@@ -37,12 +40,13 @@ def get_model():
             raise
     return _model
 
-def transcribe_segment(audio_path: str = "segment.wav") -> str:
+def transcribe_segment(audio_path: str = "segment.wav", meeting_id: str = None) -> str:
     """
     Transcribe audio file using Whisper tiny.en model
     
     Args:
         audio_path (str): Path to the audio file to transcribe
+        meeting_id (str, optional): Meeting the audio is from, used as the metrics label
         
     Returns:
         str: Transcribed text or empty string if transcription fails
@@ -88,6 +92,7 @@ def transcribe_segment(audio_path: str = "segment.wav") -> str:
         
         # Calculate and log processing time
         process_time = time.time() - start_time
+        _whisper_seconds.labels(meeting_id or "").observe(process_time)
         console.log(f"⏱️ Transcription took {process_time:.2f} seconds")
         
         # Log results
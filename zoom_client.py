@@ -0,0 +1,200 @@
+# zoom_client.py
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from rich.console import Console
+
+import config
+import metrics
+
+console = Console()
+
+ZOOM_API_BASE = "https://api.zoom.us/v2"
+
+_client = None
+_client_lock = threading.Lock()
+
+# Seconds spent opening new connections during the current request, per thread
+_connect_timing = threading.local()
+
+_MEETING_PATH = re.compile(r"/(?:meetings|past_meetings)/([^/?]+)")
+_responses = metrics.counter("zoompoll_zoom_responses_total", "Zoom API responses by status code ('error' for network errors).",
+                             ("meeting", "method", "status"))
+_request_seconds = metrics.histogram("zoompoll_zoom_request_seconds", "Zoom API call time, connect included.",
+                                     ("method",))
+
+
+def _add_connect_seconds(seconds):
+    _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _add_connect_seconds(time.perf_counter() - started)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect() # DNS + TCP + TLS handshake
+        _add_connect_seconds(time.perf_counter() - started)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long connection setup took."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool,
+                                                   "https": _TimedHTTPSConnectionPool}
+
+
+class ZoomApiClient:
+    """
+    Shared HTTP client for the Zoom REST and OAuth endpoints.
+
+    One pooled keep-alive Session serves every call, so only the first request pays
+    DNS, TCP and TLS setup. Idempotent methods are retried on connection errors and 5xx
+    responses; POST is never retried here because it could create a duplicate poll.
+    Every call is timed and split into connect time (zero on a reused connection)
+    and response time.
+    """
+
+    def __init__(self, base_url=ZOOM_API_BASE, connect_timeout=3.05, read_timeout=10, retries=3, pool_size=4):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}),
+            raise_on_status=False, # Hand the final response back instead of raising
+        )
+        adapter = _TimedAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "new_connections": 0, "errors": 0, "connect_seconds": 0.0, "response_seconds": 0.0}
+        self.last_timing = None
+
+    def request(self, method, path, token=None, **kwargs):
+        """
+        Sends a request to a Zoom API path (or an absolute URL).
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path under the API base such as "/meetings/123/polls", or a full URL.
+            token (str, optional): OAuth access token for the Authorization header.
+            **kwargs: Passed to requests (json, data, params, headers, auth, timeout).
+
+        Returns:
+            requests.Response. Raises requests.exceptions.RequestException on network errors.
+        """
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        headers = dict(kwargs.pop("headers", None) or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        kwargs.setdefault("timeout", self.timeout)
+
+        _connect_timing.seconds = 0.0
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            total = time.perf_counter() - started
+            connect = getattr(_connect_timing, "seconds", 0.0)
+            self._record(method, url, connect, total - connect)
+            meeting = _MEETING_PATH.search(url)
+            _responses.labels(meeting.group(1) if meeting else "", method, status).inc()
+            _request_seconds.labels(method).observe(total)
+        return response
+
+    def _record(self, method, url, connect_seconds, response_seconds):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["new_connections"] += 1 if connect_seconds > 0 else 0
+            self._stats["connect_seconds"] += connect_seconds
+            self._stats["response_seconds"] += response_seconds
+            self.last_timing = {"method": method, "url": url,
+                                "connect_seconds": connect_seconds, "response_seconds": response_seconds}
+
+    def get(self, path, token=None, **kwargs):
+        return self.request("GET", path, token, **kwargs)
+
+    def post(self, path, token=None, **kwargs):
+        return self.request("POST", path, token, **kwargs)
+
+    def put(self, path, token=None, **kwargs):
+        return self.request("PUT", path, token, **kwargs)
+
+    def patch(self, path, token=None, **kwargs):
+        return self.request("PATCH", path, token, **kwargs)
+
+    def delete(self, path, token=None, **kwargs):
+        return self.request("DELETE", path, token, **kwargs)
+
+    def warm(self):
+        """
+        Opens the pooled connection to the API host ahead of the first real call.
+
+        Returns:
+            bool: True if the host answered (any status code).
+        """
+        try:
+            self.request("HEAD", self.base_url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            console.log(f"[yellow]⚠️ Could not pre-warm Zoom API connection:[/] {e}")
+            return False
+        timing = self.last_timing
+        console.log(f"[green]🔌 Zoom API connection pre-warmed[/] (connect {timing['connect_seconds'] * 1000:.0f} ms)")
+        return True
+
+    def stats(self):
+        """Returns call counts plus average connect and response time per call."""
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats["calls"]
+        stats["avg_connect_seconds"] = stats["connect_seconds"] / calls if calls else 0.0
+        stats["avg_response_seconds"] = stats["response_seconds"] / calls if calls else 0.0
+        stats["connection_reuse_ratio"] = 1 - stats["new_connections"] / calls if calls else 0.0
+        return stats
+
+
+def get_zoom_client():
+    """Returns the shared Zoom API client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ZoomApiClient(
+                connect_timeout=config.ZOOM_CONNECT_TIMEOUT,
+                read_timeout=config.ZOOM_READ_TIMEOUT,
+                retries=config.ZOOM_MAX_RETRIES,
+            )
+    return _client
@@ -18,6 +18,8 @@ from rich.table import Table
 from dotenv import load_dotenv
 import config
 from run_loop import run_loop
+from token_manager import get_token_manager
+from zoom_client import get_zoom_client
 
 console = Console()
 
@@ -66,7 +68,7 @@ def save_credentials(client_id, client_secret):
         return False
 
 def get_access_token(auth_code, client_id, client_secret):
-    """Exchange authorization code for access token"""
+    """Exchange authorization code for access token (the refresh token is kept by the token manager)"""
     token_url = "https://zoom.us/oauth/token"
     auth_data = {
         "code": auth_code,
@@ -75,13 +77,15 @@ def get_access_token(auth_code, client_id, client_secret):
     }
     
     try:
-        response = requests.post(
+        response = get_zoom_client().post(
             token_url,
             auth=(client_id, client_secret),
             data=auth_data
         )
         response.raise_for_status()
-        return response.json().get("access_token")
+        tokens = response.json()
+        get_token_manager().set_tokens(tokens)
+        return tokens.get("access_token")
     except Exception as e:
         console.print(f"[red]Error getting access token: {e}[/]")
         return None
@@ -173,9 +177,7 @@ def setup():
             access_token = get_access_token(auth_code, client_id, client_secret)
             
             if access_token:
-                # Save token to env
-                with open(".env", "a") as f:
-                    f.write(f"\nZOOM_TOKEN={access_token}\n")
+                # The token manager already saved the access and refresh tokens to config.ZOOM_TOKEN_PATH
                 progress.update(task, description="[green]✓ Setup completed successfully!")
                 console.print("\n[green]✓ Setup complete! You can now start the automation.[/]")
             else:
@@ -204,7 +206,8 @@ def start(duration, device, meeting):
         console.print("[red]Missing Zoom credentials. Please run 'setup' first.[/]")
         return
     
-    if not os.getenv("ZOOM_TOKEN"):
+    token_manager = get_token_manager()
+    if not token_manager.has_tokens() and not os.getenv("ZOOM_TOKEN"):
         console.print("[red]Not authorized with Zoom. Please run 'setup' first.[/]")
         return
     
@@ -224,7 +227,7 @@ def start(duration, device, meeting):
     
     should_stop = threading.Event()
     try:
-        run_loop(os.getenv("ZOOM_TOKEN"), meeting or "", duration, device, should_stop)
+        run_loop(token_manager.get_token() or os.getenv("ZOOM_TOKEN"), meeting or "", duration, device, should_stop)
     except KeyboardInterrupt:
         console.print("\n[yellow]Stopping automation...[/]")
         should_stop.set()